@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+End-to-end Import Benchmark
+Runs MultiProfileCSVProcessor.process_csv_file against the fake AnkiConnect
+server in a scratch directory and reports notes/sec, AnkiConnect round trips
+and the busiest actions. Media providers are not contacted: the local media
+cache is pre-seeded so every word goes through the upload path.
+
+Usage:
+    python benchmarks/bench_import.py --words 500 --latency '*=0.002' --latency addNotes=0.02
+    python benchmarks/bench_import.py --words 200 --error-rate storeMediaFile=0.05 --busy 1:3
+
+Author: Assistant
+Version: 1.0
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+# Add repo root and this directory to path for imports
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCH_DIR)))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_anki_server import FakeAnkiServer, FakeCollection, FaultConfig, _parse_pairs
+
+
+def write_csv(path: Path, words: int, offset: int = 0):
+    """Vocabulary CSV in the format CardGenerator expects"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Word', 'Pronunciation', 'Vietnamese', 'Part_of_Speech',
+                         'Example_Sentence', 'Fill_in_Blank_Question', 'Fill_in_Blank_Answer'])
+        for i in range(offset, offset + words):
+            word = f"word{i}"
+            writer.writerow([word, f"/wɜːd{i}/", f"từ {i}", 'noun',
+                             f"This is {word} in a sentence.",
+                             "This is ____ in a sentence.", word])
+
+
+def seed_media(words: int, media_kb: int, offset: int = 0):
+    """Pre-populate the local media store so no provider is contacted"""
+    from feature1_csv_to_anki.core.blob_store import BlobStore
+    store = BlobStore(Path("media_cache/store"))
+    for i in range(offset, offset + words):
+        store.put(f"word{i}.jpg", os.urandom(media_kb * 1024))
+        store.put(f"word{i}.mp3", os.urandom(media_kb * 512))
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MultiProfileCSVProcessor end to end")
+    parser.add_argument('--words', type=int, default=300, help='Words per CSV file')
+    parser.add_argument('--files', type=int, default=1, help='CSV files to import')
+    parser.add_argument('--media-kb', type=int, default=16, help='Size of each seeded image')
+    parser.add_argument('--media-dir', action='store_true',
+                        help="Give the profile a collection.media directory (file uploads) "
+                             "instead of uploading through AnkiConnect")
+    parser.add_argument('--latency', action='append', metavar='ACTION=SECONDS')
+    parser.add_argument('--error-rate', action='append', metavar='ACTION=RATE')
+    parser.add_argument('--reset-rate', type=float, default=0.0)
+    parser.add_argument('--busy', action='append', metavar='START:END')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    busy = [tuple(float(x) for x in w.split(':')) for w in args.busy or []]
+    faults = FaultConfig(latency=_parse_pairs(args.latency, '--latency'),
+                         error_rates=_parse_pairs(args.error_rate, '--error-rate'),
+                         reset_rate=args.reset_rate, busy_windows=busy, seed=args.seed)
+
+    profile = 'Bench'
+    logging.basicConfig(level=logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as scratch, \
+            FakeAnkiServer(collection=FakeCollection([profile]), faults=faults) as server:
+        os.chdir(scratch)
+        for directory in ('input', 'logs'):
+            Path(directory).mkdir()
+
+        from shared.config import Config
+        config = Config(config_file=os.path.join(scratch, 'config.json'))
+        host, port = server.httpd.server_address[:2]
+        config.set('anki.host', host)
+        config.set('anki.port', port)
+        config.save()
+
+        from feature1_csv_to_anki import run
+        media_dir = Path(scratch) / 'collection.media' if args.media_dir else None
+        if media_dir:
+            media_dir.mkdir()
+        # Skip the filesystem probe and the interactive prompt for the media directory
+        run.ProfileAwareMediaCache._detect_anki_media_dir_for_profile = lambda self, name: media_dir
+
+        csv_files = []
+        for n in range(args.files):
+            path = Path('input') / f"bench_{n}.csv"
+            write_csv(path, args.words, offset=n * args.words)
+            seed_media(args.words, args.media_kb, offset=n * args.words)
+            csv_files.append(path)
+
+        quiet = io.StringIO()
+        with contextlib.redirect_stdout(quiet):
+            processor = run.MultiProfileCSVProcessor()
+            processor.profile_manager.switch_profile(profile)
+            processor.current_profile = profile
+            processor._initialize_profile_components(profile)
+            processor.anki_client.metrics.reset()
+            requests_before = server.requests
+
+            start = time.perf_counter()
+            results = [processor.process_csv_file(path) for path in csv_files]
+            elapsed = time.perf_counter() - start
+
+        stats = [r['stats'] for r in results]
+        cards = sum(s['vocabulary_cards'] + s['cloze_cards'] + s['pronunciation_cards']
+                    + s['exercise_cards'] for s in stats)
+        errors = sum(len(s['errors']) for s in stats)
+        words = args.words * args.files
+
+        print(f"{words} words, {cards} cards, {errors} errors in {elapsed:.2f}s "
+              f"({words / elapsed:.0f} words/sec, {cards / elapsed:.0f} cards/sec)")
+        print(f"AnkiConnect requests: {server.requests - requests_before} "
+              f"({(server.requests - requests_before) / words:.2f} per word)")
+        print(f"Uploads by strategy: {stats[0].get('upload_strategies', {})}")
+        print(f"Resilience: {json.dumps(processor.anki_client.get_resilience_stats())}")
+        print("\nBusiest actions:")
+        for action, m in list(processor.anki_client.metrics.to_dict().items())[:6]:
+            if m['calls']:
+                print(f"   {action:<20} {m['calls']:>6} calls {m['latency']['total']:>8.2f}s "
+                      f"p95 {m['latency']['p95'] * 1000:.1f}ms")
+
+        processor.anki_client.close()
+        os.chdir(BENCH_DIR)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
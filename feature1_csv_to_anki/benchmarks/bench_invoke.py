@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect invoke() Micro-benchmark
+Measures calls/sec of AnkiConnectClient.invoke against a local stand-in server,
+comparing one-connection-per-call (the old urlopen transport) with the
+keep-alive connection pool.
+
+Usage:
+    python benchmarks/bench_invoke.py --calls 2000
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add repo root to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from feature1_csv_to_anki.core.anki_connect import AnkiConnectClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Minimal AnkiConnect stand-in answering every action with a fixed result"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length))
+        body = json.dumps({'result': request.get('action'), 'error': None}).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """Start the stand-in server on a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def urlopen_invoke(url: str, action: str):
+    """The pre-pool transport: a fresh urlopen connection per call"""
+    request_json = json.dumps({'action': action, 'version': 6, 'params': {}}).encode('utf-8')
+    response = urllib.request.urlopen(
+        urllib.request.Request(url, request_json, {'Content-Type': 'application/json'}),
+        timeout=10
+    )
+    return json.loads(response.read().decode('utf-8'))['result']
+
+
+def measure(name: str, func, calls: int) -> float:
+    """Run func `calls` times and print calls/sec"""
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - start
+    rate = calls / elapsed
+    print(f"{name:<28} {rate:>10.0f} calls/sec  ({elapsed * 1000 / calls:.3f} ms/call)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AnkiConnectClient.invoke")
+    parser.add_argument('--calls', type=int, default=2000, help='Calls per scenario')
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        # cache_metadata=False: 'version' is a cached metadata action, and this
+        # benchmark measures the HTTP transport, not cache hits
+        before = measure("urlopen (before)", lambda: urlopen_invoke(url, 'version'), args.calls)
+
+        with AnkiConnectClient(url, pool_size=0, cache_metadata=False) as client:
+            measure("pool_size=0 (no reuse)", lambda: client.invoke('version'), args.calls)
+
+        with AnkiConnectClient(url, pool_size=4, cache_metadata=False) as client:
+            after = measure("pool_size=4 (keep-alive)", lambda: client.invoke('version'), args.calls)
+            print(f"\nConnections opened with pool: {client.pool.stats['connections_opened']}")
+
+        print(f"Speedup: {after / before:.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
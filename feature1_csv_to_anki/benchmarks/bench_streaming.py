@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Streaming Request Memory Benchmark
+Measures the tracemalloc peak of one addNotes call carrying a batch of notes
+with embedded media, comparing the in-memory json.dumps body (media
+base64-encoded up front) with the streaming body (media encoded block by
+block from disk while the request is written).
+
+Usage:
+    python benchmarks/bench_streaming.py --notes 500 --media-kb 64
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add repo root to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from feature1_csv_to_anki.core.anki_connect import AnkiConnectClient
+from feature1_csv_to_anki.core.request_stream import Base64Payload
+
+
+class DiscardingHandler(BaseHTTPRequestHandler):
+    """AnkiConnect stand-in that reads the body in chunks and throws it away"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+
+        body = json.dumps({'result': None, 'error': None}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """Start the stand-in server on a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DiscardingHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_media(directory: str, count: int, size: int):
+    """Write `count` random media files of `size` bytes"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"word_{i}.jpg")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def build_notes(paths, streaming: bool):
+    """addNotes payload with one embedded picture per note"""
+    notes = []
+    for i, path in enumerate(paths):
+        if streaming:
+            data = Base64Payload(path=path)
+        else:
+            # What callers had to do before: read and encode everything up front
+            with open(path, 'rb') as f:
+                data = base64.b64encode(f.read()).decode('utf-8')
+        notes.append({
+            'deckName': 'Benchmark',
+            'modelName': 'Basic',
+            'fields': {'Front': f"word {i}", 'Back': f"meaning {i}"},
+            'tags': ['benchmark'],
+            'picture': [{'filename': os.path.basename(path), 'data': data, 'fields': ['Back']}]
+        })
+    return notes
+
+
+def measure(name: str, url: str, paths, streaming: bool):
+    """Build and send one addNotes request, reporting the allocation peak"""
+    with AnkiConnectClient(url, stream_requests=streaming, timeout=60) as client:
+        client.invoke('version')  # open the connection outside the measurement
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        client.invoke('addNotes', notes=build_notes(paths, streaming))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{name:<22} peak {peak / 1024 / 1024:>8.1f} MB   {elapsed:.2f}s")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming AnkiConnect request bodies")
+    parser.add_argument('--notes', type=int, default=500, help='Notes in the batch')
+    parser.add_argument('--media-kb', type=int, default=64, help='Size of each embedded file')
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_media(directory, args.notes, args.media_kb * 1024)
+        total = args.notes * args.media_kb / 1024
+        print(f"{args.notes} notes, {total:.1f} MB of media\n")
+
+        try:
+            before = measure("json.dumps (before)", url, paths, streaming=False)
+            after = measure("streaming", url, paths, streaming=True)
+            print(f"\nPeak memory reduced {before / after:.0f}x")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+"""
+Fake AnkiConnect Server
+Dependency-free AnkiConnect stand-in over an in-memory collection, with
+configurable per-action latency, error rates, connection resets and "busy"
+windows (sync or a modal dialog blocking Anki's main thread)
+
+Usage:
+    # As a library (benchmarks)
+    with FakeAnkiServer(faults=FaultConfig(latency={'addNotes': 0.02})) as server:
+        client = AnkiConnectClient(server.url)
+
+    # As a process, in place of Anki for run.py
+    python benchmarks/fake_anki_server.py --port 8765 --latency '*=0.002' \\
+        --latency addNotes=0.05 --error-rate storeMediaFile=0.05 --busy 10:20
+
+Author: Assistant
+Version: 1.0
+"""
+
+import re
+import sys
+import json
+import time
+import base64
+import random
+import fnmatch
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_MODELS = {
+    'Basic': {'fields': ['Front', 'Back'], 'templates': ['Card 1']},
+    'Basic (and reversed card)': {'fields': ['Front', 'Back'], 'templates': ['Card 1', 'Card 2']},
+    'Cloze': {'fields': ['Text', 'Back Extra'], 'templates': ['Cloze'], 'cloze': True},
+}
+
+CLOZE_PATTERN = re.compile(r'\{\{c(\d+)::')
+
+
+class ActionError(Exception):
+    """Error reported to the client in the response's error field"""
+    pass
+
+
+class FaultConfig:
+    """Latency and failure injection settings (per action, '*' for the default)"""
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None,
+                 latency_per_mb: float = 0.0, jitter: float = 0.0,
+                 error_rates: Optional[Dict[str, float]] = None,
+                 reset_rate: float = 0.0,
+                 busy_windows: Optional[List[Tuple[float, float]]] = None,
+                 busy_mode: str = 'error', seed: Optional[int] = None):
+        """
+        Args:
+            latency: Seconds of processing time per action
+            latency_per_mb: Extra seconds per MB of request body
+            jitter: Random extra latency, as a fraction of the base latency
+            error_rates: Probability of an injected action error per action
+            reset_rate: Probability of dropping the connection without a response
+            busy_windows: (start, end) seconds after server start during which
+                          Anki is busy
+            busy_mode: 'error' answers "collection is not available";
+                       'hang' blocks until the window ends (modal dialog)
+            seed: Random seed for reproducible fault sequences
+        """
+        if busy_mode not in ('error', 'hang'):
+            raise ValueError(f"Unknown busy mode: {busy_mode}")
+        self.latency = dict(latency or {})
+        self.latency_per_mb = latency_per_mb
+        self.jitter = jitter
+        self.error_rates = dict(error_rates or {})
+        self.reset_rate = reset_rate
+        self.busy_windows = list(busy_windows or [])
+        self.busy_mode = busy_mode
+        self.random = random.Random(seed)
+
+    def _lookup(self, table: Dict[str, float], action: str) -> float:
+        return table.get(action, table.get('*', 0.0))
+
+    def delay_for(self, action: str) -> float:
+        base = self._lookup(self.latency, action)
+        if self.jitter:
+            base += base * self.jitter * self.random.random()
+        return base
+
+    def should_fail(self, action: str) -> bool:
+        rate = self._lookup(self.error_rates, action)
+        return rate > 0 and self.random.random() < rate
+
+    def should_reset(self) -> bool:
+        return self.reset_rate > 0 and self.random.random() < self.reset_rate
+
+    def busy_until(self, elapsed: float) -> Optional[float]:
+        """End of the busy window containing `elapsed`, if any"""
+        for start, end in self.busy_windows:
+            if start <= elapsed < end:
+                return end
+        return None
+
+
+class FakeProfile:
+    """In-memory collection of one profile"""
+
+    def __init__(self):
+        self.decks: Dict[str, int] = {'Default': 1}
+        self.models: Dict[str, Dict] = {name: dict(m, id=1000 + i)
+                                        for i, (name, m) in enumerate(DEFAULT_MODELS.items())}
+        self.notes: Dict[int, Dict] = {}
+        self.cards: Dict[int, Dict] = {}
+        self.media: Dict[str, bytes] = {}
+        self.deck_configs: Dict[int, Dict] = {1: {'id': 1, 'name': 'Default', 'new': {'perDay': 20}}}
+        self._first_fields: Dict[Tuple[str, str], int] = {}
+
+
+class FakeCollection:
+    """AnkiConnect action implementations over in-memory profiles"""
+
+    def __init__(self, profiles: Optional[List[str]] = None):
+        self.profiles: Dict[str, FakeProfile] = {name: FakeProfile()
+                                                 for name in (profiles or ['User 1'])}
+        self.current = next(iter(self.profiles))
+        self._next_id = int(time.time() * 1000)
+        self.action_counts: Dict[str, int] = {}
+        # Called before every action, including those inside multi (fault injection)
+        self.before_action = None
+
+    @property
+    def profile(self) -> FakeProfile:
+        return self.profiles[self.current]
+
+    def new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def handle(self, action: str, params: Dict) -> Any:
+        """Run one action, raising ActionError for AnkiConnect-level errors"""
+        self.action_counts[action] = self.action_counts.get(action, 0) + 1
+        if self.before_action is not None:
+            self.before_action(action)
+        method = getattr(self, f"action_{action}", None)
+        if method is None:
+            raise ActionError('unsupported action')
+        try:
+            return method(**params)
+        except TypeError as e:
+            raise ActionError(f"invalid params for {action}: {e}")
+
+    # === Misc ===
+
+    def action_version(self):
+        return 6
+
+    def action_sync(self):
+        return None
+
+    def action_multi(self, actions: List[Dict]):
+        results = []
+        for sub in actions:
+            try:
+                result = self.handle(sub['action'], sub.get('params', {}))
+                results.append({'result': result, 'error': None})
+            except ActionError as e:
+                results.append({'result': None, 'error': str(e)})
+        return results
+
+    def action_getCollectionStatsHTML(self, wholeCollection: bool = True):
+        return f"<p>{len(self.profile.cards)} cards</p>"
+
+    # === Profiles ===
+
+    def action_getProfiles(self):
+        return list(self.profiles)
+
+    def action_loadProfile(self, name: str):
+        if name not in self.profiles:
+            raise ActionError(f"profile was not found: {name}")
+        self.current = name
+        return True
+
+    # === Decks ===
+
+    def action_deckNames(self):
+        return list(self.profile.decks)
+
+    def action_deckNamesAndIds(self):
+        return dict(self.profile.decks)
+
+    def action_createDeck(self, deck: str):
+        decks = self.profile.decks
+        # Parents are created implicitly, as in Anki
+        parts = deck.split('::')
+        for i in range(1, len(parts) + 1):
+            name = '::'.join(parts[:i])
+            if name not in decks:
+                decks[name] = self.new_id()
+        return decks[deck]
+
+    def action_deleteDecks(self, decks: List[str], cardsToo: bool = True):
+        for deck in decks:
+            for name in [d for d in self.profile.decks if d == deck or d.startswith(deck + '::')]:
+                del self.profile.decks[name]
+                for card_id in [c for c, card in self.profile.cards.items() if card['deckName'] == name]:
+                    self._delete_note(self.profile.cards[card_id]['note'])
+
+    def action_changeDeck(self, cards: List[int], deck: str):
+        self.action_createDeck(deck)
+        for card_id in cards:
+            if card_id in self.profile.cards:
+                self.profile.cards[card_id]['deckName'] = deck
+
+    def action_getDeckConfig(self, deck: str):
+        if deck not in self.profile.decks:
+            return False
+        return dict(self.profile.deck_configs[1])
+
+    def action_saveDeckConfig(self, config: Dict):
+        self.profile.deck_configs[config.get('id', 1)] = dict(config)
+        return True
+
+    def action_getDeckStats(self, decks: List[str]):
+        stats = {}
+        for deck in decks:
+            deck_id = self.profile.decks.get(deck)
+            if deck_id is None:
+                continue
+            total = sum(1 for c in self.profile.cards.values() if c['deckName'] == deck)
+            stats[str(deck_id)] = {'deck_id': deck_id, 'name': deck, 'new_count': total,
+                                   'learn_count': 0, 'review_count': 0, 'total_in_deck': total}
+        return stats
+
+    # === Models ===
+
+    def action_modelNames(self):
+        return list(self.profile.models)
+
+    def action_modelNamesAndIds(self):
+        return {name: m['id'] for name, m in self.profile.models.items()}
+
+    def action_modelFieldNames(self, modelName: str):
+        model = self.profile.models.get(modelName)
+        if model is None:
+            raise ActionError(f"model was not found: {modelName}")
+        return list(model['fields'])
+
+    def action_createModel(self, modelName: str, inOrderFields: List[str], css: str = '',
+                           cardTemplates: List[Dict] = None, isCloze: bool = False):
+        if modelName in self.profile.models:
+            raise ActionError('Model name already exists')
+        templates = [t.get('Name', f"Card {i + 1}") for i, t in enumerate(cardTemplates or [{}])]
+        self.profile.models[modelName] = {'id': self.new_id(), 'fields': list(inOrderFields),
+                                          'templates': templates, 'cloze': isCloze}
+        return {'id': self.profile.models[modelName]['id'], 'name': modelName}
+
+    # === Notes ===
+
+    def _validate_note(self, note: Dict) -> Tuple[Dict, str]:
+        model = self.profile.models.get(note.get('modelName'))
+        if model is None:
+            raise ActionError(f"model was not found: {note.get('modelName')}")
+        if note.get('deckName') not in self.profile.decks:
+            raise ActionError(f"deck was not found: {note.get('deckName')}")
+        fields = {name: str(note.get('fields', {}).get(name, '')) for name in model['fields']}
+        first = fields[model['fields'][0]]
+        if not first.strip():
+            raise ActionError('cannot create note because it is empty')
+        allow_duplicate = note.get('options', {}).get('allowDuplicate', False)
+        if not allow_duplicate and (note['modelName'], first) in self.profile._first_fields:
+            raise ActionError('cannot create note because it is a duplicate')
+        return fields, first
+
+    def _add_note(self, note: Dict) -> int:
+        fields, first = self._validate_note(note)
+        model = self.profile.models[note['modelName']]
+        note_id = self.new_id()
+
+        if model.get('cloze'):
+            ordinals = sorted({int(n) for n in CLOZE_PATTERN.findall(fields[model['fields'][0]])}) or [1]
+        else:
+            ordinals = list(range(1, len(model['templates']) + 1))
+
+        card_ids = []
+        for ordinal in ordinals:
+            card_id = self.new_id()
+            self.profile.cards[card_id] = {'cardId': card_id, 'note': note_id, 'ord': ordinal - 1,
+                                           'deckName': note['deckName'],
+                                           'modelName': note['modelName']}
+            card_ids.append(card_id)
+
+        for media_key in ('picture', 'audio', 'video'):
+            for media in note.get(media_key, []) or []:
+                self.action_storeMediaFile(media['filename'], data=media.get('data'),
+                                           path=media.get('path'), url=media.get('url'))
+                for field in media.get('fields', []):
+                    tag = (f'<img src="{media["filename"]}">' if media_key == 'picture'
+                           else f"[sound:{media['filename']}]")
+                    fields[field] = fields.get(field, '') + tag
+
+        self.profile.notes[note_id] = {'noteId': note_id, 'modelName': note['modelName'],
+                                       'tags': list(note.get('tags', [])), 'fields': fields,
+                                       'cards': card_ids}
+        self.profile._first_fields[(note['modelName'], first)] = note_id
+        return note_id
+
+    def _delete_note(self, note_id: int):
+        note = self.profile.notes.pop(note_id, None)
+        if note is None:
+            return
+        first = note['fields'][self.profile.models[note['modelName']]['fields'][0]]
+        if self.profile._first_fields.get((note['modelName'], first)) == note_id:
+            del self.profile._first_fields[(note['modelName'], first)]
+        for card_id in note['cards']:
+            self.profile.cards.pop(card_id, None)
+
+    def action_addNote(self, note: Dict):
+        return self._add_note(note)
+
+    def action_addNotes(self, notes: List[Dict]):
+        # Like current AnkiConnect: fail the whole call if any note is invalid
+        errors = []
+        seen = set()
+        for note in notes:
+            try:
+                _, first = self._validate_note(note)
+                key = (note['modelName'], first)
+                if key in seen and not note.get('options', {}).get('allowDuplicate', False):
+                    raise ActionError('cannot create note because it is a duplicate')
+                seen.add(key)
+                errors.append(None)
+            except ActionError as e:
+                errors.append(str(e))
+        if any(errors):
+            raise ActionError(str(errors))
+        return [self._add_note(note) for note in notes]
+
+    def action_canAddNotes(self, notes: List[Dict]):
+        results = []
+        for note in notes:
+            try:
+                self._validate_note(note)
+                results.append(True)
+            except ActionError:
+                results.append(False)
+        return results
+
+    def action_updateNoteFields(self, note: Dict):
+        stored = self.profile.notes.get(note.get('id'))
+        if stored is None:
+            raise ActionError('note was not found')
+        stored['fields'].update({k: str(v) for k, v in note.get('fields', {}).items()})
+
+    def action_deleteNotes(self, notes: List[int]):
+        for note_id in notes:
+            self._delete_note(note_id)
+
+    def action_notesInfo(self, notes: List[int]):
+        info = []
+        for note_id in notes:
+            note = self.profile.notes.get(note_id)
+            if note is None:
+                info.append({})
+                continue
+            info.append({
+                'noteId': note_id,
+                'modelName': note['modelName'],
+                'tags': list(note['tags']),
+                'fields': {name: {'value': value, 'order': i}
+                           for i, (name, value) in enumerate(note['fields'].items())},
+                'cards': list(note['cards'])
+            })
+        return info
+
+    def action_findNotes(self, query: str):
+        return [note_id for note_id, note in self.profile.notes.items()
+                if self._matches(query, note)]
+
+    # === Cards ===
+
+    def action_findCards(self, query: str):
+        return [card_id for card_id, card in self.profile.cards.items()
+                if self._matches(query, self.profile.notes[card['note']], card['deckName'])]
+
+    def action_cardsInfo(self, cards: List[int]):
+        info = []
+        for card_id in cards:
+            card = self.profile.cards.get(card_id)
+            if card is None:
+                info.append({})
+                continue
+            note = self.profile.notes[card['note']]
+            info.append({
+                'cardId': card_id,
+                'note': card['note'],
+                'deckName': card['deckName'],
+                'modelName': card['modelName'],
+                'ord': card['ord'],
+                'fields': {name: {'value': value, 'order': i}
+                           for i, (name, value) in enumerate(note['fields'].items())},
+                'queue': 0, 'type': 0, 'due': 0, 'interval': 0, 'reps': 0, 'lapses': 0
+            })
+        return info
+
+    def _matches(self, query: str, note: Dict, deck: Optional[str] = None) -> bool:
+        """Subset of Anki search: deck:, tag:, note:, nid:, field:value and bare text"""
+        decks = {deck} if deck else {self.profile.cards[c]['deckName'] for c in note['cards']}
+        for term in re.findall(r'(?:[^\s"]+:)?"[^"]*"|\S+', query or ''):
+            key, sep, value = term.partition(':')
+            if not sep:
+                key, value = None, term
+            value = value.strip('"')
+            if term == '*':
+                continue
+            if key == 'deck':
+                pattern = re.escape(value).replace(r'\*', '.*')
+                if not any(re.fullmatch(f"{pattern}(::.*)?", d, re.IGNORECASE) for d in decks):
+                    return False
+            elif key == 'tag':
+                if not any(fnmatch.fnmatch(t.lower(), value.lower()) for t in note['tags']):
+                    return False
+            elif key == 'note':
+                if note['modelName'] != value:
+                    return False
+            elif key == 'nid':
+                if str(note['noteId']) not in value.split(','):
+                    return False
+            elif key in note['fields']:
+                if not fnmatch.fnmatch(note['fields'][key].lower(), value.lower()):
+                    return False
+            else:
+                needle = (value if key is None else term).lower()
+                if not any(needle in v.lower() for v in note['fields'].values()):
+                    return False
+        return True
+
+    # === Media ===
+
+    def action_storeMediaFile(self, filename: str, data: str = None, path: str = None,
+                              url: str = None, deleteExisting: bool = True):
+        if data is not None:
+            content = base64.b64decode(data)
+        elif path is not None:
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            except OSError as e:
+                raise ActionError(str(e))
+        elif url is not None:
+            raise ActionError('url downloads are not supported by the fake server')
+        else:
+            raise ActionError('You must provide a "data", "path", or "url" field.')
+        if not deleteExisting and filename in self.profile.media:
+            return filename
+        self.profile.media[filename] = content
+        return filename
+
+    def action_retrieveMediaFile(self, filename: str):
+        content = self.profile.media.get(filename)
+        return base64.b64encode(content).decode('ascii') if content is not None else False
+
+    def action_getMediaFilesNames(self, pattern: str = '*'):
+        return [name for name in self.profile.media if fnmatch.fnmatchcase(name, pattern)]
+
+    def action_deleteMediaFile(self, filename: str):
+        self.profile.media.pop(filename, None)
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    """Keep-alive HTTP handler dispatching to the server's collection"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        fake: 'FakeAnkiServer' = self.server.fake
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+
+        if fake.faults.should_reset():
+            # Simulate Anki dropping the connection mid-request
+            self.close_connection = True
+            return
+
+        try:
+            request = json.loads(raw)
+            action = request.get('action')
+            params = request.get('params', {}) or {}
+        except (ValueError, AttributeError) as e:
+            self._reply({'result': None, 'error': f"invalid request: {e}"})
+            return
+
+        response = fake.dispatch(action, params, len(raw))
+        self._reply(response)
+
+    def _reply(self, response: Dict):
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeAnkiServer:
+    """In-process AnkiConnect stand-in"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 collection: Optional[FakeCollection] = None,
+                 faults: Optional[FaultConfig] = None, serialize: bool = True):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            collection: In-memory collection (a fresh one by default)
+            faults: Latency and failure injection
+            serialize: Handle one request at a time, as Anki's main thread does
+        """
+        self.collection = collection or FakeCollection()
+        self.faults = faults or FaultConfig()
+        self.serialize = serialize
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started_at = time.monotonic()
+        self.requests = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), _FakeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.collection.before_action = self._inject
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def dispatch(self, action: str, params: Dict, body_bytes: int) -> Dict:
+        """Apply injected faults and run the action"""
+        if self.serialize:
+            with self._lock:
+                return self._dispatch(action, params, body_bytes)
+        return self._dispatch(action, params, body_bytes)
+
+    def _dispatch(self, action: str, params: Dict, body_bytes: int) -> Dict:
+        self.requests += 1
+        faults = self.faults
+
+        busy_until = faults.busy_until(time.monotonic() - self.started_at)
+        if busy_until is not None:
+            if faults.busy_mode == 'error':
+                return {'result': None, 'error': 'Collection is not available'}
+            time.sleep(max(0.0, self.started_at + busy_until - time.monotonic()))
+
+        transfer = faults.latency_per_mb * body_bytes / (1024 * 1024)
+        if transfer:
+            time.sleep(transfer)
+
+        try:
+            return {'result': self.collection.handle(action, params), 'error': None}
+        except ActionError as e:
+            return {'result': None, 'error': str(e)}
+
+    def _inject(self, action: str):
+        """Per-action latency and injected errors"""
+        delay = self.faults.delay_for(action)
+        if delay:
+            time.sleep(delay)
+        if self.faults.should_fail(action):
+            raise ActionError(f"injected failure in {action}")
+
+    def start(self) -> 'FakeAnkiServer':
+        """Serve in a background thread"""
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def _parse_pairs(values: List[str], option: str) -> Dict[str, float]:
+    pairs = {}
+    for value in values or []:
+        action, sep, number = value.partition('=')
+        if not sep:
+            raise SystemExit(f"{option} expects ACTION=VALUE, got {value!r}")
+        pairs[action] = float(number)
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake AnkiConnect server for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profile', action='append', help='Profile name (repeatable)')
+    parser.add_argument('--latency', action='append', metavar='ACTION=SECONDS',
+                        help="Per-action latency ('*' for all actions)")
+    parser.add_argument('--latency-per-mb', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', action='append', metavar='ACTION=RATE',
+                        help="Per-action injected error probability ('*' for all actions)")
+    parser.add_argument('--reset-rate', type=float, default=0.0,
+                        help='Probability of dropping a connection without answering')
+    parser.add_argument('--busy', action='append', metavar='START:END',
+                        help='Seconds after start during which Anki is busy')
+    parser.add_argument('--busy-mode', choices=['error', 'hang'], default='error')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    busy = []
+    for window in args.busy or []:
+        start, _, end = window.partition(':')
+        busy.append((float(start), float(end)))
+
+    faults = FaultConfig(
+        latency=_parse_pairs(args.latency, '--latency'),
+        latency_per_mb=args.latency_per_mb,
+        jitter=args.jitter,
+        error_rates=_parse_pairs(args.error_rate, '--error-rate'),
+        reset_rate=args.reset_rate,
+        busy_windows=busy,
+        busy_mode=args.busy_mode,
+        seed=args.seed
+    )
+    server = FakeAnkiServer(args.host, args.port, FakeCollection(args.profile), faults)
+    print(f"Fake AnkiConnect listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        counts = server.collection.action_counts
+        print(json.dumps(dict(sorted(counts.items(), key=lambda kv: -kv[1])), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect Trace Replay
+Replays a session recorded with `run.py --trace` against a real Anki or the
+fake AnkiConnect server and prints a per-action timing diff
+
+Usage:
+    python benchmarks/replay_trace.py session.jsonl.gz --fake --mode fast
+    python benchmarks/replay_trace.py session.jsonl --url http://localhost:8765 --mode paced
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# Add repo root and this directory to path for imports
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCH_DIR)))
+sys.path.insert(0, BENCH_DIR)
+
+from feature1_csv_to_anki.core.trace import TraceReplayer, load_trace
+from fake_anki_server import FakeAnkiServer, FakeCollection, FaultConfig, _parse_pairs
+
+
+def print_report(report):
+    print(f"{report['requests']} requests: original {report['original_wall_time']:.2f}s, "
+          f"replay {report['replay_wall_time']:.2f}s\n")
+    print(f"{'action':<22}{'calls':>7}{'orig total':>12}{'replay total':>14}"
+          f"{'orig p95':>10}{'replay p95':>12}{'delta':>9}{'errors +/-':>12}")
+    for action, a in report['actions'].items():
+        delta = f"{a['delta_pct']:+.0f}%" if a['delta_pct'] is not None else 'n/a'
+        print(f"{action:<22}{a['calls']:>7}{a['original']['total']:>11.3f}s"
+              f"{a['replay']['total']:>13.3f}s{a['original']['p95'] * 1000:>8.1f}ms"
+              f"{a['replay']['p95'] * 1000:>10.1f}ms{delta:>9}"
+              f"{a['new_errors']:>6}/{a['fixed_errors']:<5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an AnkiConnect trace")
+    parser.add_argument('trace', help='Trace file recorded with run.py --trace')
+    parser.add_argument('--url', default='http://localhost:8765', help='AnkiConnect URL')
+    parser.add_argument('--fake', action='store_true',
+                        help='Replay against an in-process fake AnkiConnect server')
+    parser.add_argument('--latency', action='append', metavar='ACTION=SECONDS',
+                        help='Latency for the fake server')
+    parser.add_argument('--mode', choices=['fast', 'paced'], default='fast',
+                        help='fast: back to back; paced: original request offsets')
+    parser.add_argument('--speed', type=float, default=1.0, help='Pacing multiplier')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.fake:
+        # Profiles loaded in the trace must exist on the fake server
+        profiles = sorted({r['params'].get('name') for r in load_trace(args.trace)['records']
+                           if r['action'] == 'loadProfile'} - {None}) or None
+        faults = FaultConfig(latency=_parse_pairs(args.latency, '--latency'))
+        server = FakeAnkiServer(collection=FakeCollection(profiles), faults=faults).start()
+        url = server.url
+
+    try:
+        replayer = TraceReplayer(args.trace, url)
+        replayer.replay(args.mode, args.speed)
+        report = replayer.report()
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
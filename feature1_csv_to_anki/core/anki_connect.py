@@ -8,30 +8,365 @@ Version: 3.0
 """
 
 import json
-import urllib.request
-import urllib.error
+import socket
+import http.client
 import time
 from typing import Any, Dict, List, Optional, Union
 import logging
 
+from .connection_pool import ConnectionPool
+from .media_inventory import MediaInventory
+from .metrics import ClientMetrics
+from .request_stream import Base64Payload, StreamingBody, should_stream
+from .resilience import CircuitBreaker, RetryPolicy, TimeoutBudget, is_busy_error, is_idempotent
+
 
 class AnkiConnectError(Exception):
     """Custom exception for AnkiConnect errors"""
     pass
 
 
+class AnkiConnectionError(AnkiConnectError):
+    """Anki could not be reached (transport failure rather than an action error)"""
+
+    def __init__(self, message: str, request_sent: bool = True):
+        super().__init__(message)
+        # False when the request certainly never reached Anki (safe to resend)
+        self.request_sent = request_sent
+
+
+class AnkiBusyError(AnkiConnectionError):
+    """Anki answered but could not run the action right now (sync, locked collection)"""
+
+    def __init__(self, message: str):
+        super().__init__(message, request_sent=False)
+
+
+class CircuitOpenError(AnkiConnectionError):
+    """Anki stayed unresponsive for longer than the circuit breaker's pause limit"""
+
+    def __init__(self, message: str):
+        super().__init__(message, request_sent=False)
+
+
+def parse_response(body: bytes) -> Any:
+    """
+    Decode and validate an AnkiConnect response body
+
+    Args:
+        body: Raw HTTP response body
+
+    Returns:
+        The `result` field
+
+    Raises:
+        AnkiConnectError: If the response is malformed or reports an error
+    """
+    try:
+        response_data = json.loads(body.decode('utf-8'))
+    except json.JSONDecodeError as e:
+        raise AnkiConnectError(f"Invalid JSON response: {e}")
+
+    if response_data.get('error'):
+        logging.error("AnkiConnect trả về lỗi chi tiết: %s", response_data)
+
+    if len(response_data) != 2:
+        raise AnkiConnectError('Response has unexpected number of fields')
+    if 'error' not in response_data:
+        raise AnkiConnectError('Response missing error field')
+    if 'result' not in response_data:
+        raise AnkiConnectError('Response missing result field')
+    if response_data['error'] is not None:
+        raise AnkiConnectError(response_data['error'])
+
+    return response_data['result']
+
+
+def _encode_payload(obj: Any) -> Any:
+    """json.dumps fallback for Base64Payload when streaming is disabled"""
+    if isinstance(obj, Base64Payload):
+        return obj.to_base64()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _copy_result(result: Any) -> Any:
+    """Shallow-copy cached containers so callers cannot mutate the cache"""
+    if isinstance(result, list):
+        return list(result)
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+class DeferredResult:
+    """Result of an action queued in an AnkiBatch, available after the batch is flushed"""
+
+    def __init__(self, batch: 'AnkiBatch', action: str):
+        self.batch = batch
+        self.action = action
+        self._done = False
+        self._result = None
+        self._error = None
+        self._callbacks = []
+
+    def done(self) -> bool:
+        """Whether the batch containing this action has been flushed"""
+        return self._done
+
+    def result(self) -> Any:
+        """
+        Get the action result, flushing the owning batch if still pending
+
+        Raises:
+            AnkiConnectError: If the action failed
+        """
+        if not self._done:
+            self.batch.flush()
+        if self._error is not None:
+            raise AnkiConnectError(self._error)
+        return self._result
+
+    def error(self) -> Optional[str]:
+        """Get the error message, or None if the action succeeded or is pending"""
+        return self._error
+
+    def add_done_callback(self, callback):
+        """Call callback(deferred) once the result is available"""
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def _set(self, result: Any = None, error: Optional[str] = None):
+        self._result = result
+        self._error = error
+        self._done = True
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Batch callback for {self.action} failed: {e}")
+
+
+class AnkiBatch:
+    """
+    Queue of independent actions sent to AnkiConnect as a single `multi` request
+
+    Usage:
+        with client.batch() as batch:
+            deck_id = batch.queue('createDeck', deck='Vocabulary::Lesson')
+        print(deck_id.result())
+
+    The queue is flushed when it reaches max_actions, when an action is queued
+    more than max_delay seconds after the oldest pending one, when a pending
+    result is requested, and when the context exits.
+    """
+
+    def __init__(self, client: 'AnkiConnectClient', max_actions: int = 50,
+                 max_delay: Optional[float] = None):
+        self.client = client
+        self.max_actions = max(1, max_actions)
+        self.max_delay = max_delay
+        self._pending: List[tuple] = []
+        self._oldest = None
+        self.requests_sent = 0
+        self.actions_sent = 0
+
+    def queue(self, action: str, **params) -> DeferredResult:
+        """Queue an action and return its deferred result"""
+        deferred = DeferredResult(self, action)
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append((action, params, deferred))
+
+        if len(self._pending) >= self.max_actions:
+            self.flush()
+        elif self.max_delay is not None and time.monotonic() - self._oldest >= self.max_delay:
+            self.flush()
+
+        return deferred
+
+    def flush(self):
+        """
+        Send all pending actions in one `multi` request
+
+        A single pending action is sent on its own rather than wrapped in a
+        `multi`; its action error is still reported on its deferred result,
+        so flush behaves the same whatever the batch size.
+
+        Raises:
+            AnkiConnectError: If the request itself fails; every pending
+                              result is marked failed before raising
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        actions = [
+            {'action': action, 'version': self.client.version, 'params': params}
+            for action, params, _ in pending
+        ]
+
+        try:
+            if len(actions) == 1:
+                action, params, _ = pending[0]
+                try:
+                    results = [{'result': self.client.invoke(action, **params), 'error': None}]
+                except AnkiConnectionError:
+                    raise
+                except AnkiConnectError as e:
+                    results = [{'result': None, 'error': str(e)}]
+            else:
+                results = self.client.multi(actions)
+        except AnkiConnectError as e:
+            for _, _, deferred in pending:
+                deferred._set(error=str(e))
+            raise
+        finally:
+            self.requests_sent += 1
+            self.actions_sent += len(actions)
+
+        if len(results) != len(pending):
+            error = f"multi returned {len(results)} results for {len(pending)} actions"
+            for _, _, deferred in pending:
+                deferred._set(error=error)
+            raise AnkiConnectError(error)
+
+        for (_, _, deferred), item in zip(pending, results):
+            if isinstance(item, dict) and set(item.keys()) == {'result', 'error'}:
+                deferred._set(item['result'], item['error'])
+            else:
+                deferred._set(item)
+
+    def cancel(self):
+        """Drop pending actions without sending them"""
+        pending, self._pending = self._pending, []
+        for _, _, deferred in pending:
+            deferred._set(error='Batch cancelled')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.cancel()
+
+
+# Read-only metadata actions whose results are cached until a write invalidates them
+CACHEABLE_ACTIONS = {
+    'deckNames', 'deckNamesAndIds', 'modelNames', 'modelNamesAndIds',
+    'modelFieldNames', 'getProfiles', 'version'
+}
+
+# Cached actions that do not depend on the loaded profile
+GLOBAL_ACTIONS = {'getProfiles', 'version'}
+
+_DECK_ACTIONS = {'deckNames', 'deckNamesAndIds'}
+_MODEL_ACTIONS = {'modelNames', 'modelNamesAndIds', 'modelFieldNames'}
+
+# Mutating action -> cached actions it invalidates (None = everything for the profile)
+INVALIDATED_BY = {
+    'createDeck': _DECK_ACTIONS,
+    'deleteDecks': _DECK_ACTIONS,
+    'changeDeck': _DECK_ACTIONS,
+    'createModel': _MODEL_ACTIONS,
+    'modelFieldAdd': _MODEL_ACTIONS,
+    'modelFieldRemove': _MODEL_ACTIONS,
+    'modelFieldRename': _MODEL_ACTIONS,
+    'importPackage': None,
+    'sync': None,
+}
+
+
 class AnkiConnectClient:
     """Client for interacting with AnkiConnect API"""
 
-    def __init__(self, url: str = 'http://localhost:8765', version: int = 6):
+    def __init__(self, url: str = 'http://localhost:8765', version: int = 6,
+                 pool_size: int = 4, idle_timeout: float = 30.0, timeout: float = 10,
+                 cache_metadata: bool = True, stream_requests: bool = True,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 timeout_budget: Optional[TimeoutBudget] = None):
+        """
+        Args:
+            url: AnkiConnect URL
+            version: AnkiConnect API version
+            pool_size: Number of keep-alive connections kept open (0 disables reuse)
+            idle_timeout: Seconds before an idle pooled connection is dropped
+            timeout: Socket timeout in seconds for small requests (the base
+                     of the default timeout budget)
+            cache_metadata: Cache deck/model/profile metadata until a write
+                            through this client invalidates it
+            stream_requests: Serialize large requests (media payloads, long
+                             note lists) incrementally onto the socket
+            retry_policy: When to retry failed calls (RetryPolicy(max_attempts=1)
+                          disables retries)
+            circuit_breaker: Breaker that pauses calls while Anki is unresponsive
+            timeout_budget: Per-action timeouts scaled by request size
+        """
         self.url = url
         self.version = version
+        self.timeout = timeout
+        self.stream_requests = stream_requests
         self.logger = logging.getLogger(__name__)
+        self.pool = ConnectionPool(url, pool_size=pool_size,
+                                   idle_timeout=idle_timeout, timeout=timeout)
+
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.timeout_budget = timeout_budget or TimeoutBudget(base=timeout)
+        self.retry_stats = {'retries': 0, 'busy': 0}
+        self.metrics = ClientMetrics()
+        # Session recorder (see start_trace); None keeps tracing off the hot path
+        self.tracer = None
+
+        # Metadata cache: profile -> {(action, params_json): result}
+        self.cache_metadata = cache_metadata
+        self._cache: Dict[Optional[str], Dict[tuple, Any]] = {}
+        self._cache_profile: Optional[str] = None
+        self.cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+        # Media filename snapshot, created on first use and reset on loadProfile
+        self._media_inventory: Optional[MediaInventory] = None
+
+    def close(self):
+        """Close pooled connections and any active trace"""
+        self.stop_trace()
+        self.pool.close()
+
+    def start_trace(self, path: str):
+        """
+        Record every request sent from now on to a trace file
+
+        Args:
+            path: Trace file (.jsonl, or .jsonl.gz for gzip)
+        """
+        from .trace import TraceRecorder
+        self.stop_trace()
+        self.tracer = TraceRecorder(path, url=self.url, version=self.version)
+
+    def stop_trace(self):
+        """Stop recording and close the trace file"""
+        tracer, self.tracer = self.tracer, None
+        if tracer is not None:
+            tracer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def invoke(self, action: str, **params) -> Any:
         """
         Invoke an AnkiConnect action
 
+        Metadata actions (CACHEABLE_ACTIONS) are answered from the per-profile
+        cache when possible; mutating actions invalidate the affected entries.
+
         Args:
             action: The action to perform
             **params: Parameters for the action
@@ -42,42 +377,211 @@ class AnkiConnectClient:
         Raises:
             AnkiConnectError: If the action fails
         """
-        request_json = json.dumps({
-            'action': action,
-            'version': self.version,
-            'params': params
-        }).encode('utf-8')
+        cache_key = None
+        if self.cache_metadata and action in CACHEABLE_ACTIONS:
+            cache_key = (action, json.dumps(params, sort_keys=True))
+            profile_cache = self._cache.get(self._profile_key(action), {})
+            if cache_key in profile_cache:
+                self.cache_stats['hits'] += 1
+                return _copy_result(profile_cache[cache_key])
+            self.cache_stats['misses'] += 1
 
         try:
-            response = urllib.request.urlopen(
-                urllib.request.Request(
-                    self.url,
-                    request_json,
-                    {'Content-Type': 'application/json'}
-                ),
-                timeout=10
-            )
-
-            response_data = json.loads(response.read().decode('utf-8'))
+            result = self._send_with_retry(action, params)
+        finally:
+            # Invalidate even on failure: the write may have partially applied
+            if self.cache_metadata:
+                self._invalidate_for(action, params)
+
+        self._track_media(action, params, result)
+
+        if action == 'loadProfile' and result:
+            # Metadata cached before the (re)load may be stale
+            self._cache.pop(self._profile_key(action), None)
+            self._cache_profile = params.get('name')
+            self._cache.pop(self._profile_key(action), None)
+            self.cache_stats['invalidations'] += 1
+            self._media_inventory = None
+        elif cache_key is not None:
+            self._cache.setdefault(self._profile_key(action), {})[cache_key] = result
+            result = _copy_result(result)
+
+        return result
+
+    def media_inventory(self) -> MediaInventory:
+        """Get the media filename snapshot for the loaded profile (loaded lazily)"""
+        if self._media_inventory is None:
+            self._media_inventory = MediaInventory(self)
+        return self._media_inventory
+
+    def _track_media(self, action: str, params: Dict, result: Any):
+        """Keep the media inventory in step with media writes"""
+        inventory = self._media_inventory
+        if inventory is None:
+            return
+
+        if action == 'multi':
+            for sub, item in zip(params.get('actions', []), result or []):
+                if isinstance(item, dict) and set(item.keys()) == {'result', 'error'}:
+                    if item['error'] is not None:
+                        continue
+                    item = item['result']
+                self._track_media(sub.get('action'), sub.get('params', {}), item)
+        elif action == 'storeMediaFile':
+            inventory.add(result or params.get('filename'))
+        elif action == 'deleteMediaFile':
+            inventory.discard(params.get('filename'))
+
+    def _profile_key(self, action: str) -> Optional[str]:
+        """Cache partition for an action"""
+        return None if action in GLOBAL_ACTIONS else f"profile:{self._cache_profile}"
+
+    def _invalidate_for(self, action: str, params: Dict):
+        """Drop cached metadata made stale by a mutating action"""
+        if action == 'multi':
+            for sub in params.get('actions', []):
+                self._invalidate_for(sub.get('action'), sub.get('params', {}))
+            return
+        if action not in INVALIDATED_BY:
+            return
+
+        profile_cache = self._cache.get(self._profile_key(action))
+        if not profile_cache:
+            return
+
+        stale_actions = INVALIDATED_BY[action]
+        stale = [key for key in profile_cache
+                 if stale_actions is None or key[0] in stale_actions]
+        for key in stale:
+            del profile_cache[key]
+        if stale:
+            self.cache_stats['invalidations'] += 1
+
+    def clear_cache(self):
+        """Drop all cached metadata"""
+        self._cache.clear()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get metadata cache hit/miss counters"""
+        lookups = self.cache_stats['hits'] + self.cache_stats['misses']
+        return {
+            **self.cache_stats,
+            'hit_rate': self.cache_stats['hits'] / lookups if lookups else 0.0,
+            'entries': sum(len(c) for c in self._cache.values())
+        }
 
-            if response_data.get('error'):
-                logging.error("AnkiConnect trả về lỗi chi tiết: %s", response_data)
+    def _send_with_retry(self, action: str, params: Dict) -> Any:
+        """Send an action through the circuit breaker, retrying transient failures"""
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.before_call():
+                raise CircuitOpenError(
+                    f"Anki has been unresponsive for over "
+                    f"{self.circuit_breaker.pause_limit:.0f}s, giving up on {action}")
+
+            attempt += 1
+            try:
+                result = self._send(action, params)
+            except AnkiConnectionError as e:
+                self.circuit_breaker.record_failure()
+                if isinstance(e, AnkiBusyError):
+                    self.retry_stats['busy'] += 1
+                if not self.retry_policy.should_retry(action, params, attempt, e.request_sent):
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                self.retry_stats['retries'] += 1
+                self.logger.warning(f"{action} failed ({e}), retrying in {delay:.1f}s "
+                                    f"[{attempt}/{self.retry_policy.max_attempts}]")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Anki answered (with an action error) or the caller was interrupted
+                self.circuit_breaker.record_success()
+                raise
+
+            self.circuit_breaker.record_success()
+            return result
+
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Get retry counters and circuit breaker state"""
+        return {**self.retry_stats, 'circuit': self.circuit_breaker.get_stats()}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get per-action request metrics together with cache and retry stats
 
-            if len(response_data) != 2:
-                raise AnkiConnectError('Response has unexpected number of fields')
-            if 'error' not in response_data:
-                raise AnkiConnectError('Response missing error field')
-            if 'result' not in response_data:
-                raise AnkiConnectError('Response missing result field')
-            if response_data['error'] is not None:
-                raise AnkiConnectError(response_data['error'])
+        Returns:
+            Dictionary with actions (calls, latency percentiles, bytes,
+            errors per action), cache and resilience sections
+        """
+        return {
+            'actions': self.metrics.to_dict(),
+            'cache': self.get_cache_stats(),
+            'resilience': self.get_resilience_stats()
+        }
 
-            return response_data['result']
+    def dump_metrics(self, path: str):
+        """Write metrics to path (.prom/.txt for Prometheus text format, else JSON)"""
+        self.metrics.dump(path, extra={
+            'cache': self.get_cache_stats(),
+            'resilience': self.get_resilience_stats()
+        })
 
-        except urllib.error.URLError as e:
-            raise AnkiConnectError(f"Cannot connect to Anki: {e}")
-        except json.JSONDecodeError as e:
-            raise AnkiConnectError(f"Invalid JSON response: {e}")
+    def _send(self, action: str, params: Dict) -> Any:
+        """Send one action to AnkiConnect, bypassing the cache and retries"""
+        request = {
+            'action': action,
+            'version': self.version,
+            'params': params
+        }
+        headers = {'Content-Type': 'application/json'}
+
+        if self.stream_requests and should_stream(params):
+            request_body = StreamingBody(request)
+            headers['Content-Length'] = str(len(request_body))
+        else:
+            request_body = json.dumps(request, default=_encode_payload).encode('utf-8')
+        timeout = self.timeout_budget.for_request(action, params, len(request_body))
+
+        start = time.perf_counter()
+        body = b''
+        result = None
+        error = 'connection'
+        try:
+            try:
+                status, body = self.pool.request('POST', request_body, headers, timeout=timeout,
+                                                 idempotent=is_idempotent(action, params))
+            except (ConnectionRefusedError, socket.gaierror) as e:
+                raise AnkiConnectionError(f"Cannot connect to Anki: {e}", request_sent=False)
+            except socket.timeout:
+                error = 'timeout'
+                raise AnkiConnectionError(f"Anki did not answer {action} within {timeout:.0f}s")
+            except (OSError, http.client.HTTPException) as e:
+                raise AnkiConnectionError(f"Cannot connect to Anki: {e}")
+
+            if status != 200:
+                error = 'http'
+                raise AnkiConnectError(f"Unexpected HTTP status {status}")
+
+            try:
+                result = parse_response(body)
+            except AnkiConnectError as e:
+                if is_busy_error(str(e)):
+                    error = 'busy'
+                    raise AnkiBusyError(f"Anki is busy: {e}")
+                error = 'action'
+                raise
+            error = None
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.record(
+                action, elapsed, len(request_body), len(body), error,
+                [sub.get('action') for sub in params.get('actions', [])] if action == 'multi' else None
+            )
+            if self.tracer is not None:
+                self.tracer.record(action, params, start, elapsed, len(request_body),
+                                   len(body), result, error)
 
     # === Profile Management ===
 
@@ -251,9 +755,20 @@ class AnkiConnectClient:
         Returns:
             Filename of stored file
         """
-        import base64
-        data_b64 = base64.b64encode(data).decode('utf-8')
-        return self.invoke('storeMediaFile', filename=filename, data=data_b64)
+        return self.invoke('storeMediaFile', filename=filename, data=Base64Payload(data=data))
+
+    def store_media_file_from_path(self, filename: str, file_path: str) -> str:
+        """
+        Store a media file in Anki, streaming its base64 encoding from disk
+
+        Args:
+            filename: Name of the file in Anki
+            file_path: Local path of the file
+
+        Returns:
+            Filename of stored file
+        """
+        return self.invoke('storeMediaFile', filename=filename, data=Base64Payload(path=file_path))
 
     def retrieve_media_file(self, filename: str) -> bytes:
         """Retrieve a media file from Anki"""
@@ -375,6 +890,20 @@ class AnkiConnectClient:
         """Execute multiple actions in one request"""
         return self.invoke('multi', actions=actions)
 
+    def batch(self, max_actions: int = 50, max_delay: Optional[float] = None) -> AnkiBatch:
+        """
+        Create a batch that coalesces queued actions into `multi` requests
+
+        Args:
+            max_actions: Flush once this many actions are queued
+            max_delay: Flush when an action is queued this many seconds
+                       after the oldest pending one
+
+        Returns:
+            AnkiBatch usable as a context manager
+        """
+        return AnkiBatch(self, max_actions=max_actions, max_delay=max_delay)
+
     def create_deck_with_notes(self, deck_name: str, notes: List[Dict]) -> Dict:
         """
         Create a deck and add notes in one operation
@@ -490,11 +1019,10 @@ class AnkiConnectClient:
         return stats
 
     def check_media_exists(self, filename: str) -> bool:
-        """Check if a media file exists in collection"""
+        """Check if a media file exists in collection (answered from the media inventory)"""
         try:
-            media_files = self.get_media_files_names(filename)
-            return filename in media_files
-        except:
+            return filename in self.media_inventory()
+        except AnkiConnectError:
             return False
 
     def store_media_from_path(self, file_path: str) -> Optional[str]:
@@ -516,12 +1044,8 @@ class AnkiConnectClient:
                 self.logger.info(f"Media file {filename} already exists")
                 return filename
 
-            # Read file
-            with open(file_path, 'rb') as f:
-                data = f.read()
-
-            # Store in Anki
-            stored_filename = self.store_media_file(filename, data)
+            # Store in Anki, streaming the file from disk
+            stored_filename = self.store_media_file_from_path(filename, file_path)
             self.logger.info(f"Stored media file: {stored_filename}")
 
             return stored_filename
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Async AnkiConnect Client
+asyncio version of AnkiConnectClient with bounded in-flight pipelining, for
+callers that run their own event loop. run.py does not use it: the import
+pipeline is synchronous and gets its concurrency from MediaPipeline threads
+and AnkiBatch multi requests
+
+Author: Assistant
+Version: 1.0
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import ssl
+import time
+import urllib.parse
+from typing import Any, Dict, List, Tuple
+
+from .anki_connect import AnkiConnectError, AnkiConnectionError, _encode_payload, parse_response
+from .resilience import is_idempotent
+
+
+class _StreamConnection:
+    """A keep-alive HTTP/1.1 connection over asyncio streams"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncAnkiConnectClient:
+    """
+    Awaitable client for the AnkiConnect API
+
+    At most max_in_flight requests are outstanding at once; each runs on its
+    own keep-alive connection so independent calls (e.g. media uploads and
+    note lookups) proceed concurrently.
+
+    Usage:
+        async with AsyncAnkiConnectClient() as client:
+            ids = await client.find_notes('deck:Vocabulary')
+
+    This is deliberately a thin transport: unlike AnkiConnectClient it has no
+    retry policy, circuit breaker, metrics or metadata cache, so callers
+    handle AnkiConnectionError themselves. A reset pooled connection is only
+    retried when Anki cannot have received the request or the action is
+    idempotent.
+    """
+
+    def __init__(self, url: str = 'http://localhost:8765', version: int = 6,
+                 max_in_flight: int = 4, timeout: float = 10,
+                 idle_timeout: float = 30.0, ssl_context: ssl.SSLContext = None):
+        """
+        Args:
+            url: AnkiConnect URL (http:// or https://, e.g. behind a reverse proxy)
+            version: AnkiConnect API version
+            max_in_flight: Maximum number of concurrent requests
+            timeout: Per-request timeout in seconds
+            idle_timeout: Seconds before an idle connection is dropped
+            ssl_context: TLS settings for https URLs (default: system trust store)
+        """
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parsed.scheme}")
+        self.url = url
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.path = parsed.path or '/'
+        self.ssl = (ssl_context or ssl.create_default_context()) if parsed.scheme == 'https' else None
+        self.api_version = version
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._semaphore = None
+        self._idle: List[_StreamConnection] = []
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the client can be constructed outside the event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def close(self):
+        """Close idle connections"""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except OSError:
+                pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def invoke(self, action: str, **params) -> Any:
+        """
+        Invoke an AnkiConnect action
+
+        Args:
+            action: The action to perform
+            **params: Parameters for the action
+
+        Returns:
+            The result of the action
+
+        Raises:
+            AnkiConnectError: If the action fails
+        """
+        request_json = json.dumps({
+            'action': action,
+            'version': self.api_version,
+            'params': params
+        }, default=_encode_payload).encode('utf-8')
+
+        async with self._get_semaphore():
+            try:
+                body = await asyncio.wait_for(
+                    self._request(request_json, is_idempotent(action, params)), self.timeout)
+            except asyncio.TimeoutError:
+                raise AnkiConnectionError(f"Timed out after {self.timeout}s waiting for {action}")
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                raise AnkiConnectionError(f"Cannot connect to Anki: {e}")
+
+        return parse_response(body)
+
+    async def _get_connection(self) -> Tuple[_StreamConnection, bool]:
+        """Reuse an idle connection or open a new one"""
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.last_used <= self.idle_timeout and not conn.reader.at_eof():
+                return conn, True
+            conn.close()
+
+        return await self._open_connection(), False
+
+    async def _open_connection(self) -> _StreamConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        return _StreamConnection(reader, writer)
+
+    async def _request(self, request_json: bytes, idempotent: bool = False) -> bytes:
+        """
+        POST the request, retrying once if a reused connection was reset
+        before the request was fully written, or at any point for an
+        idempotent action (a reset while reading may follow its execution)
+        """
+        conn, reused = await self._get_connection()
+        sent = False
+        try:
+            await self._write_request(conn, request_json)
+            sent = True
+            status, body, keep_alive = await self._read_response(conn)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            conn.close()
+            if not reused or (sent and not idempotent):
+                raise
+            self.logger.debug("Pooled connection was reset, reconnecting")
+            conn = await self._open_connection()
+            try:
+                status, body, keep_alive = await self._exchange(conn, request_json)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            # Includes cancellation by wait_for: the stream is in an unknown state
+            conn.close()
+            raise
+
+        if keep_alive and len(self._idle) < self.max_in_flight:
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+        if status != 200:
+            raise AnkiConnectError(f"Unexpected HTTP status {status}")
+        return body
+
+    async def _exchange(self, conn: _StreamConnection,
+                        request_json: bytes) -> Tuple[int, bytes, bool]:
+        """Write one request and read its response"""
+        await self._write_request(conn, request_json)
+        return await self._read_response(conn)
+
+    async def _write_request(self, conn: _StreamConnection, request_json: bytes):
+        head = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(request_json)}\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        ).encode('latin-1')
+        conn.writer.write(head + request_json)
+        await conn.writer.drain()
+
+    async def _read_response(self, conn: _StreamConnection) -> Tuple[int, bytes, bool]:
+        """Read the response to the request just written"""
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before response")
+        parts = status_line.decode('latin-1').split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ValueError(f"Malformed status line: {status_line!r}")
+        http_version, status = parts[0], int(parts[1])
+
+        headers = {}
+        while True:
+            line = await conn.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = (connection != 'close' if http_version == 'HTTP/1.1'
+                      else connection == 'keep-alive')
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked(conn.reader)
+        elif 'content-length' in headers:
+            body = await conn.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await conn.reader.read()
+            keep_alive = False
+
+        return status, body, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip trailers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    # === Profile Management ===
+
+    async def get_profiles(self) -> List[str]:
+        """Get list of available profiles"""
+        return await self.invoke('getProfiles')
+
+    async def load_profile(self, name: str) -> bool:
+        """Load a specific profile"""
+        return await self.invoke('loadProfile', name=name)
+
+    # === Deck Management ===
+
+    async def deck_names(self) -> List[str]:
+        """Get all deck names"""
+        return await self.invoke('deckNames')
+
+    async def deck_names_and_ids(self) -> Dict[str, int]:
+        """Get deck names and their IDs"""
+        return await self.invoke('deckNamesAndIds')
+
+    async def create_deck(self, deck: str) -> int:
+        """Create a new deck"""
+        return await self.invoke('createDeck', deck=deck)
+
+    async def delete_decks(self, decks: List[str], cards_too: bool = True):
+        """Delete decks"""
+        await self.invoke('deleteDecks', decks=decks, cardsToo=cards_too)
+
+    # === Model Management ===
+
+    async def model_names(self) -> List[str]:
+        """Get all model names"""
+        return await self.invoke('modelNames')
+
+    async def model_field_names(self, model_name: str) -> List[str]:
+        """Get field names for a model"""
+        return await self.invoke('modelFieldNames', modelName=model_name)
+
+    async def create_model(self, model_name: str, fields: List[str],
+                           css: str = "", card_templates: List[Dict] = None) -> Dict:
+        """Create a new model"""
+        if card_templates is None:
+            card_templates = [{
+                'Name': 'Card 1',
+                'Front': '{{' + fields[0] + '}}',
+                'Back': '{{FrontSide}}<hr id="answer">{{' + fields[1] + '}}'
+            }]
+
+        return await self.invoke(
+            'createModel',
+            modelName=model_name,
+            inOrderFields=fields,
+            css=css,
+            cardTemplates=card_templates
+        )
+
+    # === Note Management ===
+
+    async def add_note(self, deck_name: str, model_name: str,
+                       fields: Dict[str, str], tags: List[str] = None,
+                       allow_duplicate: bool = False) -> int:
+        """Add a new note"""
+        note = {
+            'deckName': deck_name,
+            'modelName': model_name,
+            'fields': fields,
+            'tags': tags or [],
+            'options': {
+                'allowDuplicate': allow_duplicate
+            }
+        }
+        return await self.invoke('addNote', note=note)
+
+    async def add_notes(self, notes: List[Dict]) -> List[int]:
+        """Add multiple notes"""
+        return await self.invoke('addNotes', notes=notes)
+
+    async def update_note_fields(self, note_id: int, fields: Dict[str, str]):
+        """Update fields of an existing note"""
+        await self.invoke('updateNoteFields', note={'id': note_id, 'fields': fields})
+
+    async def delete_notes(self, notes: List[int]):
+        """Delete notes by ID"""
+        await self.invoke('deleteNotes', notes=notes)
+
+    async def find_notes(self, query: str) -> List[int]:
+        """Find notes matching a query"""
+        return await self.invoke('findNotes', query=query)
+
+    async def notes_info(self, notes: List[int]) -> List[Dict]:
+        """Get detailed info for notes"""
+        return await self.invoke('notesInfo', notes=notes)
+
+    async def can_add_notes(self, notes: List[Dict]) -> List[bool]:
+        """Check if notes can be added (no duplicates)"""
+        return await self.invoke('canAddNotes', notes=notes)
+
+    # === Card Management ===
+
+    async def find_cards(self, query: str) -> List[int]:
+        """Find cards matching a query"""
+        return await self.invoke('findCards', query=query)
+
+    async def cards_info(self, cards: List[int]) -> List[Dict]:
+        """Get detailed info for cards"""
+        return await self.invoke('cardsInfo', cards=cards)
+
+    # === Media Management ===
+
+    async def store_media_file(self, filename: str, data: bytes) -> str:
+        """Store a media file in Anki"""
+        data_b64 = base64.b64encode(data).decode('utf-8')
+        return await self.invoke('storeMediaFile', filename=filename, data=data_b64)
+
+    async def retrieve_media_file(self, filename: str) -> bytes:
+        """Retrieve a media file from Anki"""
+        data_b64 = await self.invoke('retrieveMediaFile', filename=filename)
+        if data_b64:
+            return base64.b64decode(data_b64)
+        return b''
+
+    async def delete_media_file(self, filename: str):
+        """Delete a media file"""
+        await self.invoke('deleteMediaFile', filename=filename)
+
+    async def get_media_files_names(self, pattern: str = "*") -> List[str]:
+        """Get list of media files"""
+        return await self.invoke('getMediaFilesNames', pattern=pattern)
+
+    async def check_media_exists(self, filename: str) -> bool:
+        """Check if a media file exists in collection"""
+        try:
+            return filename in await self.get_media_files_names(filename)
+        except AnkiConnectError:
+            return False
+
+    # === Collection Management ===
+
+    async def sync(self):
+        """Sync collection with AnkiWeb"""
+        await self.invoke('sync')
+
+    async def version(self) -> int:
+        """Get AnkiConnect version"""
+        return await self.invoke('version')
+
+    async def multi(self, actions: List[Dict]) -> List[Any]:
+        """Execute multiple actions in one request"""
+        return await self.invoke('multi', actions=actions)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Media Store
+Keeps downloaded media as immutable blobs named by their sha256 digest in
+sharded directories (objects/ab/cd/<digest>), with a name -> digest index.
+Identical files are stored once no matter how many words or profiles use
+them, and blobs can be hard-linked straight into Anki media directories
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# Written to the store root once the legacy flat cache folders were imported
+LEGACY_MARKER = "legacy_imported"
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file, read in chunks"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore:
+    """
+    Shared media store
+
+    The index is an append-only JSON Lines journal (one {"n": name, "d": digest}
+    entry per change, digest null for a removal) so recording a name is a
+    single small append; it is compacted on load once it has grown to twice
+    the number of live names.
+    """
+
+    def __init__(self, root: Path = Path("media_cache/store")):
+        """
+        Args:
+            root: Store directory (objects/ and index.jsonl live here)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.root / "index.jsonl"
+
+        self._lock = threading.RLock()
+        self.index: Dict[str, str] = {}
+        self._load_index()
+        self._journal = open(self.index_file, 'a', encoding='utf-8')
+
+        self.stats = {'puts': 0, 'dedup_hits': 0, 'dedup_bytes': 0}
+
+        # Called as access_hook(name, hit) when a name is read (hit=True) or
+        # stored (hit=False); CacheManager records access times through it
+        self.access_hook: Optional[Callable[[str, bool], None]] = None
+
+    # -- index -------------------------------------------------------------
+
+    def _load_index(self):
+        entries = 0
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue    # torn final line after a crash
+                    entries += 1
+                    if entry.get('d'):
+                        self.index[entry['n']] = entry['d']
+                    else:
+                        self.index.pop(entry['n'], None)
+        if entries > 2 * len(self.index) + 100:
+            self._compact()
+
+    def _compact(self):
+        temp = self.index_file.with_name(self.index_file.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            for name, digest in self.index.items():
+                f.write(json.dumps({'n': name, 'd': digest}, ensure_ascii=False) + "\n")
+        os.replace(temp, self.index_file)
+
+    def _record(self, name: str, digest: Optional[str]):
+        self._journal.write(json.dumps({'n': name, 'd': digest}, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    # -- blobs -------------------------------------------------------------
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:4] / digest
+
+    def _bind(self, name: str, digest: str, size: int, existed: bool) -> Path:
+        with self._lock:
+            self.stats['puts'] += 1
+            if existed:
+                self.stats['dedup_hits'] += 1
+                self.stats['dedup_bytes'] += size
+            previous = self.index.get(name)
+            if previous != digest:
+                if previous is not None:
+                    self.logger.info(f"Media name {name} now refers to different content "
+                                     f"({previous[:12]} -> {digest[:12]})")
+                self.index[name] = digest
+                self._record(name, digest)
+        if self.access_hook is not None:
+            self.access_hook(name, False)
+        return self.blob_path(digest)
+
+    def put(self, name: str, data: bytes) -> Path:
+        """
+        Store data under a media filename
+
+        Returns:
+            Path of the blob (do not modify it: it may be shared and hard-linked)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        existed = path.exists()
+        if not existed:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+            with open(temp, 'wb') as f:
+                f.write(data)
+            os.replace(temp, path)
+        return self._bind(name, digest, len(data), existed)
+
+    def put_file(self, name: str, source: Path, move: bool = False) -> Path:
+        """
+        Store an existing file under a media filename
+
+        Args:
+            name: Media filename
+            source: File to import
+            move: Move the file into the store instead of copying it
+
+        Returns:
+            Path of the blob
+        """
+        source = Path(source)
+        digest = file_digest(source)
+        path = self.blob_path(digest)
+        existed = path.exists()
+        size = source.stat().st_size
+        if not existed:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+            try:
+                if move:
+                    os.replace(source, temp)
+                else:
+                    os.link(source, temp)
+            except OSError:
+                # Different filesystem
+                shutil.copyfile(source, temp)
+            os.replace(temp, path)
+        if move and source.exists():
+            source.unlink()
+        return self._bind(name, digest, size, existed)
+
+    def path_for(self, name: str) -> Optional[Path]:
+        """Blob path for a media filename, or None if not stored"""
+        with self._lock:
+            digest = self.index.get(name)
+        if digest is None:
+            return None
+        path = self.blob_path(digest)
+        if not path.exists():
+            self.remove(name)
+            return None
+        if self.access_hook is not None:
+            self.access_hook(name, True)
+        return path
+
+    def digest_of(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self.index.get(name)
+
+    def names(self) -> Dict[str, str]:
+        """Snapshot of name -> digest for every stored name"""
+        with self._lock:
+            return dict(self.index)
+
+    def remove(self, name: str):
+        """Forget a name (the blob stays until gc)"""
+        with self._lock:
+            if self.index.pop(name, None) is not None:
+                self._record(name, None)
+
+    def export(self, name: str, target_dir: Path, filename: str = None) -> Optional[Path]:
+        """
+        Hard-link a stored file into a directory (e.g. collection.media),
+        copying when linking is not possible
+
+        Returns:
+            Path of the exported file, or None if the name is not stored
+        """
+        source = self.path_for(name)
+        if source is None:
+            return None
+        target = Path(target_dir) / (filename or name)
+        if target.exists() and os.path.samefile(source, target):
+            return target
+        temp = target.with_name(f".{target.name}.tmp")
+        if temp.exists():
+            temp.unlink()
+        try:
+            os.link(source, temp)
+        except OSError:
+            shutil.copyfile(source, temp)
+        os.replace(temp, target)
+        return target
+
+    def import_directory(self, directory: Path) -> int:
+        """
+        Copy the files of a legacy flat cache directory into the store
+
+        The directory is left as it is (its files may be tracked by git);
+        names the store already has are skipped.
+
+        Returns:
+            Number of files imported
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            return 0
+        imported = 0
+        for path in directory.iterdir():
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            with self._lock:
+                known = path.name in self.index
+            if known:
+                continue
+            self.put_file(path.name, path)
+            imported += 1
+        if imported:
+            self.logger.info(f"Imported {imported} file(s) from {directory} into the media store")
+        return imported
+
+    def import_legacy(self, directories: Iterable[Path]) -> int:
+        """
+        Import legacy flat cache directories once per store
+
+        A marker file in the store root records that the migration ran, so
+        later runs do not rescan the directories.
+
+        Returns:
+            Number of files imported (0 if the migration already ran)
+        """
+        marker = self.root / LEGACY_MARKER
+        if marker.exists():
+            return 0
+        imported = sum(self.import_directory(directory) for directory in directories)
+        marker.write_text(f"{imported}\n", encoding='utf-8')
+        return imported
+
+    def gc(self) -> int:
+        """
+        Delete blobs no name refers to
+
+        Returns:
+            Bytes freed
+        """
+        with self._lock:
+            live = set(self.index.values())
+            freed = 0
+            for path in self.objects.glob('*/*/*'):
+                if path.name not in live and not path.name.startswith('.'):
+                    freed += path.stat().st_size
+                    path.unlink()
+            self._journal.close()
+            self._compact()
+            self._journal = open(self.index_file, 'a', encoding='utf-8')
+        return freed
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Store size and dedup figures
+
+        logical_bytes counts every name's file; stored_bytes counts each blob
+        once, so their difference is what dedup saves on disk.
+        """
+        with self._lock:
+            index = dict(self.index)
+            stats = dict(self.stats)
+        sizes = {}
+        for digest in set(index.values()):
+            try:
+                sizes[digest] = self.blob_path(digest).stat().st_size
+            except OSError:
+                pass
+        logical = sum(sizes.get(d, 0) for d in index.values())
+        stored = sum(sizes.values())
+        return {
+            'names': len(index),
+            'blobs': len(sizes),
+            'logical_bytes': logical,
+            'stored_bytes': stored,
+            'saved_bytes': logical - stored,
+            **stats
+        }
+
+    def close(self):
+        with self._lock:
+            if not self._journal.closed:
+                self._journal.close()
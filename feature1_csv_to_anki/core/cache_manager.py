@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Media Cache Manager
+Keeps the local media store under a byte and file-count cap. Reads and
+writes of stored names are recorded (last access, hit count) in a small
+SQLite access registry, media used by recent imports is pinned, and the
+least recently (LRU) or least frequently (LFU) used blobs are evicted first
+
+Author: Assistant
+Version: 1.0
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS access (
+    name         TEXT PRIMARY KEY,
+    last_access  REAL NOT NULL,
+    hits         INTEGER NOT NULL DEFAULT 0,
+    pinned_until REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+POLICIES = ('lru', 'lfu')
+
+# Upper bounds (days since last access) of the age histogram buckets
+AGE_BUCKETS = ((1, '< 1 day'), (7, '< 1 week'), (30, '< 1 month'), (90, '< 3 months'),
+               (float('inf'), 'older'))
+
+
+class CacheManager:
+    """Access tracking, pinning and capped eviction for a BlobStore"""
+
+    def __init__(self, store, path: Path, max_bytes: int = 2 * 1024 ** 3,
+                 max_files: int = 50000, policy: str = 'lru', pin_days: float = 7):
+        """
+        Args:
+            store: BlobStore to manage (its access_hook is taken over)
+            path: SQLite file with access times and hit counters
+            max_bytes: Cap on the bytes of stored blobs (0: no cap)
+            max_files: Cap on the number of stored blobs (0: no cap)
+            policy: 'lru' (oldest access first) or 'lfu' (fewest hits first)
+            pin_days: How long media of an import stays exempt from eviction
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.policy = policy
+        self.pin_days = pin_days
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+        # Accesses are buffered in memory and written by flush()
+        self._pending: Dict[str, List[float]] = {}
+        self._counts = {'hits': 0, 'stores': 0}
+        self.session = {'hits': 0, 'stores': 0}
+        store.access_hook = self.record_access
+
+    def record_access(self, name: str, hit: bool):
+        """BlobStore access hook: a name was read (hit) or stored"""
+        now = time.time()
+        with self._lock:
+            entry = self._pending.setdefault(name, [now, 0])
+            entry[0] = now
+            key = 'hits' if hit else 'stores'
+            if hit:
+                entry[1] += 1
+            self._counts[key] += 1
+            self.session[key] += 1
+
+    def flush(self):
+        """Write buffered accesses and counters in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            counts, self._counts = self._counts, {'hits': 0, 'stores': 0}
+            if not pending and not any(counts.values()):
+                return
+            self._db.executemany(
+                "INSERT INTO access (name, last_access, hits) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_access = MAX(last_access, excluded.last_access), "
+                "hits = hits + excluded.hits",
+                [(name, last_access, hits) for name, (last_access, hits) in pending.items()]
+            )
+            self._db.executemany(
+                "INSERT INTO counters (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                list(counts.items())
+            )
+            self._db.commit()
+
+    def pin(self, names: Iterable[str], days: float = None):
+        """Exempt names (e.g. media of the current import) from eviction for a while"""
+        until = time.time() + 86400 * (self.pin_days if days is None else days)
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO access (name, last_access, pinned_until) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET pinned_until = MAX(pinned_until, excluded.pinned_until)",
+                [(name, time.time(), until) for name in names]
+            )
+            self._db.commit()
+
+    def _blobs(self) -> Dict[str, Dict]:
+        """
+        Stored blobs with what eviction needs to know
+
+        Returns:
+            digest -> {'names', 'size', 'last_access', 'hits', 'pinned'}; a
+            blob shared by several names uses their latest access, summed
+            hits, and is pinned if any of them is
+        """
+        self.flush()
+        with self._lock:
+            access = {name: (last_access, hits, pinned_until) for name, last_access, hits, pinned_until
+                      in self._db.execute("SELECT name, last_access, hits, pinned_until FROM access")}
+        now = time.time()
+        blobs: Dict[str, Dict] = {}
+        for name, digest in self.store.names().items():
+            blob = blobs.get(digest)
+            if blob is None:
+                try:
+                    size = self.store.blob_path(digest).stat().st_size
+                except OSError:
+                    continue
+                blob = blobs[digest] = {'names': [], 'size': size, 'last_access': 0.0,
+                                        'hits': 0, 'pinned': False}
+            # Names stored before tracking started count as accessed at their file time
+            last_access, hits, pinned_until = access.get(name, (None, 0, 0))
+            if last_access is None:
+                try:
+                    last_access = self.store.blob_path(digest).stat().st_mtime
+                except OSError:
+                    last_access = 0.0
+            blob['names'].append(name)
+            blob['last_access'] = max(blob['last_access'], last_access)
+            blob['hits'] += hits
+            blob['pinned'] = blob['pinned'] or pinned_until > now
+        return blobs
+
+    def evict(self, dry_run: bool = False) -> Dict:
+        """
+        Evict unpinned blobs until the store is within both caps
+
+        Args:
+            dry_run: Only report what would be evicted
+
+        Returns:
+            Files and bytes before/after, names evicted and bytes freed
+        """
+        blobs = self._blobs()
+        files = len(blobs)
+        total = sum(b['size'] for b in blobs.values())
+        report = {'files_before': files, 'bytes_before': total, 'evicted': [], 'freed_bytes': 0,
+                  'dry_run': dry_run}
+
+        def over() -> bool:
+            return (self.max_bytes and total > self.max_bytes) or (self.max_files and files > self.max_files)
+
+        if over():
+            key = ((lambda b: (b['hits'], b['last_access'])) if self.policy == 'lfu'
+                   else (lambda b: b['last_access']))
+            for blob in sorted((b for b in blobs.values() if not b['pinned']), key=key):
+                if not over():
+                    break
+                report['evicted'].extend(blob['names'])
+                report['freed_bytes'] += blob['size']
+                total -= blob['size']
+                files -= 1
+
+            if not dry_run and report['evicted']:
+                for name in report['evicted']:
+                    self.store.remove(name)
+                self.store.gc()
+                with self._lock:
+                    self._db.executemany("DELETE FROM access WHERE name = ?",
+                                         [(name,) for name in report['evicted']])
+                    self._db.commit()
+                self.logger.info(f"Evicted {len(report['evicted'])} media file(s), "
+                                 f"{report['freed_bytes'] / 1024 / 1024:.1f} MB")
+            if over():
+                self.logger.warning("Media cache is still over its cap: everything left is pinned")
+
+        report['files_after'], report['bytes_after'] = files, total
+        return report
+
+    def get_stats(self) -> Dict:
+        """
+        Cache report: size against the caps, hit rate and an age histogram
+
+        hit_rate is reads served from the store over reads plus stores
+        (every store follows a miss), lifetime and for this session.
+        """
+        with self._lock:
+            session = dict(self.session)
+        blobs = self._blobs()
+        with self._lock:
+            counters = dict(self._db.execute("SELECT key, value FROM counters"))
+
+        now = time.time()
+        histogram = {label: {'files': 0, 'bytes': 0} for _, label in AGE_BUCKETS}
+        for blob in blobs.values():
+            age_days = (now - blob['last_access']) / 86400
+            label = next(label for bound, label in AGE_BUCKETS if age_days < bound)
+            histogram[label]['files'] += 1
+            histogram[label]['bytes'] += blob['size']
+
+        def rate(counts: Dict[str, int]) -> Optional[float]:
+            reads = counts.get('hits', 0) + counts.get('stores', 0)
+            return counts.get('hits', 0) / reads if reads else None
+
+        return {
+            'files': len(blobs),
+            'bytes': sum(b['size'] for b in blobs.values()),
+            'names': sum(len(b['names']) for b in blobs.values()),
+            'pinned': sum(1 for b in blobs.values() if b['pinned']),
+            'max_files': self.max_files,
+            'max_bytes': self.max_bytes,
+            'policy': self.policy,
+            'hits': counters.get('hits', 0),
+            'stores': counters.get('stores', 0),
+            'hit_rate': rate(counters),
+            'session_hit_rate': rate(session),
+            'age_histogram': histogram,
+        }
+
+    def close(self):
+        self.flush()
+        if self.store.access_hook == self.record_access:
+            self.store.access_hook = None
+        with self._lock:
+            self._db.close()
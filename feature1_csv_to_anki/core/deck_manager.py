@@ -59,13 +59,23 @@ class DeckManager:
 
         deck_ids = {}
 
-        # Create all decks
-        for deck_type, deck_name in deck_structure.items():
-            try:
-                deck_id = self.create_deck(deck_name)
-                deck_ids[deck_type] = deck_id
-            except Exception as e:
-                self.logger.error(f"Failed to create {deck_type} deck: {e}")
+        # Create all decks in a single multi request
+        try:
+            with self.anki_client.batch() as batch:
+                pending = {
+                    deck_type: batch.queue('createDeck', deck=deck_name)
+                    for deck_type, deck_name in deck_structure.items()
+                }
+        except Exception as e:
+            self.logger.error(f"Failed to create deck structure for {lesson_name}: {e}")
+            return deck_ids
+
+        for deck_type, deferred in pending.items():
+            if deferred.error() is None:
+                deck_ids[deck_type] = deferred.result()
+                self.logger.info(f"Created/verified deck: {deck_structure[deck_type]} (ID: {deck_ids[deck_type]})")
+            else:
+                self.logger.error(f"Failed to create {deck_type} deck: {deferred.error()}")
 
         return deck_ids
 
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Image Normalizer
+Downscales provider images to the size cards actually display, strips EXIF
+and re-encodes them as optimized progressive JPEG (or WebP) under a byte
+budget. Encoding runs in a process pool so it does not hold the GIL while
+the download threads keep working
+
+Author: Assistant
+Version: 1.0
+"""
+
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+
+FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+# Quality steps tried when an encode is over the byte budget
+QUALITY_STEPS = (85, 75, 65, 55, 45)
+
+
+def normalize_image(data: bytes, box: Tuple[int, int] = (500, 400), fmt: str = 'JPEG',
+                    quality: int = 85, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Resize, strip metadata and re-encode one image
+
+    Args:
+        data: Encoded source image
+        box: Bounding box (width, height); aspect ratio is kept, never upscaled
+        fmt: 'JPEG' or 'WEBP'
+        quality: Starting encoder quality
+        max_bytes: Lower quality (then size) until the result fits
+
+    Returns:
+        Encoded image; the original data if re-encoding would not make it
+        smaller and it already fits the box
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        had_metadata = bool(source.info.get('exif')) or bool(source.getexif())
+        source_format = source.format
+        # Apply the EXIF orientation before the tag is dropped
+        image = ImageOps.exif_transpose(source)
+        fits = image.width <= box[0] and image.height <= box[1]
+        image.thumbnail(box, Image.LANCZOS)
+
+        if image.mode not in ('RGB', 'L'):
+            # Flatten transparency onto white (JPEG has no alpha)
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.split()[-1])
+
+    qualities = [q for q in QUALITY_STEPS if q < quality]
+    qualities.insert(0, quality)
+    while True:
+        for q in qualities:
+            buffer = io.BytesIO()
+            if fmt == 'WEBP':
+                image.save(buffer, format='WEBP', quality=q, method=4)
+            else:
+                image.save(buffer, format='JPEG', quality=q, optimize=True, progressive=True)
+            encoded = buffer.getvalue()
+            if not max_bytes or len(encoded) <= max_bytes:
+                break
+        if not max_bytes or len(encoded) <= max_bytes or min(image.size) < 64:
+            break
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS)
+
+    if (fits and not had_metadata and len(encoded) >= len(data)
+            and source_format == fmt and (not max_bytes or len(data) <= max_bytes)):
+        return data
+    return encoded
+
+
+class ImageNormalizer:
+    """Runs normalize_image in a process pool and tracks bytes saved"""
+
+    def __init__(self, box: Tuple[int, int] = (500, 400), fmt: str = 'JPEG',
+                 quality: int = 85, max_bytes: Optional[int] = None, workers: int = 2):
+        """
+        Args:
+            box: Bounding box (width, height) in pixels
+            fmt: 'JPEG' or 'WEBP'
+            quality: Starting encoder quality
+            max_bytes: Byte budget per image
+            workers: Processes in the pool (0 encodes in the calling thread)
+        """
+        fmt = fmt.upper()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported image format: {fmt}")
+        self.box = tuple(box)
+        self.format = fmt
+        self.extension = FORMATS[fmt]
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {'images': 0, 'failed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError) as e:
+                    self.logger.warning(f"No process pool for image normalization, encoding in-process: {e}")
+                    self.workers = 0
+            return self._executor
+
+    def normalize(self, data: bytes) -> bytes:
+        """
+        Normalize one image (blocks until done; safe to call from many threads)
+
+        Returns:
+            The normalized image, or the original data if it could not be decoded
+        """
+        args = (data, self.box, self.format, self.quality, self.max_bytes)
+        try:
+            pool = self._pool()
+            if pool is not None:
+                result = pool.submit(normalize_image, *args).result()
+            else:
+                result = normalize_image(*args)
+        except Exception as e:
+            self.logger.warning(f"Image normalization failed, keeping original: {e}")
+            with self._lock:
+                self.stats['failed'] += 1
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died; start a fresh pool on the next call
+                    self._executor = None
+            return data
+
+        with self._lock:
+            self.stats['images'] += 1
+            self.stats['bytes_in'] += len(data)
+            self.stats['bytes_out'] += len(result)
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, 'bytes_saved': self.stats['bytes_in'] - self.stats['bytes_out']}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'images': 0, 'failed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -14,15 +14,19 @@ import logging
 import time
 from pathlib import Path
 from typing import Optional, Tuple, List
-from gtts import gTTS
-from PIL import Image, ImageDraw, ImageFont
-import io
+
+from .blob_store import BlobStore
+from .stream_download import StreamingDownloader
+from .text_image import render_text_image
+from .tts import TTSEngine
+from shared.config import Config
 
 
 class MediaDownloader:
     """Download and manage media files for Anki cards"""
 
-    def __init__(self, anki_client=None):
+    def __init__(self, anki_client=None, store: BlobStore = None,
+                 max_download_size: int = 2 * 1024 * 1024, tts: TTSEngine = None):
         self.logger = logging.getLogger(__name__)
         self.anki_client = anki_client
 
@@ -40,32 +44,39 @@ class MediaDownloader:
             'langeek': 1.0
         }
 
-        # Local cache directories
-        self.image_cache = Path("media_cache/images")
-        self.audio_cache = Path("media_cache/audio")
-        self.image_cache.mkdir(parents=True, exist_ok=True)
-        self.audio_cache.mkdir(parents=True, exist_ok=True)
+        # Size-capped streaming image downloads
+        self.fetcher = StreamingDownloader(max_bytes=max_download_size)
+
+        # Content-addressed local media store
+        self.store = store or BlobStore(Path("media_cache/store"))
+        self.store.import_legacy((Path("media_cache/images"), Path("media_cache/audio")))
+
+        # Speech speed comes from the media.audio_speed setting
+        self.tts = tts or TTSEngine(speed=Config().get('media.audio_speed', 'normal'), store=self.store)
+
+        # Active AnkiBatch while download_media_batch runs
+        self._upload_batch = None
 
     def download_image(self, word: str, part_of_speech: str = None,
                        vietnamese: str = None) -> Optional[str]:
         """Download image and store in Anki, returns just the filename"""
         filename = f"{word.lower().replace(' ', '_')}.jpg"
-        local_path = self.image_cache / filename
 
         # Check if already in Anki
         if self.anki_client and self._check_media_exists(filename):
             self.logger.info(f"Image already in Anki: {filename}")
             return filename
 
-        # Check local cache
-        if local_path.exists():
+        # Check local store
+        local_path = self.store.path_for(filename)
+        if local_path is not None:
             self.logger.info(f"Using cached image: {local_path}")
             # Upload to Anki from cache
             if self.anki_client:
                 with open(local_path, 'rb') as f:
                     image_data = f.read()
                 try:
-                    self.anki_client.store_media_file(filename, image_data)
+                    self._store_media(filename, image_data)
                     return filename
                 except Exception as e:
                     self.logger.error(f"Failed to store in Anki: {e}")
@@ -92,14 +103,13 @@ class MediaDownloader:
 
         if image_data:
             try:
-                # Save to local cache
-                with open(local_path, 'wb') as f:
-                    f.write(image_data)
+                # Save to local store
+                local_path = self.store.put(filename, image_data)
                 self.logger.info(f"Saved image locally: {local_path}")
 
                 # Store in Anki
                 if self.anki_client:
-                    stored_filename = self.anki_client.store_media_file(filename, image_data)
+                    self._store_media(filename, image_data)
                     return filename  # Return just the filename, not the full path
 
                 return filename
@@ -112,22 +122,22 @@ class MediaDownloader:
     def download_audio(self, word: str, pronunciation: str = None) -> Optional[str]:
         """Download audio and store in Anki, returns just the filename"""
         filename = f"{word.lower().replace(' ', '_')}.mp3"
-        local_path = self.audio_cache / filename
 
         # Check if already in Anki
         if self.anki_client and self._check_media_exists(filename):
             self.logger.info(f"Audio already in Anki: {filename}")
             return filename
 
-        # Check local cache
-        if local_path.exists():
+        # Check local store
+        local_path = self.store.path_for(filename)
+        if local_path is not None:
             self.logger.info(f"Using cached audio: {local_path}")
             # Upload to Anki from cache
             if self.anki_client:
                 with open(local_path, 'rb') as f:
                     audio_data = f.read()
                 try:
-                    self.anki_client.store_media_file(filename, audio_data)
+                    self._store_media(filename, audio_data)
                     return filename
                 except Exception as e:
                     self.logger.error(f"Failed to store in Anki: {e}")
@@ -135,20 +145,16 @@ class MediaDownloader:
 
         # Generate new audio
         try:
-            # Use normal speed instead of slow for better quality
-            tts = gTTS(text=word, lang='en', slow=False)
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_data = audio_buffer.getvalue()
-
-            # Save to local cache
-            with open(local_path, 'wb') as f:
-                f.write(audio_data)
+            audio_data, extension, _ = self.tts.synthesize(word)
+            filename = f"{filename.rsplit('.', 1)[0]}.{extension}"
+
+            # Save to local store
+            local_path = self.store.put(filename, audio_data)
             self.logger.info(f"Saved audio locally: {local_path}")
 
             # Store in Anki
             if self.anki_client:
-                stored_filename = self.anki_client.store_media_file(filename, audio_data)
+                self._store_media(filename, audio_data)
                 return filename  # Return just the filename, not the full path
 
             return filename
@@ -157,6 +163,24 @@ class MediaDownloader:
             self.logger.error(f"Failed to generate audio for {word}: {e}")
             return None
 
+    def _store_media(self, filename: str, data: bytes):
+        """Store media in Anki, queueing it when a batch is active"""
+        if self._upload_batch is not None:
+            from .request_stream import Base64Payload
+            deferred = self._upload_batch.queue(
+                'storeMediaFile',
+                filename=filename,
+                data=Base64Payload(data=data)
+            )
+
+            def log_failure(d):
+                if d.error() is not None:
+                    self.logger.error(f"Failed to store {filename} in Anki: {d.error()}")
+
+            deferred.add_done_callback(log_failure)
+            return
+        self.anki_client.store_media_file(filename, data)
+
     def _check_media_exists(self, filename: str) -> bool:
         """Check if media file already exists in Anki"""
         try:
@@ -239,10 +263,10 @@ class MediaDownloader:
                                 break
 
                     if photo_url:
-                        img_response = requests.get(photo_url, timeout=15)
-                        if img_response.status_code == 200:
+                        image_data = self.fetcher.fetch(photo_url)
+                        if image_data:
                             self.logger.info(f"Found image on Langeek for: {word}")
-                            return img_response.content, word_info
+                            return image_data, word_info
 
         except Exception as e:
             self.logger.debug(f"Langeek API error for {word}: {e}")
@@ -268,10 +292,10 @@ class MediaDownloader:
                     photo = data['photos'][0]
                     img_url = photo['src']['medium']
 
-                    img_response = requests.get(img_url, timeout=15)
-                    if img_response.status_code == 200:
+                    image_data = self.fetcher.fetch(img_url)
+                    if image_data:
                         self.logger.info(f"Found image on Pexels for: {search_term}")
-                        return img_response.content
+                        return image_data
 
         except Exception as e:
             self.logger.debug(f"Pexels API error: {e}")
@@ -301,10 +325,10 @@ class MediaDownloader:
                     photo = data['results'][0]
                     img_url = photo['urls']['small']
 
-                    img_response = requests.get(img_url, timeout=15)
-                    if img_response.status_code == 200:
+                    image_data = self.fetcher.fetch(img_url)
+                    if image_data:
                         self.logger.info(f"Found image on Unsplash for: {search_term}")
-                        return img_response.content
+                        return image_data
 
         except Exception as e:
             self.logger.debug(f"Unsplash API error: {e}")
@@ -333,10 +357,10 @@ class MediaDownloader:
                     image = data['hits'][0]
                     img_url = image['webformatURL']
 
-                    img_response = requests.get(img_url, timeout=15)
-                    if img_response.status_code == 200:
+                    image_data = self.fetcher.fetch(img_url)
+                    if image_data:
                         self.logger.info(f"Found image on Pixabay for: {search_term}")
-                        return img_response.content
+                        return image_data
 
         except Exception as e:
             self.logger.debug(f"Pixabay API error: {e}")
@@ -345,46 +369,7 @@ class MediaDownloader:
 
     def _create_text_image(self, word: str, vietnamese: str = None) -> bytes:
         """Create a text-based image as fallback"""
-        # Create image
-        width, height = 400, 300
-        img = Image.new('RGB', (width, height), color='#667eea')
-        draw = ImageDraw.Draw(img)
-
-        # Try to use a nice font, fallback to default
-        try:
-            font_large = ImageFont.truetype("arial.ttf", 48)
-            font_small = ImageFont.truetype("arial.ttf", 24)
-        except:
-            font_large = ImageFont.load_default()
-            font_small = ImageFont.load_default()
-
-        # Draw word
-        word_upper = word.upper()
-        bbox = draw.textbbox((0, 0), word_upper, font=font_large)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-
-        x = (width - text_width) // 2
-        y = height // 3
-
-        draw.text((x, y), word_upper, font=font_large, fill='white')
-
-        # Draw Vietnamese meaning if available
-        if vietnamese:
-            viet_text = vietnamese[:30] + "..." if len(vietnamese) > 30 else vietnamese
-            bbox = draw.textbbox((0, 0), viet_text, font=font_small)
-            viet_width = bbox[2] - bbox[0]
-
-            x_viet = (width - viet_width) // 2
-            y_viet = y + text_height + 20
-
-            draw.text((x_viet, y_viet), viet_text, font=font_small, fill='#FFD700')
-
-        # Convert to bytes
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='JPEG', quality=85)
-
-        return img_buffer.getvalue()
+        return render_text_image(word, vietnamese)
 
     def download_media_batch(self, words_data: List[dict]) -> dict:
         """
@@ -406,6 +391,32 @@ class MediaDownloader:
 
         start_time = time.time()
 
+        if self.anki_client:
+            self._upload_batch = self.anki_client.batch(max_actions=20)
+
+        try:
+            self._download_words(words_data, stats)
+        finally:
+            batch, self._upload_batch = self._upload_batch, None
+            if batch is not None:
+                try:
+                    batch.flush()
+                except Exception as e:
+                    self.logger.error(f"Media upload batch failed: {e}")
+
+        stats['total_time'] = time.time() - start_time
+
+        self.logger.info(
+            f"Media download complete: "
+            f"{stats['images_downloaded']} images, "
+            f"{stats['audio_downloaded']} audio files "
+            f"in {stats['total_time']:.1f}s"
+        )
+
+        return stats
+
+    def _download_words(self, words_data: List[dict], stats: dict):
+        """Download image and audio for each word, updating stats in place"""
         for word_data in words_data:
             word = word_data.get('word', '')
 
@@ -438,15 +449,4 @@ class MediaDownloader:
                     stats['audio_failed'] += 1
             except Exception as e:
                 self.logger.error(f"Error downloading audio for {word}: {e}")
-                stats['audio_failed'] += 1
-
-        stats['total_time'] = time.time() - start_time
-
-        self.logger.info(
-            f"Media download complete: "
-            f"{stats['images_downloaded']} images, "
-            f"{stats['audio_downloaded']} audio files "
-            f"in {stats['total_time']:.1f}s"
-        )
-
-        return stats
\ No newline at end of file
+                stats['audio_failed'] += 1
\ No newline at end of file
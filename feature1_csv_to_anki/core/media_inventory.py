@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Media Inventory
+Snapshot of the filenames in a profile's Anki media collection, loaded once
+and kept up to date as files are stored, so existence checks cost no round trip
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Set
+
+
+class MediaInventory:
+    """Set of media filenames known to exist in the current Anki profile"""
+
+    def __init__(self, anki_client=None, media_dir: Optional[Path] = None):
+        """
+        Args:
+            anki_client: AnkiConnectClient used when the media directory is unknown
+            media_dir: Profile's collection.media directory (scanned directly if set)
+        """
+        if anki_client is None and media_dir is None:
+            raise ValueError("MediaInventory needs an anki_client or a media_dir")
+
+        self.anki_client = anki_client
+        self.media_dir = Path(media_dir) if media_dir else None
+        self.logger = logging.getLogger(__name__)
+
+        self._names: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+        self.source = None
+        self.loaded_at = None
+        self.load_time = 0.0
+
+    def load(self):
+        """Load the full filename set (one directory scan or one API call)"""
+        start = time.perf_counter()
+
+        if self.media_dir is not None and self.media_dir.is_dir():
+            with os.scandir(self.media_dir) as entries:
+                names = {entry.name for entry in entries if entry.is_file()}
+            source = 'scandir'
+        else:
+            names = set(self.anki_client.get_media_files_names('*'))
+            source = 'ankiconnect'
+
+        with self._lock:
+            self._names = names
+            self.source = source
+            self.loaded_at = time.time()
+            self.load_time = time.perf_counter() - start
+
+        self.logger.info(f"Loaded media inventory: {len(names)} files via {source} "
+                         f"in {self.load_time:.2f}s")
+
+    def _ensure_loaded(self):
+        if self._names is None:
+            self.load()
+
+    def __contains__(self, filename: str) -> bool:
+        self._ensure_loaded()
+        return filename in self._names
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._names)
+
+    def add(self, filename: str):
+        """Record a file that was just stored"""
+        with self._lock:
+            if self._names is not None:
+                self._names.add(filename)
+
+    def update(self, filenames: Iterable[str]):
+        """Record several stored files"""
+        with self._lock:
+            if self._names is not None:
+                self._names.update(filenames)
+
+    def discard(self, filename: str):
+        """Record a file that was deleted"""
+        with self._lock:
+            if self._names is not None:
+                self._names.discard(filename)
+
+    def invalidate(self):
+        """Forget the snapshot; the next lookup reloads it"""
+        with self._lock:
+            self._names = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get inventory statistics"""
+        return {
+            'loaded': self._names is not None,
+            'files': len(self._names) if self._names is not None else 0,
+            'source': self.source,
+            'load_time': self.load_time
+        }
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Media Acquisition Pipeline
+Fetches media for many words concurrently while keeping every provider within
+its politeness limits (token-bucket rate plus a concurrency cap), and hands
+results back in the original word order
+
+Author: Assistant
+Version: 1.0
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# rate: requests per second, burst: bucket size, concurrency: requests in flight.
+# Rates match the fixed delays the downloader used to sleep between calls.
+DEFAULT_PROVIDER_LIMITS = {
+    'langeek': {'rate': 1.0, 'burst': 1, 'concurrency': 1},
+    'pexels': {'rate': 2.0, 'burst': 2, 'concurrency': 2},
+    'unsplash': {'rate': 2.0, 'burst': 2, 'concurrency': 2},
+    'pixabay': {'rate': 2.0, 'burst': 2, 'concurrency': 2},
+    'gtts': {'rate': 4.0, 'burst': 4, 'concurrency': 3},
+}
+
+HEDGE_POLICIES = ('preference', 'first')
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (requests allowed back to back)
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            # Sleep outside the lock so other providers' callers are not blocked
+            time.sleep(delay)
+            waited += delay
+
+
+class ProviderLimiter:
+    """Per-provider token buckets and concurrency caps"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Args:
+            limits: provider -> {rate, burst, concurrency}; each entry is
+                    merged over the provider's default, so it may set only
+                    some keys; providers not listed are unlimited
+        """
+        self.limits = {name: dict(l) for name, l in DEFAULT_PROVIDER_LIMITS.items()}
+        for name, l in (limits or {}).items():
+            self.limits.setdefault(name, {}).update(l)
+        self._buckets = {name: TokenBucket(l.get('rate', 1.0), int(l.get('burst', 1)))
+                         for name, l in self.limits.items()}
+        self._slots = {name: threading.BoundedSemaphore(max(1, int(l.get('concurrency', 1))))
+                       for name, l in self.limits.items()}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def slot(self, provider: str):
+        """Hold one of the provider's concurrency slots and one rate token"""
+        semaphore = self._slots.get(provider)
+        bucket = self._buckets.get(provider)
+        start = time.monotonic()
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            if bucket is not None:
+                bucket.acquire()
+            waited = time.monotonic() - start
+            with self._lock:
+                s = self.stats.setdefault(provider, {'calls': 0, 'wait_seconds': 0.0})
+                s['calls'] += 1
+                s['wait_seconds'] += waited
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def acquire(self, provider: str):
+        """Take a rate token without holding a concurrency slot"""
+        bucket = self._buckets.get(provider)
+        if bucket is not None:
+            bucket.acquire()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(s) for name, s in self.stats.items()}
+
+
+class MediaPipeline:
+    """
+    Ordered concurrent map over a worker pool
+
+    Usage:
+        pipeline = MediaPipeline(workers=8)
+        for word, outcome in pipeline.map(fetch, words):
+            ...   # outcome is fetch(word) or the exception it raised
+
+    Results are yielded in input order as soon as each one (and all before
+    it) is ready, so the caller can upload word N while later words are
+    still downloading. At most `window` items are in flight at a time.
+    """
+
+    def __init__(self, workers: int = 8, window: Optional[int] = None):
+        """
+        Args:
+            workers: Worker threads (1 runs everything on one worker)
+            window: Maximum submitted-but-unconsumed items (default 4 x workers)
+        """
+        self.workers = max(1, workers)
+        self.window = window or self.workers * 4
+        self.logger = logging.getLogger(__name__)
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Apply func to every item concurrently
+
+        Yields:
+            (item, result) pairs in input order; result is the exception
+            instance if func raised
+        """
+        def guarded(item):
+            try:
+                return func(item)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.workers,
+                                thread_name_prefix='media') as executor:
+            pending = deque()
+            source = iter(items)
+            exhausted = False
+            try:
+                while True:
+                    while not exhausted and len(pending) < self.window:
+                        try:
+                            item = next(source)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        pending.append((item, executor.submit(guarded, item)))
+                    if not pending:
+                        return
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            finally:
+                # Consumer stopped early: drop work that has not started
+                for _, future in pending:
+                    future.cancel()
+
+
+class HedgedLookup:
+    """
+    Query several providers at once and keep one answer
+
+    Each attempt is called with a threading.Event that is set once a winner
+    is chosen; attempts should check it before expensive follow-up work (such
+    as downloading the image they found). Attempts that have not started yet
+    are cancelled outright.
+
+    Policies:
+        preference: take the most preferred provider that returned a result.
+                    Once any result is in, wait at most `grace` seconds for
+                    more preferred providers that are still running.
+        first:      take whichever result arrives first.
+    """
+
+    def __init__(self, preference: List[str], policy: str = 'preference',
+                 grace: float = 0.5, timeout: float = 20.0, max_workers: int = 16):
+        """
+        Args:
+            preference: Provider names, most preferred first
+            policy: 'preference' or 'first'
+            grace: Seconds to wait for a more preferred provider after the first result
+            timeout: Overall deadline for one lookup
+            max_workers: Threads shared by all lookups
+        """
+        if policy not in HEDGE_POLICIES:
+            raise ValueError(f"Unknown hedge policy: {policy}")
+        self.preference = list(preference)
+        self.policy = policy
+        self.grace = grace
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                            thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'misses': 0, 'timeouts': 0, 'cancelled': 0, 'wins': {}}
+
+    def _rank(self, name: str) -> int:
+        return self.preference.index(name) if name in self.preference else len(self.preference)
+
+    def run(self, attempts: Dict[str, Callable[[threading.Event], Any]],
+            preference: Optional[List[str]] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Run all attempts concurrently
+
+        Args:
+            attempts: provider -> callable(cancel_event) returning a result or
+                      None; exceptions count as None
+            preference: Provider order for this lookup (default: self.preference)
+
+        Returns:
+            (result, provider), or (None, None) if no attempt succeeded in time
+        """
+        cancel = threading.Event()
+        futures = {self._executor.submit(fn, cancel): name for name, fn in attempts.items()}
+        if preference is not None:
+            order = sorted(attempts, key=lambda n: preference.index(n) if n in preference else len(preference))
+        else:
+            order = sorted(attempts, key=self._rank)
+        results: Dict[str, Any] = {}
+        deadline = time.monotonic() + self.timeout
+        grace_deadline = None
+        winner = None
+        timed_out = False
+        pending = set(futures)
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                timed_out = True
+                break
+            limit = deadline if grace_deadline is None else min(deadline, grace_deadline)
+            done, pending = wait(pending, timeout=max(0.0, limit - now),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    self.logger.debug(f"Hedged attempt {futures[future]} failed: {e}")
+                    results[futures[future]] = None
+
+            if self.policy == 'first':
+                winner = next((n for n in order if results.get(n) is not None), None)
+            else:
+                if grace_deadline is None and any(r is not None for r in results.values()):
+                    grace_deadline = time.monotonic() + self.grace
+                grace_over = grace_deadline is not None and time.monotonic() >= grace_deadline
+                for name in order:
+                    if name not in results:
+                        if grace_over:
+                            continue
+                        break       # a more preferred provider is still running
+                    if results[name] is not None:
+                        winner = name
+                        break
+            if winner is not None:
+                break
+
+        # Stop the losers: unstarted ones never run, running ones see the event
+        cancel.set()
+        cancelled = sum(1 for f in pending if f.cancel() or not f.done())
+
+        with self._lock:
+            self.stats['lookups'] += 1
+            self.stats['cancelled'] += cancelled
+            if winner is None:
+                self.stats['misses'] += 1
+                if timed_out:
+                    self.stats['timeouts'] += 1
+            else:
+                self.stats['wins'][winner] = self.stats['wins'].get(winner, 0) + 1
+
+        if winner is None:
+            return None, None
+        return results[winner], winner
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'wins': dict(self.stats['wins'])}
+
+    def close(self):
+        """Stop accepting lookups; running attempts finish in the background"""
+        self._executor.shutdown(wait=False)
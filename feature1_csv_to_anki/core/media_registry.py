@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Media Registry
+SQLite (WAL) record of the media files uploaded to each Anki profile and of
+each profile's collection.media location. Every change is a single-row
+write instead of a rewrite of the whole registry, batches of changes can
+share one transaction, and the old JSON registry is migrated on first use
+
+Author: Assistant
+Version: 1.0
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id             INTEGER PRIMARY KEY,
+    name           TEXT NOT NULL UNIQUE,
+    anki_media_dir TEXT
+);
+CREATE TABLE IF NOT EXISTS media (
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    filename   TEXT NOT NULL,
+    word       TEXT,
+    source     TEXT,
+    added_date TEXT NOT NULL,
+    metadata   TEXT NOT NULL DEFAULT '{}',
+    verified   INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (profile_id, filename)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS media_word ON media (profile_id, word);
+CREATE INDEX IF NOT EXISTS media_source ON media (profile_id, source);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Profile that owned the media of v1 (single-profile) JSON registries
+V1_PROFILE = 'User 1'
+
+
+class MediaRegistry:
+    """Thread-safe registry of uploaded media, partitioned by profile"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: SQLite database file
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._profile_ids: Dict[str, int] = {}
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def batch(self):
+        """
+        Group writes into one transaction (nestable)
+
+        The registry lock is held for the whole block, so writes from other
+        threads wait for it instead of joining the transaction. The block's
+        writes are committed when the outermost block exits, or rolled back
+        if it raises.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._db.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._db.execute("ROLLBACK")
+                    # Profiles created in the transaction are gone too
+                    self._profile_ids.clear()
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._db.execute("COMMIT")
+
+    def _write(self, sql: str, params: Tuple = ()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def _profile_id(self, profile: str) -> int:
+        with self._lock:
+            profile_id = self._profile_ids.get(profile)
+            if profile_id is None:
+                self._db.execute("INSERT OR IGNORE INTO profiles (name) VALUES (?)", (profile,))
+                profile_id = self._db.execute("SELECT id FROM profiles WHERE name = ?",
+                                              (profile,)).fetchone()[0]
+                self._profile_ids[profile] = profile_id
+            return profile_id
+
+    def _touch(self):
+        self._write("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+                    (datetime.now().isoformat(),))
+
+    def profiles(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT name FROM profiles ORDER BY name")]
+
+    def get_media_dir(self, profile: str) -> Optional[str]:
+        """collection.media path recorded for a profile"""
+        with self._lock:
+            row = self._db.execute("SELECT anki_media_dir FROM profiles WHERE name = ?",
+                                   (profile,)).fetchone()
+        return row[0] if row else None
+
+    def set_media_dir(self, profile: str, media_dir: Optional[str]):
+        with self._lock:
+            self._write("UPDATE profiles SET anki_media_dir = ? WHERE id = ?",
+                        (media_dir, self._profile_id(profile)))
+            self._touch()
+
+    def contains(self, profile: str, filename: str, verified_only: bool = False) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM media m JOIN profiles p ON p.id = m.profile_id "
+                "WHERE p.name = ? AND m.filename = ?" + (" AND m.verified = 1" if verified_only else ""),
+                (profile, filename)
+            ).fetchone() is not None
+
+    def filenames(self, profile: str) -> Dict[str, bool]:
+        """filename -> verified flag of every file registered for a profile"""
+        with self._lock:
+            return {filename: bool(verified) for filename, verified in self._db.execute(
+                "SELECT m.filename, m.verified FROM media m JOIN profiles p ON p.id = m.profile_id "
+                "WHERE p.name = ?", (profile,)
+            )}
+
+    def add(self, profile: str, filename: str, metadata: Dict[str, Any] = None,
+            verified: bool = True, added_date: str = None):
+        """Register (or re-register) a file for a profile"""
+        self.add_many(profile, [(filename, metadata, verified, added_date)])
+
+    def add_many(self, profile: str,
+                 entries: Iterable[Tuple[str, Optional[Dict[str, Any]], bool, Optional[str]]]):
+        """
+        Register many files in one transaction
+
+        Args:
+            profile: Profile name
+            entries: (filename, metadata, verified, added_date or None for now)
+        """
+        now = datetime.now().isoformat()
+        with self.batch():
+            profile_id = self._profile_id(profile)
+            rows = []
+            for filename, metadata, verified, added_date in entries:
+                metadata = metadata or {}
+                rows.append((profile_id, filename, metadata.get('word'), metadata.get('source'),
+                             added_date or now, json.dumps(metadata, ensure_ascii=False),
+                             int(bool(verified))))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO media "
+                "(profile_id, filename, word, source, added_date, metadata, verified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._touch()
+
+    def remove(self, profile: str, filename: str) -> bool:
+        """
+        Returns:
+            True if the file was registered
+        """
+        with self.batch():
+            cursor = self._write("DELETE FROM media WHERE profile_id = ? AND filename = ?",
+                                 (self._profile_id(profile), filename))
+            if cursor.rowcount:
+                self._touch()
+            return cursor.rowcount > 0
+
+    def remove_many(self, profile: str, filenames: Iterable[str]) -> int:
+        """
+        Returns:
+            Number of entries deleted
+        """
+        with self.batch():
+            profile_id = self._profile_id(profile)
+            cursor = self._db.executemany("DELETE FROM media WHERE profile_id = ? AND filename = ?",
+                                          [(profile_id, f) for f in filenames])
+            if cursor.rowcount:
+                self._touch()
+            return max(cursor.rowcount, 0)
+
+    def set_verified_many(self, profile: str, filenames: Iterable[str], verified: bool):
+        with self.batch():
+            profile_id = self._profile_id(profile)
+            self._db.executemany("UPDATE media SET verified = ? WHERE profile_id = ? AND filename = ?",
+                                 [(int(verified), profile_id, f) for f in filenames])
+            self._touch()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._write("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get(self, profile: str, filename: str) -> Optional[Dict[str, Any]]:
+        """Registry entry of a file (added_date, metadata, verified), or None"""
+        rows = self._select(profile, "m.filename = ?", (filename,))
+        return rows[0] if rows else None
+
+    def find(self, profile: str, word: str = None, source: str = None) -> List[Dict[str, Any]]:
+        """Entries of a profile, optionally filtered by word and/or source"""
+        clauses, params = [], []
+        if word is not None:
+            clauses.append("m.word = ?")
+            params.append(word)
+        if source is not None:
+            clauses.append("m.source = ?")
+            params.append(source)
+        return self._select(profile, " AND ".join(clauses) or "1", tuple(params))
+
+    def _select(self, profile: str, where: str, params: Tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT m.filename, m.added_date, m.metadata, m.verified "
+                "FROM media m JOIN profiles p ON p.id = m.profile_id "
+                f"WHERE p.name = ? AND {where} ORDER BY m.filename", (profile, *params)
+            ).fetchall()
+        return [{'filename': filename, 'added_date': added_date,
+                 'metadata': json.loads(metadata), 'verified': bool(verified)}
+                for filename, added_date, metadata, verified in rows]
+
+    def get_stats(self, profile: str) -> Dict[str, Any]:
+        with self._lock:
+            total, verified = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(m.verified), 0) "
+                "FROM media m JOIN profiles p ON p.id = m.profile_id WHERE p.name = ?", (profile,)
+            ).fetchone()
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'last_updated'").fetchone()
+        return {'total_files': total, 'verified_files': verified,
+                'last_updated': row[0] if row else None}
+
+    def migrate_json(self, json_file: Path) -> int:
+        """
+        Import a v1 ({'media': ...}) or v2 ({'profiles': ...}) JSON registry
+
+        The JSON file is renamed to *.migrated afterwards so it is imported
+        only once.
+
+        Returns:
+            Number of media entries imported
+        """
+        json_file = Path(json_file)
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if isinstance(data, dict) and 'profiles' not in data:
+            profiles = {V1_PROFILE: {'media': data.get('media', {}),
+                                     'anki_media_dir': data.get('anki_media_dir')}}
+        else:
+            profiles = data.get('profiles', {})
+
+        imported = 0
+        with self.batch():
+            for profile, profile_data in profiles.items():
+                self._profile_id(profile)
+                if profile_data.get('anki_media_dir') and not self.get_media_dir(profile):
+                    self.set_media_dir(profile, profile_data['anki_media_dir'])
+                media = profile_data.get('media', {})
+                self.add_many(profile, (
+                    (filename, entry.get('metadata'), entry.get('verified', True), entry.get('added_date'))
+                    for filename, entry in media.items()
+                ))
+                imported += len(media)
+
+        json_file.replace(json_file.with_name(json_file.name + '.migrated'))
+        self.logger.info(f"Migrated {imported} media entries from {json_file}")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Media Uploader
+Moves cached media files into a profile's Anki collection using the cheapest
+available strategy:
+
+- hardlink: link the cached file into collection.media (no bytes copied)
+- copy:     copy the cached file into collection.media
+- path:     let AnkiConnect read the file itself (storeMediaFile path=...)
+- data:     send the file base64-encoded through storeMediaFile (fallback)
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import shutil
+import logging
+import urllib.parse
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from .anki_connect import AnkiConnectError, AnkiConnectionError
+from .request_stream import Base64Payload
+
+
+UPLOAD_STRATEGIES = ('hardlink', 'copy', 'path', 'data')
+
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+class MediaUploader:
+    """Upload media files to Anki with a strategy selected per profile"""
+
+    def __init__(self, anki_client=None, media_dir: Optional[Path] = None,
+                 strategies: Sequence[str] = UPLOAD_STRATEGIES):
+        """
+        Args:
+            anki_client: AnkiConnectClient (needed for the path and data strategies)
+            media_dir: Profile's collection.media directory, if detected
+            strategies: Strategies to consider, in order of preference
+        """
+        self.anki_client = anki_client
+        self.media_dir = Path(media_dir) if media_dir else None
+        self.logger = logging.getLogger(__name__)
+
+        unknown = set(strategies) - set(UPLOAD_STRATEGIES)
+        if unknown:
+            raise ValueError(f"Unknown upload strategies: {sorted(unknown)}")
+
+        self.strategies = [s for s in strategies if self._is_available(s)]
+        # AnkiConnect strategies are tried synchronously once before being batched
+        self._verified = set()
+        self.counts: Dict[str, int] = {s: 0 for s in UPLOAD_STRATEGIES}
+
+    def _is_available(self, strategy: str) -> bool:
+        if strategy in ('hardlink', 'copy'):
+            return (self.media_dir is not None and self.media_dir.is_dir()
+                    and os.access(self.media_dir, os.W_OK))
+        if strategy == 'path':
+            # Anki must be able to open our local path
+            host = urllib.parse.urlsplit(getattr(self.anki_client, 'url', '')).hostname
+            return self.anki_client is not None and host in LOCAL_HOSTS
+        return self.anki_client is not None
+
+    @property
+    def preferred_strategy(self) -> Optional[str]:
+        """The strategy that will be tried first"""
+        return self.strategies[0] if self.strategies else None
+
+    def upload(self, file_path: Path, filename: str, batch=None,
+               on_done: Optional[Callable[[str, Optional[str]], None]] = None) -> Optional[str]:
+        """
+        Upload a file, falling back through the available strategies
+
+        Args:
+            file_path: Local file to upload
+            filename: Name of the file in Anki's media collection
+            batch: Optional AnkiBatch to queue AnkiConnect uploads into
+            on_done: Called as on_done(strategy, error) once the upload has
+                     completed (error is None on success); for queued uploads
+                     this happens when the batch is flushed
+
+        Returns:
+            Name of the strategy used (the upload may still be pending if it
+            was queued into the batch), or None if every strategy failed
+        """
+        for strategy in list(self.strategies):
+            try:
+                if strategy == 'hardlink':
+                    self._place_in_media_dir(file_path, filename, link=True)
+                elif strategy == 'copy':
+                    self._place_in_media_dir(file_path, filename, link=False)
+                elif batch is not None and strategy in self._verified:
+                    self._queue(batch, strategy, file_path, filename, on_done)
+                    return strategy
+                else:
+                    self.anki_client.invoke('storeMediaFile', filename=filename,
+                                            **self._store_params(strategy, file_path))
+                    self._verified.add(strategy)
+            except AnkiConnectionError:
+                raise
+            except (OSError, AnkiConnectError) as e:
+                self.logger.warning(f"Upload strategy '{strategy}' failed for {filename}: {e}")
+                if strategy in ('hardlink', 'path') and strategy not in self._verified:
+                    # e.g. cross-device link or an AnkiConnect without path support
+                    self.strategies.remove(strategy)
+                continue
+
+            self.counts[strategy] += 1
+            if on_done is not None:
+                on_done(strategy, None)
+            return strategy
+
+        return None
+
+    def _queue(self, batch, strategy: str, file_path: Path, filename: str,
+               on_done: Optional[Callable[[str, Optional[str]], None]]):
+        deferred = batch.queue('storeMediaFile', filename=filename,
+                               **self._store_params(strategy, file_path))
+
+        def finished(d):
+            if d.error() is None:
+                self.counts[strategy] += 1
+            if on_done is not None:
+                on_done(strategy, d.error())
+
+        deferred.add_done_callback(finished)
+
+    @staticmethod
+    def _store_params(strategy: str, file_path: Path) -> Dict[str, Any]:
+        if strategy == 'path':
+            return {'path': str(Path(file_path).resolve())}
+        return {'data': Base64Payload(path=str(file_path))}
+
+    def _place_in_media_dir(self, file_path: Path, filename: str, link: bool):
+        """Atomically place a file into collection.media, replacing any old copy"""
+        target = self.media_dir / filename
+        if link and target.exists() and os.path.samefile(file_path, target):
+            return      # already linked to this exact blob
+        temp = self.media_dir / f".{filename}.tmp"
+        if temp.exists():
+            temp.unlink()
+        if link:
+            os.link(file_path, temp)
+        else:
+            shutil.copyfile(file_path, temp)
+        os.replace(temp, target)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Uploads completed per strategy"""
+        return {s: n for s, n in self.counts.items() if n}
+
+    def reset_stats(self):
+        self.counts = {s: 0 for s in UPLOAD_STRATEGIES}
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect Client Metrics
+Per-action call counts, latency histograms, payload sizes and errors, exported
+as a dict, JSON or Prometheus text format
+
+Author: Assistant
+Version: 1.0
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# Latency bucket upper bounds in seconds: 0.5ms growing by 1.5x up to ~10 minutes
+LATENCY_BUCKETS = tuple(round(0.0005 * 1.5 ** i, 6) for i in range(35))
+
+
+class Histogram:
+    """Fixed-bucket histogram with interpolated percentiles"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-quantile (0..1) by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class ActionMetrics:
+    """Counters for one AnkiConnect action"""
+
+    def __init__(self):
+        self.calls = 0
+        self.batched = 0          # times the action was sent inside a multi
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.errors: Dict[str, int] = {}
+        self.latency = Histogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'batched': self.batched,
+            'errors': sum(self.errors.values()),
+            'errors_by_kind': dict(self.errors),
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency': {
+                'total': round(self.latency.total, 6),
+                'mean': round(self.latency.total / self.latency.count, 6) if self.latency.count else 0.0,
+                'p50': round(self.latency.percentile(0.50), 6),
+                'p95': round(self.latency.percentile(0.95), 6),
+                'p99': round(self.latency.percentile(0.99), 6),
+                'max': round(self.latency.max, 6)
+            }
+        }
+
+
+class ClientMetrics:
+    """Thread-safe metrics registry for an AnkiConnectClient"""
+
+    def __init__(self):
+        self._actions: Dict[str, ActionMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, action: str) -> ActionMetrics:
+        metrics = self._actions.get(action)
+        if metrics is None:
+            metrics = self._actions[action] = ActionMetrics()
+        return metrics
+
+    def record(self, action: str, elapsed: float, request_bytes: int,
+               response_bytes: int = 0, error: Optional[str] = None,
+               sub_actions: Optional[List[str]] = None):
+        """
+        Record one request sent to AnkiConnect
+
+        Args:
+            action: Action name
+            elapsed: Wall time of the HTTP exchange in seconds
+            request_bytes: Request body size
+            response_bytes: Response body size (0 if none was received)
+            error: Error kind (connection, timeout, busy, http, action) or None
+            sub_actions: Actions carried by a multi request
+        """
+        with self._lock:
+            metrics = self._get(action)
+            metrics.calls += 1
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes
+            metrics.latency.observe(elapsed)
+            if error is not None:
+                metrics.errors[error] = metrics.errors.get(error, 0) + 1
+            for sub_action in sub_actions or ():
+                self._get(sub_action).batched += 1
+
+    def reset(self):
+        with self._lock:
+            self._actions.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Per-action metrics, busiest (by total latency) first"""
+        with self._lock:
+            items = sorted(self._actions.items(), key=lambda kv: -kv[1].latency.total)
+            return {action: metrics.to_dict() for action, metrics in items}
+
+    def to_json(self, extra: Optional[Dict[str, Any]] = None) -> str:
+        """JSON document with per-action metrics plus any extra sections"""
+        return json.dumps({'actions': self.to_dict(), **(extra or {})}, indent=2)
+
+    def to_prometheus(self, prefix: str = 'ankiconnect') -> str:
+        """Prometheus text exposition format"""
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        with self._lock:
+            actions = sorted(self._actions.items())
+
+            metric('requests_total', 'counter', 'Requests sent per action')
+            for action, m in actions:
+                lines.append(f'{prefix}_requests_total{{action="{action}"}} {m.calls}')
+
+            metric('batched_actions_total', 'counter', 'Actions sent inside multi requests')
+            for action, m in actions:
+                if m.batched:
+                    lines.append(f'{prefix}_batched_actions_total{{action="{action}"}} {m.batched}')
+
+            metric('errors_total', 'counter', 'Failed requests per action and error kind')
+            for action, m in actions:
+                for kind, n in sorted(m.errors.items()):
+                    lines.append(f'{prefix}_errors_total{{action="{action}",kind="{kind}"}} {n}')
+
+            metric('request_bytes_total', 'counter', 'Request body bytes per action')
+            for action, m in actions:
+                lines.append(f'{prefix}_request_bytes_total{{action="{action}"}} {m.request_bytes}')
+
+            metric('response_bytes_total', 'counter', 'Response body bytes per action')
+            for action, m in actions:
+                lines.append(f'{prefix}_response_bytes_total{{action="{action}"}} {m.response_bytes}')
+
+            metric('request_duration_seconds', 'histogram', 'Request latency per action')
+            for action, m in actions:
+                if not m.latency.count:
+                    continue
+                cumulative = 0
+                for bound, n in zip(m.latency.bounds, m.latency.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_request_duration_seconds_bucket'
+                                 f'{{action="{action}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{prefix}_request_duration_seconds_bucket'
+                             f'{{action="{action}",le="+Inf"}} {m.latency.count}')
+                lines.append(f'{prefix}_request_duration_seconds_sum'
+                             f'{{action="{action}"}} {m.latency.total:.6f}')
+                lines.append(f'{prefix}_request_duration_seconds_count'
+                             f'{{action="{action}"}} {m.latency.count}')
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path, extra: Optional[Dict[str, Any]] = None):
+        """
+        Write metrics to a file
+
+        Args:
+            path: Output file; .prom or .txt selects Prometheus format, anything else JSON
+            extra: Additional sections for the JSON output (e.g. cache stats)
+        """
+        path = Path(path)
+        if path.suffix in ('.prom', '.txt'):
+            text = self.to_prometheus()
+        else:
+            text = self.to_json(extra)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
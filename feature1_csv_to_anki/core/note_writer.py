@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Chunked Note Writer
+Adds notes through addNotes in adaptively sized chunks, isolating bad notes
+by bisection instead of falling back to one addNote call per note
+
+Author: Assistant
+Version: 1.0
+"""
+
+import logging
+import time
+from typing import Dict, List, Any
+
+from .anki_connect import AnkiConnectError, AnkiConnectionError, CircuitOpenError
+from .request_stream import json_length
+
+
+class ChunkedNoteWriter:
+    """Write notes to Anki in chunks sized from observed latency and payload"""
+
+    def __init__(self, anki_client, max_chunk: int = 50, min_chunk: int = 1,
+                 target_latency: float = 2.0, max_payload_bytes: int = 8 * 1024 * 1024,
+                 max_resends: int = 2):
+        """
+        Args:
+            anki_client: AnkiConnectClient instance
+            max_chunk: Upper bound on notes per addNotes call (processing.batch_size)
+            min_chunk: Lower bound on notes per addNotes call
+            target_latency: Desired seconds per addNotes call
+            max_payload_bytes: Upper bound on the JSON size of one call
+            max_resends: Times a chunk lost to a transport error is checked
+                         and sent again
+        """
+        self.anki_client = anki_client
+        self.max_chunk = max(1, max_chunk)
+        self.min_chunk = max(1, min(min_chunk, self.max_chunk))
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.max_resends = max(0, max_resends)
+        self.logger = logging.getLogger(__name__)
+
+        # Chunk size carries over between calls so later files start tuned
+        self.chunk_size = self.max_chunk
+        self._seconds_per_note = None
+        self._bytes_per_note = None
+
+    def add_notes(self, notes: List[Dict], skip_existing: bool = False) -> Dict[str, Any]:
+        """
+        Add notes, splitting failing chunks until the bad notes are isolated
+
+        A chunk whose call fails in transit is checked with canAddNotes and
+        the notes Anki does not have are sent again; later chunks are still
+        sent (the client's circuit breaker holds them while Anki is down),
+        and once the breaker gives up the remaining notes are returned
+        unwritten instead of being dropped.
+
+        Args:
+            notes: Notes in AnkiConnect addNotes format
+            skip_existing: Leave out notes their deck already has (used when
+                           a partially imported file is imported again)
+
+        Returns:
+            Dictionary with added, duplicates, failed, calls, note_ids and
+            errors, plus recovered (notes of a failed call found in Anki,
+            included in added), unsent (notes not written because of transport
+            errors), aborted (Anki stayed unreachable) and connection_error
+        """
+        outcome = {
+            'added': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'calls': 0,
+            'note_ids': [],
+            'errors': [],
+            'recovered': 0,
+            'unsent': [],
+            'aborted': False,
+            'connection_error': None
+        }
+
+        if skip_existing:
+            notes = self._drop_existing(notes, outcome)
+
+        position = 0
+        while position < len(notes):
+            if outcome['aborted']:
+                outcome['unsent'].extend(notes[position:])
+                break
+            chunk = notes[position:position + self.chunk_size]
+            position += len(chunk)
+            self._write_chunk(chunk, outcome, adapt=True, resends=self.max_resends)
+
+        return outcome
+
+    def _can_add(self, notes: List[Dict]) -> List[bool]:
+        """
+        canAddNotes with the duplicate check scoped to each note's deck
+
+        Raises:
+            AnkiConnectionError: If Anki is unreachable
+        """
+        probes = [{**note, 'options': {**note.get('options', {}),
+                                       'allowDuplicate': False, 'duplicateScope': 'deck'}}
+                  for note in notes]
+        results = []
+        for start in range(0, len(probes), self.max_chunk):
+            results.extend(self.anki_client.can_add_notes(probes[start:start + self.max_chunk]))
+        return results
+
+    def _drop_existing(self, notes: List[Dict], outcome: Dict[str, Any]) -> List[Dict]:
+        """Notes their deck does not have yet; the others count as duplicates"""
+        try:
+            addable = self._can_add(notes)
+        except AnkiConnectionError as e:
+            self._lost(notes, e, outcome)
+            return []
+        outcome['duplicates'] += addable.count(False)
+        return [note for note, ok in zip(notes, addable) if ok]
+
+    def _lost(self, chunk: List[Dict], error: AnkiConnectionError, outcome: Dict[str, Any]):
+        """Record notes a transport error kept from being written"""
+        self.logger.warning(f"addNotes for {len(chunk)} notes failed: {error}")
+        outcome['unsent'].extend(chunk)
+        outcome['connection_error'] = str(error)
+        if isinstance(error, CircuitOpenError):
+            # Past the breaker's pause limit: stop instead of failing every chunk
+            outcome['aborted'] = True
+
+    def _recover(self, chunk: List[Dict], error: AnkiConnectionError,
+                 outcome: Dict[str, Any], resends: int):
+        """
+        Resolve a chunk whose addNotes call failed in transit
+
+        addNotes is not idempotent, so the client does not resend it once
+        the request may have reached Anki. A request that certainly did not
+        is sent again as is; otherwise canAddNotes tells which notes the
+        deck now has. Those count as added (a note the deck already had
+        before the import counts the same way, which at worst skips a
+        duplicate the import allowed) and the rest are sent again.
+        """
+        if isinstance(error, CircuitOpenError) or resends <= 0:
+            self._lost(chunk, error, outcome)
+            return
+
+        if error.request_sent:
+            try:
+                addable = self._can_add(chunk)
+            except AnkiConnectionError as e:
+                self._lost(chunk, e, outcome)
+                return
+            present = addable.count(False)
+            outcome['added'] += present
+            outcome['recovered'] += present
+            outcome['note_ids'].extend([None] * present)
+            chunk = [note for note, ok in zip(chunk, addable) if ok]
+
+        self.logger.info(f"addNotes failed ({error}), resending {len(chunk)} note(s)")
+        if chunk:
+            self._write_chunk(chunk, outcome, adapt=False, resends=resends - 1)
+
+    def _write_chunk(self, chunk: List[Dict], outcome: Dict[str, Any], adapt: bool,
+                     resends: int = 0):
+        """Send one chunk; on failure bisect it so each bad note costs O(log n) calls"""
+        if outcome['aborted']:
+            outcome['unsent'].extend(chunk)
+            return
+
+        payload_bytes = json_length(chunk)
+        start = time.perf_counter()
+        outcome['calls'] += 1
+
+        try:
+            note_ids = self.anki_client.add_notes(chunk)
+        except AnkiConnectionError as e:
+            self._recover(chunk, e, outcome, resends)
+            return
+        except AnkiConnectError as e:
+            if len(chunk) == 1:
+                self._record_failure(str(e), outcome)
+                outcome['note_ids'].append(None)
+                return
+            middle = len(chunk) // 2
+            self.logger.debug(f"addNotes failed for {len(chunk)} notes, bisecting: {e}")
+            self._write_chunk(chunk[:middle], outcome, adapt=False, resends=resends)
+            self._write_chunk(chunk[middle:], outcome, adapt=False, resends=resends)
+            return
+
+        if adapt:
+            self._adapt(len(chunk), time.perf_counter() - start, payload_bytes)
+
+        # Older AnkiConnect versions report per-note failures as null ids
+        for note_id in note_ids or [None] * len(chunk):
+            outcome['note_ids'].append(note_id)
+            if note_id:
+                outcome['added'] += 1
+            else:
+                outcome['failed'] += 1
+
+    def _record_failure(self, message: str, outcome: Dict[str, Any]):
+        if 'duplicate' in message.lower():
+            outcome['duplicates'] += 1
+        else:
+            outcome['failed'] += 1
+            outcome['errors'].append(message)
+
+    def _adapt(self, count: int, elapsed: float, payload_bytes: int):
+        """Update per-note cost estimates and resize the next chunk"""
+        seconds_per_note = elapsed / count
+        bytes_per_note = payload_bytes / count
+
+        # Exponentially weighted averages smooth out single slow calls
+        if self._seconds_per_note is None:
+            self._seconds_per_note = seconds_per_note
+            self._bytes_per_note = bytes_per_note
+        else:
+            self._seconds_per_note = 0.7 * self._seconds_per_note + 0.3 * seconds_per_note
+            self._bytes_per_note = 0.7 * self._bytes_per_note + 0.3 * bytes_per_note
+
+        by_latency = self.target_latency / max(self._seconds_per_note, 1e-6)
+        by_payload = self.max_payload_bytes / max(self._bytes_per_note, 1.0)
+        size = int(min(by_latency, by_payload, self.max_chunk))
+        self.chunk_size = max(self.min_chunk, size)
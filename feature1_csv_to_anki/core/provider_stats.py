@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Provider Scoreboard
+Persists per-provider, per-part-of-speech hit rate, latency and bytes for
+image searches and uses them to order providers (most likely to succeed
+soonest first), skip ones that almost never hit, and now and then explore
+the full list again so the numbers stay current
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import json
+import random
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+POS_BUCKETS = {
+    'adj': 'adj', 'adjective': 'adj',
+    'noun': 'noun', 'n': 'noun',
+    'verb': 'verb', 'v': 'verb',
+}
+
+# Priors for providers without history: a coin-flip hit rate at 1 second
+PRIOR_HITS, PRIOR_ATTEMPTS, PRIOR_LATENCY = 1, 2, 1.0
+
+
+def pos_bucket(part_of_speech: Optional[str]) -> str:
+    return POS_BUCKETS.get((part_of_speech or '').strip().lower(), 'other')
+
+
+class ProviderScoreboard:
+    """Thread-safe, JSON-persisted provider statistics"""
+
+    def __init__(self, path: Path, explore_rate: float = 0.1, min_samples: int = 20,
+                 skip_below: float = 0.05, seed: int = None):
+        """
+        Args:
+            path: JSON file the statistics are kept in
+            explore_rate: Fraction of lookups that try every provider in random order
+            min_samples: Attempts needed before a provider can be skipped
+            skip_below: Skip providers whose hit rate is below this
+            seed: Random seed for exploration (tests/benchmarks)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.explore_rate = explore_rate
+        self.min_samples = min_samples
+        self.skip_below = skip_below
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.explorations = 0
+        self.skipped = 0
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f).get('providers', {})
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable provider stats {self.path}: {e}")
+
+    def _entry(self, provider: str, pos: str) -> Dict[str, float]:
+        return self.stats.setdefault(provider, {}).setdefault(
+            pos, {'attempts': 0, 'hits': 0, 'latency': 0.0, 'bytes': 0})
+
+    def record(self, provider: str, part_of_speech: Optional[str], hit: bool,
+               latency: float, size: int = 0):
+        """
+        Record one search attempt
+
+        Args:
+            provider: Provider name
+            part_of_speech: Part of speech of the word (bucketed)
+            hit: Whether an image was obtained
+            latency: Seconds spent, including rate-limit waits
+            size: Image bytes downloaded
+        """
+        with self._lock:
+            entry = self._entry(provider, pos_bucket(part_of_speech))
+            entry['attempts'] += 1
+            entry['latency'] += latency
+            if hit:
+                entry['hits'] += 1
+                entry['bytes'] += size
+
+    def _rates(self, provider: str, pos: str):
+        entry = self.stats.get(provider, {}).get(pos)
+        if not entry:
+            return 0, PRIOR_HITS / PRIOR_ATTEMPTS, PRIOR_LATENCY
+        attempts = entry['attempts']
+        hit_rate = (entry['hits'] + PRIOR_HITS) / (attempts + PRIOR_ATTEMPTS)
+        latency = (entry['latency'] + PRIOR_LATENCY) / (attempts + 1)
+        return attempts, hit_rate, latency
+
+    def score(self, provider: str, part_of_speech: Optional[str]) -> float:
+        """Expected hits per second spent on the provider"""
+        with self._lock:
+            _, hit_rate, latency = self._rates(provider, pos_bucket(part_of_speech))
+        return hit_rate / max(latency, 0.05)
+
+    def order(self, providers: List[str], part_of_speech: Optional[str]) -> List[str]:
+        """
+        Providers to try, best first
+
+        Most calls rank by score and drop providers with enough history and
+        a hit rate under skip_below; explore_rate of calls instead return
+        every provider in random order.
+        """
+        pos = pos_bucket(part_of_speech)
+        with self._lock:
+            if self._random.random() < self.explore_rate:
+                self.explorations += 1
+                shuffled = list(providers)
+                self._random.shuffle(shuffled)
+                return shuffled
+
+            ranked, dropped = [], []
+            for provider in providers:
+                attempts, hit_rate, latency = self._rates(provider, pos)
+                if attempts >= self.min_samples and hit_rate < self.skip_below:
+                    dropped.append(provider)
+                else:
+                    ranked.append((hit_rate / max(latency, 0.05), provider))
+            if not ranked:
+                # Never skip everything: fall back to the least bad provider
+                return self._order_by_score(providers, pos)
+            self.skipped += len(dropped)
+            return [p for _, p in sorted(ranked, key=lambda sp: -sp[0])]
+
+    def _order_by_score(self, providers: List[str], pos: str) -> List[str]:
+        scores = {p: self._rates(p, pos) for p in providers}
+        return sorted(providers, key=lambda p: -scores[p][1] / max(scores[p][2], 0.05))
+
+    def scoreboard(self) -> List[Dict]:
+        """One row per provider and part of speech, best hit rate first"""
+        rows = []
+        with self._lock:
+            for provider, buckets in self.stats.items():
+                for pos, e in buckets.items():
+                    if not e['attempts']:
+                        continue
+                    rows.append({
+                        'provider': provider,
+                        'pos': pos,
+                        'attempts': e['attempts'],
+                        'hit_rate': e['hits'] / e['attempts'],
+                        'avg_latency': e['latency'] / e['attempts'],
+                        'avg_bytes': e['bytes'] / e['hits'] if e['hits'] else 0
+                    })
+        return sorted(rows, key=lambda r: (r['pos'], -r['hit_rate']))
+
+    def save(self):
+        """Write the statistics atomically"""
+        with self._lock:
+            data = json.dumps({'providers': self.stats}, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + '.tmp')
+        temp.write_text(data, encoding='utf-8')
+        os.replace(temp, self.path)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Registry Reconciliation
+Compares a profile's media registry with its collection.media directory
+(one os.scandir pass) and the local media store, hashes the files both
+sides have in a thread pool, and repairs the registry in bulk so imports
+can trust it without checking files one by one
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .blob_store import file_digest
+
+
+def reconciled_key(profile: str) -> str:
+    """Registry meta key holding a profile's last reconciliation time"""
+    return f"reconciled_at:{profile}"
+
+
+def scan_media_dir(media_dir: Path) -> Dict[str, int]:
+    """filename -> size of every regular file in collection.media"""
+    with os.scandir(media_dir) as entries:
+        return {entry.name: entry.stat().st_size for entry in entries
+                if entry.is_file() and not entry.name.startswith('.')}
+
+
+class RegistryReconciler:
+    """Bring one registry in line with what Anki and the store actually hold"""
+
+    def __init__(self, registry, store, workers: int = 8):
+        """
+        Args:
+            registry: MediaRegistry to check and repair
+            store: BlobStore with the local copies of uploaded media
+            workers: Threads hashing files
+        """
+        self.logger = logging.getLogger(__name__)
+        self.registry = registry
+        self.store = store
+        self.workers = workers
+
+    def _verify(self, media_dir: Path, candidates: List[Tuple[str, str]],
+                sizes: Dict[str, int], hash_contents: bool = True) -> Tuple[List[str], List[str]]:
+        """
+        Compare collection.media files with their store copies
+
+        Args:
+            candidates: (filename, store digest) pairs
+            sizes: filename -> size in collection.media
+            hash_contents: Hash same-size files (otherwise equal size counts as a match)
+
+        Returns:
+            (matching, differing) filenames
+        """
+        matching, differing, to_hash = [], [], []
+        for name, digest in candidates:
+            blob = self.store.blob_path(digest)
+            try:
+                same_size = blob.stat().st_size == sizes[name]
+            except OSError:
+                same_size = False
+            # Different sizes cannot hash equal; skip reading those
+            if same_size:
+                to_hash.append((name, digest))
+            else:
+                differing.append(name)
+        if not hash_contents:
+            return [name for name, _ in to_hash], differing
+
+        def digest_of(item):
+            name, _ = item
+            try:
+                return file_digest(media_dir / name)
+            except OSError as e:
+                self.logger.warning(f"Could not read {name}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for (name, expected), actual in zip(to_hash, executor.map(digest_of, to_hash)):
+                (matching if actual == expected else differing).append(name)
+        return matching, differing
+
+    def reconcile(self, profile: str, media_dir: Path, verify: bool = True,
+                  dry_run: bool = False) -> Dict:
+        """
+        Reconcile one profile
+
+        Registered files missing from collection.media are dropped; files
+        whose content differs from the store copy (or that are empty) are
+        marked unverified so the next import uploads them again; files in
+        collection.media that match a store copy but were never registered
+        are added. Everything else is marked verified.
+
+        Args:
+            profile: Profile name
+            media_dir: The profile's collection.media directory
+            verify: Hash files (otherwise only existence and size are compared)
+            dry_run: Report without changing the registry
+
+        Returns:
+            Counts per outcome, the repairs made and the elapsed time
+        """
+        start = time.perf_counter()
+        on_disk = scan_media_dir(media_dir)
+        registered = self.registry.filenames(profile)
+
+        missing = sorted(name for name in registered if name not in on_disk)
+        present = [name for name in registered if name in on_disk]
+        empty = [name for name in present if on_disk[name] == 0]
+
+        # Files with a store copy can be checked against it, as can
+        # unregistered files the store knows (uploads the registry lost)
+        with_copy = [(name, self.store.digest_of(name)) for name in present if on_disk[name]]
+        not_in_store = [name for name, digest in with_copy if digest is None]
+        with_copy = [(name, digest) for name, digest in with_copy if digest is not None]
+        orphans = [(name, self.store.digest_of(name)) for name in on_disk
+                   if name not in registered and on_disk[name]]
+        orphans = [(name, digest) for name, digest in orphans if digest is not None]
+
+        matching, differing = self._verify(media_dir, with_copy + orphans, on_disk, hash_contents=verify)
+        orphan_names = {name for name, _ in orphans}
+        adopted = [name for name in matching if name in orphan_names]
+        differing = [name for name in differing if name not in orphan_names]
+        verified = [name for name in matching if name not in orphan_names] + not_in_store
+        unverified = sorted(set(differing) | set(empty))
+
+        report = {
+            'profile': profile,
+            'media_dir': str(media_dir),
+            'anki_files': len(on_disk),
+            'registered': len(registered),
+            'verified': len(verified),
+            'not_in_store': len(not_in_store),
+            'removed': missing,
+            'unverified': unverified,
+            'adopted': sorted(adopted),
+            'hashed': verify,
+            'dry_run': dry_run,
+        }
+
+        if not dry_run:
+            with self.registry.batch():
+                self.registry.remove_many(profile, missing)
+                self.registry.set_verified_many(profile, verified, True)
+                self.registry.set_verified_many(profile, unverified, False)
+                self.registry.add_many(profile, ((name, {'source': 'reconciled'}, True, None)
+                                                 for name in adopted))
+                self.registry.set_meta(reconciled_key(profile), datetime.now().isoformat())
+
+        report['elapsed'] = time.perf_counter() - start
+        self.logger.info(f"Reconciled {profile}: {len(missing)} removed, {len(unverified)} unverified, "
+                         f"{len(adopted)} adopted in {report['elapsed']:.2f}s")
+        return report
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Rendition Selection
+Picks, from the hits of one provider search, the smallest image rendition
+that still covers the card display size, using the width/height metadata
+the search APIs already return (no extra requests)
+
+Author: Assistant
+Version: 1.0
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+# (url, width, height)
+Rendition = Tuple[str, int, int]
+
+# A later (less relevant) hit must be this much cheaper per rank to win
+RANK_PENALTY = 0.1
+
+
+def _fit(width: int, height: int, box_width: int, box_height: int) -> Tuple[int, int]:
+    """Size of width x height scaled down (never up) to fit the box"""
+    scale = min(1.0, box_width / width, box_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _scale_to_height(width: int, height: int, target: int) -> Tuple[int, int]:
+    if height <= target:
+        return width, height
+    return max(1, round(width * target / height)), target
+
+
+def _scale_to_width(width: int, height: int, target: int) -> Tuple[int, int]:
+    if width <= target:
+        return width, height
+    return target, max(1, round(height * target / width))
+
+
+def pexels_renditions(photo: Dict) -> List[Rendition]:
+    """Uncropped renditions of a Pexels photo (sizes per the Pexels API docs)"""
+    width, height, src = photo.get('width'), photo.get('height'), photo.get('src') or {}
+    if not width or not height:
+        return [(src['medium'], 0, 0)] if src.get('medium') else []
+    sizes = {
+        'small': _scale_to_height(width, height, 130),
+        'medium': _scale_to_height(width, height, 350),
+        'large': _fit(width, height, 940, 650),
+        'large2x': _fit(width, height, 1880, 1300),
+        'original': (width, height),
+    }
+    return [(src[name], w, h) for name, (w, h) in sizes.items() if src.get(name)]
+
+
+def unsplash_renditions(photo: Dict) -> List[Rendition]:
+    """Renditions of an Unsplash photo (fixed widths per the Unsplash API docs)"""
+    width, height, urls = photo.get('width'), photo.get('height'), photo.get('urls') or {}
+    if not width or not height:
+        return [(urls['small'], 0, 0)] if urls.get('small') else []
+    sizes = {
+        'thumb': _scale_to_width(width, height, 200),
+        'small': _scale_to_width(width, height, 400),
+        'regular': _scale_to_width(width, height, 1080),
+        'full': (width, height),
+    }
+    return [(urls[name], w, h) for name, (w, h) in sizes.items() if urls.get(name)]
+
+
+def pixabay_renditions(hit: Dict) -> List[Rendition]:
+    """
+    Renditions of a Pixabay hit
+
+    Besides the listed preview/webformat/large URLs, Pixabay serves 180 and
+    340 px tall and 960x720-bounded variants of webformatURL by replacing
+    its '_640' suffix.
+    """
+    renditions = []
+    if hit.get('previewURL'):
+        renditions.append((hit['previewURL'], hit.get('previewWidth', 0), hit.get('previewHeight', 0)))
+
+    webformat = hit.get('webformatURL')
+    if webformat:
+        width, height = hit.get('webformatWidth', 0), hit.get('webformatHeight', 0)
+        renditions.append((webformat, width, height))
+        full_width, full_height = hit.get('imageWidth') or width, hit.get('imageHeight') or height
+        if '_640' in webformat and full_width and full_height:
+            for suffix, (w, h) in (('_180', _scale_to_height(full_width, full_height, 180)),
+                                   ('_340', _scale_to_height(full_width, full_height, 340)),
+                                   ('_960', _fit(full_width, full_height, 960, 720))):
+                renditions.append((webformat.replace('_640', suffix), w, h))
+
+    if hit.get('largeImageURL') and hit.get('imageWidth') and hit.get('imageHeight'):
+        w, h = _fit(hit['imageWidth'], hit['imageHeight'], 1280, 1280)
+        renditions.append((hit['largeImageURL'], w, h))
+    return renditions
+
+
+RENDITION_EXTRACTORS = {
+    'pexels': pexels_renditions,
+    'unsplash': unsplash_renditions,
+    'pixabay': pixabay_renditions,
+}
+
+
+def covers(width: int, height: int, target: Tuple[int, int]) -> bool:
+    """True if the image fills the target box without being scaled up"""
+    return width >= target[0] or height >= target[1]
+
+
+def select_rendition(hits: List[List[Rendition]], target: Tuple[int, int]) -> Optional[Rendition]:
+    """
+    Choose the cheapest rendition that covers the target box
+
+    Args:
+        hits: Renditions of each search hit, most relevant hit first
+        target: Display box (width, height) the image must cover
+
+    Returns:
+        The rendition with the fewest pixels among those covering the target
+        (later hits pay RANK_PENALTY per rank so relevance still counts); if
+        none covers it, the largest one available. None if there are none.
+    """
+    best, best_cost = None, None
+    largest, largest_area = None, -1
+    for rank, renditions in enumerate(hits):
+        for url, width, height in renditions:
+            area = width * height
+            if area > largest_area:
+                largest, largest_area = (url, width, height), area
+            if not width or not covers(width, height, target):
+                continue
+            cost = area * (1 + RANK_PENALTY * rank)
+            if best_cost is None or cost < best_cost:
+                best, best_cost = (url, width, height), cost
+    return best or largest
+
+
+def choose_rendition(provider: str, results: List[Dict],
+                     target: Tuple[int, int]) -> Optional[Rendition]:
+    """
+    Pick a rendition from a provider's raw search results
+
+    Args:
+        provider: 'pexels', 'unsplash' or 'pixabay'
+        results: The photos/results/hits list of the search response
+        target: Display box (width, height) the image must cover
+    """
+    extract = RENDITION_EXTRACTORS[provider]
+    return select_rendition([extract(hit) for hit in results], target)
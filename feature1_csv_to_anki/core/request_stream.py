@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Streaming Request Encoder
+Incremental JSON serialization for large AnkiConnect requests, with media
+base64-encoded block by block straight from disk
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import json
+import base64
+from typing import Any, Iterator, Optional
+
+
+# Raw bytes per base64 block; a multiple of 3 so blocks concatenate cleanly
+BASE64_BLOCK = 3 * 16 * 1024
+
+# Bytes buffered before a chunk is handed to the socket
+SEND_BUFFER = 64 * 1024
+
+# Lists at least this long are serialized element by element
+STREAM_LIST_THRESHOLD = 100
+
+
+class Base64Payload:
+    """
+    Media content that serializes as a base64 JSON string without ever being
+    held in memory as one encoded string
+
+    Use in place of a base64 `data` parameter, e.g.
+        client.invoke('storeMediaFile', filename='a.jpg', data=Base64Payload(path='a.jpg'))
+    """
+
+    def __init__(self, path: Optional[str] = None, data: Optional[bytes] = None):
+        if (path is None) == (data is None):
+            raise ValueError("Base64Payload needs exactly one of path or data")
+        self.path = path
+        self.data = data
+        self.size = os.path.getsize(path) if path is not None else len(data)
+
+    @property
+    def encoded_length(self) -> int:
+        """Length of the JSON string, quotes included"""
+        return 4 * ((self.size + 2) // 3) + 2
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        """Yield the JSON string (quotes included) block by block"""
+        yield b'"'
+        if self.path is not None:
+            with open(self.path, 'rb') as f:
+                for block in iter(lambda: f.read(BASE64_BLOCK), b''):
+                    yield base64.b64encode(block)
+        else:
+            view = memoryview(self.data)
+            for start in range(0, len(view), BASE64_BLOCK):
+                yield base64.b64encode(view[start:start + BASE64_BLOCK])
+        yield b'"'
+
+    def to_base64(self) -> str:
+        """Materialize the whole base64 string (for non-streaming callers)"""
+        return b''.join(self.iter_encoded())[1:-1].decode('ascii')
+
+    def __repr__(self):
+        source = self.path if self.path is not None else f"<{self.size} bytes>"
+        return f"Base64Payload({source})"
+
+
+def should_stream(obj: Any) -> bool:
+    """Whether a request contains media payloads or long lists worth streaming"""
+    if isinstance(obj, Base64Payload):
+        return True
+    if isinstance(obj, dict):
+        return any(should_stream(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return len(obj) >= STREAM_LIST_THRESHOLD or any(should_stream(v) for v in obj)
+    return False
+
+
+def _contains_payload(obj: Any) -> bool:
+    if isinstance(obj, Base64Payload):
+        return True
+    if isinstance(obj, dict):
+        return any(_contains_payload(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_contains_payload(v) for v in obj)
+    return False
+
+
+def iter_json(obj: Any) -> Iterator[bytes]:
+    """
+    Serialize obj as JSON incrementally
+
+    Lists are emitted element by element, dicts containing payloads key by
+    key, and everything else with one json.dumps call. The output is byte
+    for byte what json.dumps would produce with payloads replaced by their
+    base64 strings.
+    """
+    if isinstance(obj, Base64Payload):
+        yield from obj.iter_encoded()
+    elif isinstance(obj, (list, tuple)):
+        yield b'['
+        for i, item in enumerate(obj):
+            if i:
+                yield b', '
+            yield from iter_json(item)
+        yield b']'
+    elif isinstance(obj, dict) and _contains_payload(obj):
+        yield b'{'
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                yield b', '
+            yield json.dumps(str(key)).encode('utf-8')
+            yield b': '
+            yield from iter_json(value)
+        yield b'}'
+    else:
+        yield json.dumps(obj).encode('utf-8')
+
+
+def json_length(obj: Any) -> int:
+    """Byte length of iter_json(obj) without reading any payload"""
+    if isinstance(obj, Base64Payload):
+        return obj.encoded_length
+    if isinstance(obj, (list, tuple)):
+        return 2 + 2 * max(len(obj) - 1, 0) + sum(json_length(item) for item in obj)
+    if isinstance(obj, dict) and _contains_payload(obj):
+        return (2 + 2 * max(len(obj) - 1, 0)
+                + sum(len(json.dumps(str(k)).encode('utf-8')) + 2 + json_length(v)
+                      for k, v in obj.items()))
+    return len(json.dumps(obj).encode('utf-8'))
+
+
+class StreamingBody:
+    """
+    Re-iterable HTTP request body for a JSON document
+
+    Iterating yields buffered chunks of about SEND_BUFFER bytes; len() gives
+    the exact Content-Length so no chunked transfer encoding is needed.
+    """
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+        self._length = None
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = json_length(self.obj)
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        buffer = bytearray()
+        for piece in iter_json(self.obj):
+            if len(piece) >= SEND_BUFFER:
+                # Large blocks (media) go out as-is instead of being copied
+                if buffer:
+                    yield bytes(buffer)
+                    buffer.clear()
+                yield piece
+                continue
+            buffer += piece
+            if len(buffer) >= SEND_BUFFER:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
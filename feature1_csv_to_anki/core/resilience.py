@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect Resilience Policies
+Retry with jittered exponential backoff, a circuit breaker that pauses callers
+while Anki is unresponsive, and per-action timeout budgets scaled by payload
+
+Author: Assistant
+Version: 1.0
+"""
+
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+
+# Actions that can safely be sent again after a request may have reached Anki
+IDEMPOTENT_ACTIONS = {
+    'version', 'getProfiles', 'loadProfile',
+    'deckNames', 'deckNamesAndIds', 'createDeck', 'getDeckConfig',
+    'modelNames', 'modelNamesAndIds', 'modelFieldNames', 'modelTemplates',
+    'findNotes', 'notesInfo', 'findCards', 'cardsInfo', 'canAddNotes',
+    'updateNoteFields', 'storeMediaFile', 'retrieveMediaFile',
+    'getMediaFilesNames', 'getMediaDirPath', 'deleteMediaFile',
+}
+
+# AnkiConnect error messages meaning "not now" rather than "never": the action
+# was not executed because the collection is closed (sync, profile switch) or locked
+BUSY_ERROR_PATTERNS = (
+    'collection is not available',
+    'collection was not loaded',
+    'database is locked',
+    'anki is busy',
+)
+
+
+def is_busy_error(message: str) -> bool:
+    """Whether an AnkiConnect error message reports a transient busy state"""
+    message = message.lower()
+    return any(pattern in message for pattern in BUSY_ERROR_PATTERNS)
+
+
+def is_idempotent(action: str, params: Dict) -> bool:
+    """Whether an action (or every action in a multi) is safe to resend"""
+    if action == 'multi':
+        return all(is_idempotent(sub.get('action'), sub.get('params', {}))
+                   for sub in params.get('actions', []))
+    return action in IDEMPOTENT_ACTIONS
+
+
+class RetryPolicy:
+    """Decides whether and when a failed call is retried"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5,
+                 max_delay: float = 8.0):
+        """
+        Args:
+            max_attempts: Total attempts per call (1 disables retries)
+            base_delay: Backoff ceiling for the first retry, in seconds
+            max_delay: Upper bound on the backoff ceiling
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, action: str, params: Dict, attempt: int,
+                     request_sent: bool) -> bool:
+        """
+        Args:
+            action: Action that failed
+            params: Its parameters
+            attempt: Number of attempts made so far
+            request_sent: Whether the request may have reached Anki
+
+        Returns:
+            True if another attempt should be made
+        """
+        if attempt >= self.max_attempts:
+            return False
+        # A request that never reached Anki can be resent whatever it does
+        return not request_sent or is_idempotent(action, params)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before the next attempt ("full jitter" exponential backoff)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Stops calls to Anki after repeated transport failures
+
+    closed:    calls pass through; consecutive failures are counted
+    open:      callers wait for the cooldown instead of hammering Anki
+    half_open: one probe call is let through; success closes the circuit,
+               failure reopens it with a doubled cooldown
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5.0,
+                 max_reset_timeout: float = 60.0, pause_limit: float = 300.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: First cooldown before a probe, in seconds
+            max_reset_timeout: Upper bound on the cooldown
+            pause_limit: Longest total outage callers wait out before failing
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.pause_limit = pause_limit
+        self.logger = logging.getLogger(__name__)
+
+        self.state = 'closed'
+        self._failures = 0
+        self._cooldown = reset_timeout
+        self._opened_at = None      # start of the current outage
+        self._retry_at = 0.0        # when the next probe may run
+        self._probing = False
+        self._condition = threading.Condition()
+
+        self.stats = {'opened': 0, 'paused_seconds': 0.0}
+
+    def before_call(self) -> bool:
+        """
+        Wait until a call may proceed
+
+        Returns:
+            False if the outage has outlasted pause_limit (the caller should fail)
+        """
+        with self._condition:
+            while True:
+                if self.state == 'closed':
+                    return True
+
+                now = time.monotonic()
+                if self.state == 'open' and now >= self._retry_at:
+                    self.state = 'half_open'
+
+                if self.state == 'half_open' and not self._probing:
+                    self._probing = True
+                    return True
+
+                # Open and cooling down, or another caller is probing. Past the
+                # pause limit callers fail fast, but probes still run on schedule.
+                if now - self._opened_at > self.pause_limit:
+                    return False
+                wait = max(self._retry_at - now, 0.05)
+                wait = min(wait, self._opened_at + self.pause_limit - now + 0.01)
+                self._condition.wait(wait)
+                self.stats['paused_seconds'] += time.monotonic() - now
+
+    def record_success(self):
+        """Record a call that reached Anki"""
+        with self._condition:
+            if self.state != 'closed':
+                outage = time.monotonic() - self._opened_at
+                self.logger.info(f"Anki is responding again after {outage:.1f}s, resuming")
+            self.state = 'closed'
+            self._failures = 0
+            self._cooldown = self.reset_timeout
+            self._opened_at = None
+            self._probing = False
+            self._condition.notify_all()
+
+    def record_failure(self):
+        """Record a transport failure or busy response"""
+        with self._condition:
+            now = time.monotonic()
+            self._failures += 1
+
+            if self.state == 'half_open':
+                self._cooldown = min(self._cooldown * 2, self.max_reset_timeout)
+                self._open(now)
+            elif self.state == 'closed' and self._failures >= self.failure_threshold:
+                self._opened_at = now
+                self.stats['opened'] += 1
+                self._open(now)
+
+            self._probing = False
+            self._condition.notify_all()
+
+    def _open(self, now: float):
+        self.state = 'open'
+        self._retry_at = now + self._cooldown
+        self.logger.warning(f"Anki is not responding, pausing calls for {self._cooldown:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        return {'state': self.state, 'consecutive_failures': self._failures, **self.stats}
+
+
+class TimeoutBudget:
+    """Per-action socket timeouts that grow with the request size"""
+
+    def __init__(self, base: float = 10.0, per_mb: float = 2.0,
+                 maximum: float = 300.0, action_base: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            base: Timeout for a small request, in seconds
+            per_mb: Extra seconds per MB of request body
+            maximum: Upper bound on any timeout
+            action_base: Base timeout overrides for slow actions (e.g. sync)
+        """
+        self.base = base
+        self.per_mb = per_mb
+        self.maximum = maximum
+        self.action_base = dict(action_base or {})
+
+    def for_request(self, action: str, params: Dict, body_bytes: int) -> float:
+        """Timeout in seconds for one request"""
+        if action == 'multi':
+            base = max([self.action_base.get(sub.get('action'), self.base)
+                        for sub in params.get('actions', [])] or [self.base])
+        else:
+            base = self.action_base.get(action, self.base)
+        return min(self.maximum, base + self.per_mb * body_bytes / (1024 * 1024))
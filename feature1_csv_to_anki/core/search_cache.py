@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Image Search Result Cache
+SQLite cache of image provider search results keyed by (provider, search
+term). Hits store the chosen image URL and its dimensions; searches that came
+back empty are stored as negative entries with a shorter TTL so words no
+provider has are not searched again on every run
+
+Author: Assistant
+Version: 1.0
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    provider   TEXT NOT NULL,
+    term       TEXT NOT NULL,
+    url        TEXT,              -- NULL for a negative (empty result) entry
+    width      INTEGER,
+    height     INTEGER,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (provider, term)
+)
+"""
+
+
+class SearchCache:
+    """Thread-safe persistent cache of provider search results"""
+
+    def __init__(self, path: Path, ttl_days: float = 30, negative_ttl_days: float = 7):
+        """
+        Args:
+            path: SQLite database file
+            ttl_days: Lifetime of a cached image URL
+            negative_ttl_days: Lifetime of a cached empty result
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'expired': 0}
+
+    @staticmethod
+    def _key(term: str) -> str:
+        return ' '.join(term.lower().split())
+
+    def get(self, provider: str, term: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a search
+
+        Returns:
+            None if the search is not cached (or expired), otherwise a dict
+            with url, width, height and fetched_at; url is None for a cached
+            empty result
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, width, height, fetched_at FROM search_results "
+                "WHERE provider = ? AND term = ?", (provider, self._key(term))
+            ).fetchone()
+
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            url, width, height, fetched_at = row
+            ttl = self.ttl if url is not None else self.negative_ttl
+            if time.time() - fetched_at > ttl:
+                self.stats['expired'] += 1
+                return None
+
+            self.stats['hits' if url is not None else 'negative_hits'] += 1
+            return {'url': url, 'width': width, 'height': height, 'fetched_at': fetched_at}
+
+    def put(self, provider: str, term: str, url: str,
+            width: Optional[int] = None, height: Optional[int] = None):
+        """Store the image URL chosen for a search"""
+        self._store(provider, term, url, width, height)
+
+    def put_miss(self, provider: str, term: str):
+        """Store a search that returned no usable image"""
+        self._store(provider, term, None, None, None)
+
+    def _store(self, provider: str, term: str, url: Optional[str],
+               width: Optional[int], height: Optional[int]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_results "
+                "(provider, term, url, width, height, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (provider, self._key(term), url, width, height, time.time())
+            )
+            self._db.commit()
+
+    def invalidate(self, provider: str, term: str):
+        """Forget a search (e.g. its cached URL no longer downloads)"""
+        with self._lock:
+            self._db.execute("DELETE FROM search_results WHERE provider = ? AND term = ?",
+                             (provider, self._key(term)))
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired entries
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM search_results WHERE "
+                "(url IS NOT NULL AND fetched_at < ?) OR (url IS NULL AND fetched_at < ?)",
+                (now - self.ttl, now - self.negative_ttl)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'], stats['negative_entries'] = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(url IS NULL), 0) FROM search_results"
+            ).fetchone()
+            return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
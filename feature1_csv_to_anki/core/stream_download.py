@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Streaming Image Downloads
+Fetches provider images chunk by chunk instead of buffering whole response
+bodies: responses that are not images (by Content-Type and magic bytes),
+that exceed the size cap, or that trickle in past an overall deadline are
+aborted as soon as that is known
+
+Author: Assistant
+Version: 1.0
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+
+# Leading bytes of the image formats providers serve
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+
+def sniff_image(head: bytes) -> Optional[str]:
+    """
+    Identify an image format from its first bytes
+
+    Returns:
+        Format name, or None if the data does not look like an image
+    """
+    for signature, fmt in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return fmt
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis', b'heic', b'heix', b'mif1'):
+        return 'avif' if head[8:11] == b'avi' else 'heic'
+    return None
+
+
+class DownloadRejected(Exception):
+    """A download was aborted because the response is unusable"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class StreamingDownloader:
+    """Size-capped, deadline-bounded image downloads with per-reason stats"""
+
+    def __init__(self, max_bytes: int = 2 * 1024 * 1024, timeout: Tuple[float, float] = (5, 15),
+                 deadline: float = 30, chunk_size: int = 64 * 1024):
+        """
+        Args:
+            max_bytes: Abort responses larger than this
+            timeout: (connect, read) socket timeouts
+            deadline: Abort downloads that take longer than this in total
+            chunk_size: Bytes read per iteration
+        """
+        self.max_bytes = max_bytes
+        self.timeout = tuple(timeout)
+        self.deadline = deadline
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.stats = {'downloads': 0, 'bytes': 0, 'rejected': {}}
+
+    def _reject(self, reason: str, message: str):
+        with self._lock:
+            self.stats['rejected'][reason] = self.stats['rejected'].get(reason, 0) + 1
+        raise DownloadRejected(reason, message)
+
+    def fetch(self, url: str, cancel: Optional[threading.Event] = None, **kwargs) -> Optional[bytes]:
+        """
+        Download an image
+
+        Args:
+            url: Image URL
+            cancel: Abort quietly (returning None) once this is set
+            **kwargs: Extra arguments for requests.get (headers, params)
+
+        Returns:
+            Image bytes, or None if the status was not 200 or cancel was set
+
+        Raises:
+            DownloadRejected: Not an image, too large or too slow
+            requests.RequestException: Network errors
+        """
+        import requests
+
+        started = time.monotonic()
+        with requests.get(url, stream=True, timeout=self.timeout, **kwargs) as response:
+            if response.status_code != 200:
+                return None
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and not (content_type.startswith('image/')
+                                     or content_type == 'application/octet-stream'):
+                self._reject('content_type', f"{url} is {content_type}, not an image")
+
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                self._reject('too_large', f"{url} is {int(length)} bytes (limit {self.max_bytes})")
+
+            buffer = bytearray()
+            sniffed = False
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if cancel is not None and cancel.is_set():
+                    return None
+                buffer += chunk
+                if not sniffed and len(buffer) >= 16:
+                    if sniff_image(bytes(buffer[:16])) is None:
+                        self._reject('not_image', f"{url} does not start with image data")
+                    sniffed = True
+                if len(buffer) > self.max_bytes:
+                    self._reject('too_large', f"{url} exceeded {self.max_bytes} bytes")
+                if time.monotonic() - started > self.deadline:
+                    self._reject('too_slow', f"{url} took longer than {self.deadline}s")
+
+        if not buffer:
+            self._reject('empty', f"{url} returned no data")
+        if not sniffed and sniff_image(bytes(buffer)) is None:
+            self._reject('not_image', f"{url} is not image data")
+        with self._lock:
+            self.stats['downloads'] += 1
+            self.stats['bytes'] += len(buffer)
+        return bytes(buffer)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'rejected': dict(self.stats['rejected'])}
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Text Image Renderer
+Renders the fallback card image (the word and its Vietnamese meaning on a
+coloured background) used when no provider has a picture. Fonts are
+resolved and loaded once per process, the background is pre-rendered once
+and copied, and render_batch spreads many words over a process pool
+
+Author: Assistant
+Version: 1.0
+"""
+
+import io
+import os
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+
+SIZE = (400, 300)
+BACKGROUND = '#667eea'
+
+# Bold sans fonts with Latin + Vietnamese coverage, by platform
+FONT_CANDIDATES = (
+    'arial.ttf',                     # Windows (and found by name on macOS)
+    'Arial.ttf',
+    'DejaVuSans-Bold.ttf',
+    'LiberationSans-Bold.ttf',
+    'NotoSans-Bold.ttf',
+    'FreeSansBold.ttf',
+    'DejaVuSans.ttf',
+)
+
+FONT_DIRS = (
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'),
+    '/Library/Fonts',
+    '/System/Library/Fonts/Supplemental',
+)
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def resolve_font_path() -> Optional[str]:
+    """
+    Find a TrueType font file once per process
+
+    Returns:
+        Path (or a name Pillow can open), or None if only the bitmap default is left
+    """
+    from PIL import ImageFont
+
+    # Names Pillow can resolve itself (Windows fonts dir, cwd)
+    for name in FONT_CANDIDATES[:2]:
+        try:
+            ImageFont.truetype(name, 12)
+            return name
+        except OSError:
+            pass
+
+    # fontconfig knows the installed fonts on most Linux systems
+    if shutil.which('fc-match'):
+        try:
+            result = subprocess.run(['fc-match', '-f', '%{file}', 'sans:bold'],
+                                    capture_output=True, text=True, timeout=5)
+            path = result.stdout.strip()
+            if path.lower().endswith(('.ttf', '.otf')) and os.path.exists(path):
+                return path
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    wanted = {name.lower(): rank for rank, name in enumerate(FONT_CANDIDATES)}
+    best = None
+    for directory in FONT_DIRS:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                rank = wanted.get(filename.lower())
+                if rank is not None and (best is None or rank < best[0]):
+                    best = (rank, os.path.join(root, filename))
+    return best[1] if best else None
+
+
+@lru_cache(maxsize=16)
+def get_font(size: int):
+    """Font at a pixel size, loaded once per process"""
+    from PIL import ImageFont
+
+    path = resolve_font_path()
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    try:
+        # Pillow >= 10.1 can scale its built-in font
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=4)
+def _background(size: Tuple[int, int], color: str):
+    from PIL import Image
+    return Image.new('RGB', size, color=color)
+
+
+def render_text_image(word: str, vietnamese: str = None, size: Tuple[int, int] = SIZE,
+                      color: str = BACKGROUND, quality: int = 85) -> bytes:
+    """
+    Render the fallback image for one word
+
+    Returns:
+        JPEG bytes
+    """
+    from PIL import ImageDraw
+
+    # Cached font objects are shared, so threads take turns drawing
+    with _lock:
+        img = _background(tuple(size), color).copy()
+        width, height = img.size
+        draw = ImageDraw.Draw(img)
+        font_large, font_small = get_font(48), get_font(24)
+
+        word_upper = word.upper()
+        bbox = draw.textbbox((0, 0), word_upper, font=font_large)
+        text_width, text_height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        x, y = (width - text_width) // 2, height // 3
+        draw.text((x, y), word_upper, font=font_large, fill='white')
+
+        if vietnamese:
+            viet_text = vietnamese[:30] + "..." if len(vietnamese) > 30 else vietnamese
+            bbox = draw.textbbox((0, 0), viet_text, font=font_small)
+            viet_width = bbox[2] - bbox[0]
+            x_viet, y_viet = (width - viet_width) // 2, y + text_height + 20
+            draw.text((x_viet, y_viet), viet_text, font=font_small, fill='#FFD700')
+
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format='JPEG', quality=quality)
+    return img_buffer.getvalue()
+
+
+def _render_item(item: Tuple[str, Optional[str]]) -> bytes:
+    return render_text_image(*item)
+
+
+def render_batch(items: Sequence[Tuple[str, Optional[str]]], workers: int = None) -> List[bytes]:
+    """
+    Render many fallback images in a process pool
+
+    Args:
+        items: (word, vietnamese) pairs
+        workers: Processes (default: CPU count); 0 renders in this process
+
+    Returns:
+        JPEG bytes per item, in input order
+    """
+    if not items:
+        return []
+    if workers == 0 or len(items) < 8:
+        return [_render_item(item) for item in items]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Each worker loads its fonts once; chunks amortize the IPC
+        chunksize = max(1, len(items) // (workers * 4))
+        return list(executor.map(_render_item, items, chunksize=chunksize))
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect Session Tracing
+Records every request an AnkiConnectClient sends (action, params, sizes,
+timing, result shape) to a compact JSON Lines trace, and replays traces
+against a stand-in server or a real Anki with a timing diff report
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import gzip
+import json
+import time
+import base64
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .anki_connect import AnkiConnectClient, AnkiConnectError
+from .metrics import Histogram
+from .request_stream import Base64Payload
+from .resilience import RetryPolicy
+
+
+TRACE_FORMAT = 1
+
+# Strings longer than this (media data) are stored as size placeholders
+BLOB_THRESHOLD = 1024
+
+# Results up to this JSON size are stored verbatim
+RESULT_THRESHOLD = 4096
+
+
+def _open(path: Path, mode: str):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def compact_params(obj: Any) -> Any:
+    """Copy params with media payloads and long strings replaced by placeholders"""
+    if isinstance(obj, Base64Payload):
+        return {'__blob__': obj.encoded_length - 2, 'b64': True}
+    if isinstance(obj, str) and len(obj) > BLOB_THRESHOLD:
+        return {'__blob__': len(obj), 'b64': True}
+    if isinstance(obj, dict):
+        return {k: compact_params(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [compact_params(v) for v in obj]
+    return obj
+
+
+def expand_params(obj: Any) -> Any:
+    """Inverse of compact_params: regenerate placeholder blobs of the recorded size"""
+    if isinstance(obj, dict):
+        if '__blob__' in obj:
+            # Base64 of random bytes, trimmed to the recorded length
+            raw = os.urandom(obj['__blob__'] * 3 // 4 + 3)
+            return base64.b64encode(raw).decode('ascii')[:obj['__blob__'] // 4 * 4]
+        return {k: expand_params(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [expand_params(v) for v in obj]
+    return obj
+
+
+def result_shape(result: Any) -> Any:
+    """Small results verbatim, large ones as their type and length"""
+    try:
+        encoded = json.dumps(result)
+    except (TypeError, ValueError):
+        return {'__type__': type(result).__name__}
+    if len(encoded) <= RESULT_THRESHOLD:
+        return result
+    shape = {'__type__': type(result).__name__, 'bytes': len(encoded)}
+    if isinstance(result, (list, dict)):
+        shape['len'] = len(result)
+    return shape
+
+
+class TraceRecorder:
+    """Appends one JSON line per AnkiConnect request"""
+
+    def __init__(self, path: Path, url: str = None, version: int = None):
+        """
+        Args:
+            path: Trace file (.jsonl, or .jsonl.gz for gzip)
+            url: AnkiConnect URL of the session, stored in the header
+            version: AnkiConnect API version, stored in the header
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = _open(self.path, 'w')
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.records = 0
+        self._write({'trace': TRACE_FORMAT, 'started': datetime.now().isoformat(),
+                     'url': url, 'version': version})
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, separators=(',', ':'), ensure_ascii=False) + "\n")
+
+    def record(self, action: str, params: Dict, started: float, elapsed: float,
+               request_bytes: int, response_bytes: int, result: Any = None,
+               error: Optional[str] = None):
+        """
+        Record one request
+
+        Args:
+            action: Action name
+            params: Request parameters
+            started: perf_counter() value when the request was sent
+            elapsed: Seconds until the response was read
+            request_bytes: Request body size
+            response_bytes: Response body size
+            result: Action result (stored as its shape if large)
+            error: Error kind, or None on success
+        """
+        entry = {
+            't': round(started - self._start, 6),
+            'action': action,
+            'params': compact_params(params),
+            'elapsed': round(elapsed, 6),
+            'req': request_bytes,
+            'resp': response_bytes,
+        }
+        if error is not None:
+            entry['error'] = error
+        else:
+            entry['result'] = result_shape(result)
+
+        with self._lock:
+            if self._file is not None:
+                self._write(entry)
+                self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_trace(path: Path) -> Dict[str, Any]:
+    """
+    Read a trace file
+
+    Returns:
+        Dictionary with header and records
+    """
+    with _open(Path(path), 'r') as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get('trace') != TRACE_FORMAT:
+        raise ValueError(f"{path} is not an AnkiConnect trace")
+    return {'header': lines[0], 'records': lines[1:]}
+
+
+class TraceReplayer:
+    """Re-sends a recorded session and compares timings with the original"""
+
+    def __init__(self, trace_path: Path, url: str = 'http://localhost:8765',
+                 timeout: float = 60):
+        """
+        Args:
+            trace_path: Trace recorded by TraceRecorder
+            url: AnkiConnect (or stand-in) to replay against
+            timeout: Socket timeout per request
+        """
+        trace = load_trace(trace_path)
+        self.header = trace['header']
+        self.records = trace['records']
+        self.logger = logging.getLogger(__name__)
+        # No cache and no retries: every recorded request is sent exactly once
+        self.client = AnkiConnectClient(url, version=self.header.get('version') or 6,
+                                        timeout=timeout, cache_metadata=False,
+                                        retry_policy=RetryPolicy(max_attempts=1))
+        self.results: List[Dict[str, Any]] = []
+        self.wall_time = 0.0
+
+    def replay(self, mode: str = 'fast', speed: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        Replay the trace
+
+        Args:
+            mode: 'fast' sends requests back to back; 'paced' keeps the
+                  original start offsets (divided by speed)
+            speed: Pacing multiplier for 'paced' mode
+
+        Returns:
+            One entry per record with original and replayed timing and errors
+        """
+        if mode not in ('fast', 'paced'):
+            raise ValueError(f"Unknown replay mode: {mode}")
+
+        self.results = []
+        start = time.perf_counter()
+        for record in self.records:
+            if mode == 'paced':
+                delay = start + record['t'] / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            params = expand_params(record['params'])
+            sent = time.perf_counter()
+            error = None
+            try:
+                self.client.invoke(record['action'], **params)
+            except AnkiConnectError as e:
+                error = str(e)
+            self.results.append({
+                'action': record['action'],
+                'original': record['elapsed'],
+                'replay': time.perf_counter() - sent,
+                'original_error': record.get('error'),
+                'error': error
+            })
+
+        self.wall_time = time.perf_counter() - start
+        self.client.close()
+        return self.results
+
+    def report(self) -> Dict[str, Any]:
+        """Per-action timing diff between the original session and the replay"""
+        actions: Dict[str, Dict[str, Any]] = {}
+        for r in self.results:
+            a = actions.setdefault(r['action'], {
+                'calls': 0, 'original': Histogram(), 'replay': Histogram(),
+                'new_errors': 0, 'fixed_errors': 0
+            })
+            a['calls'] += 1
+            a['original'].observe(r['original'])
+            a['replay'].observe(r['replay'])
+            if r['error'] and not r['original_error']:
+                a['new_errors'] += 1
+            elif r['original_error'] and not r['error']:
+                a['fixed_errors'] += 1
+
+        def summary(h: Histogram) -> Dict[str, float]:
+            return {'total': round(h.total, 6), 'p50': round(h.percentile(0.5), 6),
+                    'p95': round(h.percentile(0.95), 6)}
+
+        per_action = {}
+        for action, a in sorted(actions.items(), key=lambda kv: -kv[1]['original'].total):
+            original, replay = summary(a['original']), summary(a['replay'])
+            per_action[action] = {
+                'calls': a['calls'],
+                'original': original,
+                'replay': replay,
+                'delta_pct': round(100 * (replay['total'] - original['total'])
+                                   / original['total'], 1) if original['total'] else None,
+                'new_errors': a['new_errors'],
+                'fixed_errors': a['fixed_errors']
+            }
+
+        original_wall = self.records[-1]['t'] + self.records[-1]['elapsed'] if self.records else 0.0
+        return {
+            'requests': len(self.results),
+            'original_wall_time': round(original_wall, 3),
+            'replay_wall_time': round(self.wall_time, 3),
+            'actions': per_action
+        }
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Text-to-Speech Backends
+A small backend interface over gTTS (online) and offline engines (espeak-ng
+or pyttsx3 when installed), with a synthesis cache keyed by (text, lang,
+speed, backend) in the media store
+
+Author: Assistant
+Version: 1.0
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Tuple
+
+
+SPEEDS = ('slow', 'normal')
+
+
+class TTSError(Exception):
+    """Speech synthesis failed"""
+    pass
+
+
+class TTSBackend:
+    """Interface for speech synthesis engines"""
+
+    name = 'base'
+    extension = 'mp3'
+
+    def available(self) -> bool:
+        """True if the engine can be used on this machine"""
+        raise NotImplementedError
+
+    def synthesize(self, text: str, lang: str = 'en', speed: str = 'normal') -> bytes:
+        """
+        Synthesize speech
+
+        Returns:
+            Encoded audio in the backend's extension format
+
+        Raises:
+            TTSError: Synthesis failed
+        """
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS (needs network), MP3 output"""
+
+    name = 'gtts'
+    extension = 'mp3'
+
+    def available(self) -> bool:
+        try:
+            import gtts  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def synthesize(self, text: str, lang: str = 'en', speed: str = 'normal') -> bytes:
+        from gtts import gTTS
+        import io
+
+        try:
+            tts = gTTS(text=text, lang=lang, slow=(speed == 'slow'))
+            audio_buffer = io.BytesIO()
+            tts.write_to_fp(audio_buffer)
+        except Exception as e:
+            raise TTSError(f"gTTS failed for '{text}': {e}") from e
+        return audio_buffer.getvalue()
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng (or espeak) command line engine, offline, WAV output"""
+
+    name = 'espeak'
+    extension = 'wav'
+
+    # Words per minute
+    RATES = {'slow': 130, 'normal': 170}
+
+    def __init__(self):
+        self.executable = shutil.which('espeak-ng') or shutil.which('espeak')
+
+    def available(self) -> bool:
+        return self.executable is not None
+
+    def synthesize(self, text: str, lang: str = 'en', speed: str = 'normal') -> bytes:
+        try:
+            result = subprocess.run(
+                [self.executable, '-v', lang, '-s', str(self.RATES.get(speed, 170)), '--stdout', text],
+                capture_output=True, timeout=30, check=True
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            raise TTSError(f"espeak failed for '{text}': {e}") from e
+        if not result.stdout:
+            raise TTSError(f"espeak produced no audio for '{text}'")
+        return result.stdout
+
+
+class Pyttsx3Backend(TTSBackend):
+    """pyttsx3 (SAPI5 / NSSpeechSynthesizer / espeak drivers), offline"""
+
+    name = 'pyttsx3'
+    extension = 'aiff' if sys.platform == 'darwin' else 'wav'
+
+    RATES = {'slow': 130, 'normal': 170}
+
+    # pyttsx3 engines are not thread-safe
+    _lock = threading.Lock()
+
+    def available(self) -> bool:
+        try:
+            import pyttsx3  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def synthesize(self, text: str, lang: str = 'en', speed: str = 'normal') -> bytes:
+        import pyttsx3
+
+        fd, path = tempfile.mkstemp(suffix=f".{self.extension}")
+        os.close(fd)
+        try:
+            with self._lock:
+                engine = pyttsx3.init()
+                engine.setProperty('rate', self.RATES.get(speed, 170))
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+            with open(path, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            raise TTSError(f"pyttsx3 failed for '{text}': {e}") from e
+        finally:
+            os.unlink(path)
+        if not data:
+            raise TTSError(f"pyttsx3 produced no audio for '{text}'")
+        return data
+
+
+BACKENDS = {
+    'gtts': GTTSBackend,
+    'espeak': EspeakBackend,
+    'pyttsx3': Pyttsx3Backend,
+}
+
+
+class TTSEngine:
+    """
+    Synthesize with the first working backend, caching results
+
+    Backends are tried in order per call, so an offline machine falls back
+    from gTTS to a local engine word by word.
+    """
+
+    def __init__(self, backends: Iterable[str] = ('gtts', 'espeak', 'pyttsx3'),
+                 lang: str = 'en', speed: str = 'normal', store=None,
+                 limiter=None):
+        """
+        Args:
+            backends: Backend names in order of preference
+            lang: Language code
+            speed: 'slow' or 'normal'
+            store: BlobStore for the synthesis cache (None disables caching)
+            limiter: ProviderLimiter; each call holds a slot named after the backend
+        """
+        self.logger = logging.getLogger(__name__)
+        unknown = set(backends) - set(BACKENDS)
+        if unknown:
+            raise ValueError(f"Unknown TTS backends: {sorted(unknown)}")
+        if speed not in SPEEDS:
+            raise ValueError(f"Unknown audio speed: {speed}")
+
+        self.backends: List[TTSBackend] = [b for b in (BACKENDS[n]() for n in backends) if b.available()]
+        if not self.backends:
+            self.logger.warning(f"No TTS backend available (tried {', '.join(backends)})")
+        self.lang = lang
+        self.speed = speed
+        self.store = store
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'cache_hits': 0, 'failures': 0}
+
+    @property
+    def extensions(self) -> List[str]:
+        """Possible output extensions, in backend preference order"""
+        return list(dict.fromkeys(b.extension for b in self.backends))
+
+    def cache_name(self, text: str, backend: TTSBackend) -> str:
+        """Store name of a cached synthesis"""
+        key = hashlib.sha256(f"{text}\0{self.lang}\0{self.speed}\0{backend.name}".encode('utf-8')).hexdigest()
+        return f"tts/{key}.{backend.extension}"
+
+    def is_cached(self, text: str) -> bool:
+        """True if some backend's synthesis of text is in the cache"""
+        if self.store is None:
+            return False
+        return any(self.store.path_for(self.cache_name(text, b)) is not None for b in self.backends)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def synthesize(self, text: str) -> Tuple[bytes, str, str]:
+        """
+        Synthesize text with the first backend that succeeds
+
+        Returns:
+            (audio, extension, backend name)
+
+        Raises:
+            TTSError: Every backend failed
+        """
+        errors = []
+        for backend in self.backends:
+            name = self.cache_name(text, backend)
+            if self.store is not None:
+                path = self.store.path_for(name)
+                if path is not None:
+                    self._count('cache_hits')
+                    return path.read_bytes(), backend.extension, backend.name
+
+            slot = self.limiter.slot(backend.name) if self.limiter else nullcontext()
+            try:
+                with slot:
+                    audio = backend.synthesize(text, self.lang, self.speed)
+            except TTSError as e:
+                self.logger.debug(str(e))
+                errors.append(str(e))
+                continue
+
+            if self.store is not None:
+                self.store.put(name, audio)
+            self._count(backend.name)
+            return audio, backend.extension, backend.name
+
+        self._count('failures')
+        raise TTSError("; ".join(errors) or "No TTS backend available")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
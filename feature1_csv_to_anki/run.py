@@ -18,6 +18,7 @@ import sys
 import json
 import time
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 import argparse
@@ -26,8 +27,24 @@ from typing import List, Dict, Optional, Tuple
 # Add parent dir to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from feature1_csv_to_anki.core.anki_connect import AnkiConnectClient
+from feature1_csv_to_anki.core.anki_connect import AnkiConnectClient, AnkiConnectionError
+from feature1_csv_to_anki.core.resilience import CircuitBreaker, RetryPolicy, TimeoutBudget
+from feature1_csv_to_anki.core.note_writer import ChunkedNoteWriter
 from feature1_csv_to_anki.core.card_generator import CardGenerator
+from feature1_csv_to_anki.core.media_inventory import MediaInventory
+from feature1_csv_to_anki.core.media_registry import MediaRegistry
+from feature1_csv_to_anki.core.reconcile import RegistryReconciler, reconciled_key
+from feature1_csv_to_anki.core.media_uploader import MediaUploader, UPLOAD_STRATEGIES
+from feature1_csv_to_anki.core.media_pipeline import HedgedLookup, MediaPipeline, ProviderLimiter
+from feature1_csv_to_anki.core.search_cache import SearchCache
+from feature1_csv_to_anki.core.blob_store import BlobStore
+from feature1_csv_to_anki.core.cache_manager import CacheManager
+from feature1_csv_to_anki.core.image_normalizer import ImageNormalizer
+from feature1_csv_to_anki.core.stream_download import DownloadRejected, StreamingDownloader
+from feature1_csv_to_anki.core.renditions import choose_rendition
+from feature1_csv_to_anki.core.text_image import render_batch, render_text_image
+from feature1_csv_to_anki.core.tts import TTSEngine, TTSError
+from feature1_csv_to_anki.core.provider_stats import ProviderScoreboard
 from shared.config import Config
 from shared.utils import setup_logging, colored_print
 
@@ -35,71 +52,57 @@ from shared.utils import setup_logging, colored_print
 class ProfileAwareMediaCache:
     """Media cache aware của multiple profiles"""
     
-    def __init__(self, cache_file: Path = None, anki_client=None):
+    def __init__(self, cache_file: Path = None, anki_client=None, trust_hours: float = 24):
         self.cache_file = cache_file or Path("media_cache/media_registry.json")
         self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-        self.cache_data = self._load_cache()
+        self.registry = MediaRegistry(self.cache_file.with_suffix('.sqlite3'))
+        self._load_cache()
         self.anki_client = anki_client
         self.current_profile = None
         self.anki_media_dir = None
+        self.inventory = None
+        # Within trust_hours of a reconciliation, registered files are
+        # assumed to be in Anki without checking each one
+        self.trust_hours = trust_hours
+        self.trusted = False
         
-    def _load_cache(self) -> Dict[str, any]:
-        """Load cache from JSON file"""
+    def _load_cache(self):
+        """Migrate a JSON registry (v1 single-profile or v2) into the SQLite registry once"""
         if self.cache_file.exists():
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Migrate to profile-aware format
-                    if isinstance(data, dict) and 'profiles' not in data:
-                        return {
-                            'version': '2.0',
-                            'last_updated': datetime.now().isoformat(),
-                            'profiles': {
-                                'User 1': {  # Default profile for old data
-                                    'media': data.get('media', {}),
-                                    'anki_media_dir': data.get('anki_media_dir')
-                                }
-                            }
-                        }
-                    return data
+                self.registry.migrate_json(self.cache_file)
             except Exception as e:
-                logging.warning(f"Failed to load cache: {e}")
-        
-        return {
-            'version': '2.0',
-            'last_updated': datetime.now().isoformat(),
-            'profiles': {}
-        }
-    
-    def _save_cache(self):
-        """Save cache to JSON file"""
-        self.cache_data['last_updated'] = datetime.now().isoformat()
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logging.error(f"Failed to save cache: {e}")
+                logging.warning(f"Failed to migrate media registry {self.cache_file}: {e}")
+
+    def close(self):
+        self.registry.close()
     
     def set_current_profile(self, profile_name: str):
         """Set current active profile"""
         self.current_profile = profile_name
         
-        # Initialize profile data if not exists
-        if profile_name not in self.cache_data['profiles']:
-            self.cache_data['profiles'][profile_name] = {
-                'media': {},
-                'anki_media_dir': None
-            }
-        
         # Detect media directory for this profile
         self.anki_media_dir = self._detect_anki_media_dir_for_profile(profile_name)
+
+        reconciled_at = self.registry.get_meta(reconciled_key(profile_name))
+        self.trusted = bool(reconciled_at and self.trust_hours and
+                            (datetime.now() - datetime.fromisoformat(reconciled_at)).total_seconds()
+                            < self.trust_hours * 3600)
+        if self.trusted:
+            colored_print(f"✅ Media registry reconciled at {reconciled_at[:16]}; trusting it", "green")
+
+        # One snapshot of the profile's media answers all existence checks
+        if self.anki_media_dir:
+            self.inventory = MediaInventory(self.anki_client, self.anki_media_dir)
+        elif self.anki_client:
+            self.inventory = self.anki_client.media_inventory()
+        else:
+            self.inventory = None
     
     def _detect_anki_media_dir_for_profile(self, profile_name: str) -> Optional[Path]:
         """Detect Anki media directory for specific profile"""
-        profile_data = self.cache_data['profiles'].get(profile_name, {})
-        
         # Try cached path first
-        cached_dir = profile_data.get('anki_media_dir')
+        cached_dir = self.registry.get_media_dir(profile_name)
         if cached_dir and Path(cached_dir).exists():
             colored_print(f"✅ Using cached media directory for {profile_name}: {cached_dir}", "green")
             return Path(cached_dir)
@@ -125,8 +128,7 @@ class ProfileAwareMediaCache:
                     # Additional validation
                     if self._validate_anki_media_dir(path, profile_name):
                         # Cache the found path
-                        self.cache_data['profiles'][profile_name]['anki_media_dir'] = str(path)
-                        self._save_cache()
+                        self.registry.set_media_dir(profile_name, str(path))
                         colored_print(f"✅ Auto-detected media directory for {profile_name}: {path}", "green")
                         return path
             except Exception as e:
@@ -208,8 +210,7 @@ class ProfileAwareMediaCache:
             if user_path:
                 user_path = Path(user_path)
                 if user_path.exists() and user_path.is_dir():
-                    self.cache_data['profiles'][profile_name]['anki_media_dir'] = str(user_path)
-                    self._save_cache()
+                    self.registry.set_media_dir(profile_name, str(user_path))
                     colored_print(f"✅ Using user-specified directory for {profile_name}: {user_path}", "green")
                     return user_path
                 else:
@@ -230,129 +231,226 @@ class ProfileAwareMediaCache:
         """Check if file is in cache for current profile"""
         if not self.current_profile:
             return False
-        profile_data = self.cache_data['profiles'].get(self.current_profile, {})
-        return filename in profile_data.get('media', {})
+        return self.registry.contains(self.current_profile, filename, verified_only=True)
     
     def is_in_anki(self, filename: str) -> bool:
-        """Check if file exists in current profile's Anki media directory"""
+        """Check if file exists in current profile's Anki media collection"""
+        if self.inventory is not None:
+            try:
+                return filename in self.inventory
+            except Exception as e:
+                logging.debug(f"Media inventory unavailable, checking file directly: {e}")
         anki_path = self.get_anki_path(filename)
-        return anki_path and anki_path.exists()
+        return bool(anki_path and anki_path.exists())
     
     def add_to_cache(self, filename: str, metadata: Dict[str, any] = None):
         """Add file to cache registry for current profile"""
         if not self.current_profile:
             return
         
-        if self.current_profile not in self.cache_data['profiles']:
-            self.cache_data['profiles'][self.current_profile] = {'media': {}, 'anki_media_dir': None}
-        
-        self.cache_data['profiles'][self.current_profile]['media'][filename] = {
-            'added_date': datetime.now().isoformat(),
-            'metadata': metadata or {},
-            'verified': True
-        }
-        self._save_cache()
+        self.registry.add(self.current_profile, filename, metadata)
+        if self.inventory is not None:
+            self.inventory.add(filename)
     
     def remove_from_cache(self, filename: str):
         """Remove file from cache registry for current profile"""
         if not self.current_profile:
             return
         
-        profile_data = self.cache_data['profiles'].get(self.current_profile, {})
-        media_data = profile_data.get('media', {})
-        
-        if filename in media_data:
-            del media_data[filename]
-            self._save_cache()
+        self.registry.remove(self.current_profile, filename)
     
     def get_cache_stats(self) -> Dict[str, any]:
         """Get cache statistics for current profile"""
         if not self.current_profile:
             return {'error': 'No profile selected'}
         
-        profile_data = self.cache_data['profiles'].get(self.current_profile, {})
-        media_data = profile_data.get('media', {})
-        
-        total_files = len(media_data)
-        verified_files = sum(1 for f in media_data.values() if f.get('verified', False))
+        stats = self.registry.get_stats(self.current_profile)
         
         return {
             'profile': self.current_profile,
-            'total_files': total_files,
-            'verified_files': verified_files,
+            'total_files': stats['total_files'],
+            'verified_files': stats['verified_files'],
             'anki_media_dir': str(self.anki_media_dir) if self.anki_media_dir else None,
-            'last_updated': self.cache_data.get('last_updated')
+            'last_updated': stats['last_updated']
         }
 
 
 class ProfileAwareMediaDownloader:
     """Media downloader với profile awareness"""
     
-    def __init__(self, anki_client=None, cache_file: Path = None):
+    def __init__(self, anki_client=None, cache_file: Path = None,
+                 upload_strategies: List[str] = None,
+                 provider_limits: Dict[str, Dict[str, float]] = None,
+                 hedged_lookup: Dict = None,
+                 search_cache: Dict = None,
+                 store_dir: Path = None,
+                 normalize: Dict = None,
+                 max_download_size: int = None,
+                 download_timeout: float = 15,
+                 download_deadline: float = 30,
+                 tts: Dict = None,
+                 adaptive_providers: Dict = None,
+                 registry_trust_hours: float = 24,
+                 cache_limits: Dict = None):
         self.logger = logging.getLogger(__name__)
         self.anki_client = anki_client
-        self.cache = ProfileAwareMediaCache(cache_file, anki_client)
+        self.cache = ProfileAwareMediaCache(cache_file, anki_client, trust_hours=registry_trust_hours)
         self.current_profile = None
 
+        # Upload strategy preference; the usable ones are resolved per profile
+        self.upload_strategies = upload_strategies or list(UPLOAD_STRATEGIES)
+        self.uploader = None
+
+        # When set, uploads are queued into this AnkiBatch instead of sent one by one
+        self.upload_batch = None
+        self.failed_uploads = set()
+
         # API Keys
         self.pixabay_key = os.environ.get('PIXABAY_API_KEY', '50872335-2b97ba59b3d6f172e1a571e5b')
         self.pexels_key = os.environ.get('PEXELS_API_KEY', 'NcnIox2PfBjNR7R8cTqiPR5dG47uXdenfN8VZReGgPgIXlIVNxdGmj68')
         self.unsplash_key = os.environ.get('UNSPLASH_API_KEY', 'h9kVF9j3KpUYeHd_O1ywkNtappE2pyFebrZh-e2583s')
 
-        # Rate limiting
-        self.last_api_call = {}
-        self.api_delays = {
-            'pixabay': 0.5,
-            'pexels': 0.5,
-            'unsplash': 0.5,
-            'langeek': 1.0
-        }
+        # Per-provider token buckets and concurrency caps, shared by pipeline workers
+        self.limiter = ProviderLimiter(provider_limits)
+
+        # Provider search results (and empty results) persisted across runs
+        search_cache = search_cache or {}
+        self.search_cache = None
+        if search_cache.get('enabled', True):
+            self.search_cache = SearchCache(
+                Path(search_cache.get('path', 'media_cache/search_cache.sqlite3')),
+                ttl_days=search_cache.get('ttl_days', 30),
+                negative_ttl_days=search_cache.get('negative_ttl_days', 7)
+            )
+
+        # Learned provider order (hit rate and latency per part of speech)
+        adaptive_providers = adaptive_providers or {}
+        self.scoreboard = None
+        if adaptive_providers.get('enabled', True):
+            self.scoreboard = ProviderScoreboard(
+                Path(adaptive_providers.get('path', 'media_cache/provider_stats.json')),
+                explore_rate=adaptive_providers.get('explore_rate', 0.1),
+                min_samples=adaptive_providers.get('min_samples', 20),
+                skip_below=adaptive_providers.get('skip_below', 0.05)
+            )
+
+        # Query all image providers at once for the top search term
+        hedged_lookup = hedged_lookup or {}
+        self.hedge = None
+        if hedged_lookup.get('enabled', True):
+            self.hedge = HedgedLookup(
+                hedged_lookup.get('preference', ['langeek', 'pexels', 'unsplash', 'pixabay']),
+                policy=hedged_lookup.get('policy', 'preference'),
+                grace=hedged_lookup.get('grace', 0.5),
+                timeout=hedged_lookup.get('timeout', 20)
+            )
+
+        # Size-capped streaming image downloads
+        self.fetcher = StreamingDownloader(max_bytes=max_download_size or 2 * 1024 * 1024,
+                                           timeout=(5, download_timeout),
+                                           deadline=download_deadline)
+
+        # Downscale and re-encode new images before they are stored and uploaded
+        normalize = normalize or {}
+        self.normalizer = None
+        if normalize.get('enabled', True):
+            self.normalizer = ImageNormalizer(
+                box=(normalize.get('max_width', 500), normalize.get('max_height', 400)),
+                fmt=normalize.get('format', 'JPEG'),
+                quality=normalize.get('quality', 85),
+                max_bytes=normalize.get('max_bytes'),
+                workers=normalize.get('workers', 2)
+            )
 
-        # Local cache directories
-        self.image_cache = Path("media_cache/images")
-        self.audio_cache = Path("media_cache/audio")
-        self.image_cache.mkdir(parents=True, exist_ok=True)
-        self.audio_cache.mkdir(parents=True, exist_ok=True)
+        # Smallest provider rendition worth downloading: what the normalizer keeps
+        self.rendition_target = self.normalizer.box if self.normalizer else (500, 400)
+
+        # Content-addressed local media store, shared by all profiles
+        self.store = BlobStore(Path(store_dir or "media_cache/store"))
+        # Fold in the flat per-word cache directories used before the store
+        # (once per store; the directories themselves are left untouched)
+        self.store.import_legacy((Path("media_cache/images"), Path("media_cache/audio")))
+
+        # Byte/file caps on the store with LRU or LFU eviction; media of
+        # recent imports is pinned
+        cache_limits = cache_limits or {}
+        self.cache_manager = None
+        if cache_limits.get('enabled', True):
+            self.cache_manager = CacheManager(
+                self.store,
+                Path(cache_limits.get('path', 'media_cache/cache_access.sqlite3')),
+                max_bytes=cache_limits.get('max_bytes', 2 * 1024 ** 3),
+                max_files=cache_limits.get('max_files', 50000),
+                policy=cache_limits.get('policy', 'lru'),
+                pin_days=cache_limits.get('pin_days', 7)
+            )
+
+        # Speech synthesis: gTTS with offline fallbacks, cached in the store
+        tts = tts or {}
+        self.tts = TTSEngine(
+            backends=tts.get('backends', ['gtts', 'espeak', 'pyttsx3']),
+            lang=tts.get('lang', 'en'),
+            speed=tts.get('speed', 'normal'),
+            store=self.store,
+            limiter=self.limiter
+        )
     
     def set_profile(self, profile_name: str):
         """Set current profile for media operations"""
         self.current_profile = profile_name
         self.cache.set_current_profile(profile_name)
+        self.uploader = MediaUploader(self.anki_client, self.cache.anki_media_dir,
+                                      self.upload_strategies)
         colored_print(f"📝 Media downloader set to profile: {profile_name}", "cyan")
+        colored_print(f"📤 Media upload strategy: {self.uploader.preferred_strategy or 'none available'}", "cyan")
 
     def download_image(self, word: str, part_of_speech: str = None,
                        vietnamese: str = None, force_download: bool = False) -> Optional[str]:
         """Download image for current profile"""
+        return self.store_fetched(self.fetch_image(word, part_of_speech, vietnamese, force_download))
+
+    def download_audio(self, word: str, pronunciation: str = None,
+                       force_download: bool = False) -> Optional[str]:
+        """Download audio for current profile"""
+        return self.store_fetched(self.fetch_audio(word, pronunciation, force_download))
+
+    def fetch_image(self, word: str, part_of_speech: str = None, vietnamese: str = None,
+                    force_download: bool = False) -> Optional[Tuple[str, Optional[Path], Dict]]:
+        """
+        Make an image available locally without uploading it (thread-safe)
+
+        Returns:
+            (filename, local_path, metadata); local_path is None when the file
+            is already in Anki. None if no image could be obtained.
+        """
         if not self.current_profile:
             self.logger.error("No profile set for media downloader")
             return None
             
-        filename = f"{word.lower().replace(' ', '_')}.jpg"
-        local_path = self.image_cache / filename
+        filename = self._image_filename(word)
 
         # Smart cache check
         if not force_download:
             if self.cache.is_in_cache(filename):
-                if self.cache.is_in_anki(filename):
+                if self.cache.trusted or self.cache.is_in_anki(filename):
                     self.logger.info(f"Image in cache and Anki [{self.current_profile}]: {filename}")
-                    return filename
+                    return filename, None, None
                 else:
                     self.cache.remove_from_cache(filename)
                     self.logger.warning(f"Image was in cache but not in Anki [{self.current_profile}]: {filename}")
 
-        # Check local cache for re-upload
-        if local_path.exists() and not force_download:
+        metadata = {
+            'word': word,
+            'part_of_speech': part_of_speech,
+            'vietnamese': vietnamese,
+            'profile': self.current_profile
+        }
+
+        # Check local store for re-upload
+        local_path = None if force_download else self.store.path_for(filename)
+        if local_path is not None:
             self.logger.info(f"Using cached image [{self.current_profile}]: {local_path}")
-            if self._upload_to_anki(local_path, filename):
-                metadata = {
-                    'word': word,
-                    'part_of_speech': part_of_speech,
-                    'vietnamese': vietnamese,
-                    'source': 'local_cache',
-                    'profile': self.current_profile
-                }
-                self.cache.add_to_cache(filename, metadata)
-                return filename
+            return filename, local_path, {**metadata, 'source': 'local_cache'}
 
         # Download new image
         self.logger.info(f"Downloading new image [{self.current_profile}]: {word}")
@@ -360,158 +458,263 @@ class ProfileAwareMediaDownloader:
 
         if image_data:
             try:
-                # Save to local cache
-                with open(local_path, 'wb') as f:
-                    f.write(image_data)
+                if self.normalizer:
+                    image_data = self.normalizer.normalize(image_data)
+                # Save to local store
+                local_path = self.store.put(filename, image_data)
                 self.logger.info(f"Saved image locally [{self.current_profile}]: {local_path}")
-
-                # Upload to Anki
-                if self._upload_to_anki(local_path, filename):
-                    metadata = {
-                        'word': word,
-                        'part_of_speech': part_of_speech,
-                        'vietnamese': vietnamese,
-                        'source': source,
-                        'profile': self.current_profile
-                    }
-                    self.cache.add_to_cache(filename, metadata)
-                    return filename
-
+                return filename, local_path, {**metadata, 'source': source}
             except Exception as e:
                 self.logger.error(f"Failed to save image [{self.current_profile}] {filename}: {e}")
 
         return None
 
-    def download_audio(self, word: str, pronunciation: str = None, 
-                      force_download: bool = False) -> Optional[str]:
-        """Download audio for current profile"""
+    def fetch_audio(self, word: str, pronunciation: str = None,
+                    force_download: bool = False) -> Optional[Tuple[str, Optional[Path], Dict]]:
+        """
+        Make audio available locally without uploading it (thread-safe)
+
+        Returns:
+            Same as fetch_image
+        """
         if not self.current_profile:
             self.logger.error("No profile set for media downloader")
             return None
             
-        filename = f"{word.lower().replace(' ', '_')}.mp3"
-        local_path = self.audio_cache / filename
+        base = word.lower().replace(' ', '_')
 
-        # Smart cache check
+        # Smart cache check (any extension a configured TTS backend produces)
         if not force_download:
-            if self.cache.is_in_cache(filename):
-                if self.cache.is_in_anki(filename):
-                    self.logger.info(f"Audio in cache and Anki [{self.current_profile}]: {filename}")
-                    return filename
-                else:
-                    self.cache.remove_from_cache(filename)
-                    self.logger.warning(f"Audio was in cache but not in Anki [{self.current_profile}]: {filename}")
-
-        # Check local cache for re-upload
-        if local_path.exists() and not force_download:
-            self.logger.info(f"Using cached audio [{self.current_profile}]: {local_path}")
-            if self._upload_to_anki(local_path, filename):
-                metadata = {
-                    'word': word,
-                    'pronunciation': pronunciation,
-                    'source': 'tts_generated',
-                    'profile': self.current_profile
-                }
-                self.cache.add_to_cache(filename, metadata)
-                return filename
+            for extension in self.tts.extensions or ['mp3']:
+                filename = f"{base}.{extension}"
+                if self.cache.is_in_cache(filename):
+                    if self.cache.trusted or self.cache.is_in_anki(filename):
+                        self.logger.info(f"Audio in cache and Anki [{self.current_profile}]: {filename}")
+                        return filename, None, None
+                    else:
+                        self.cache.remove_from_cache(filename)
+                        self.logger.warning(f"Audio was in cache but not in Anki [{self.current_profile}]: {filename}")
+
+        metadata = {
+            'word': word,
+            'pronunciation': pronunciation,
+            'source': 'tts_generated',
+            'profile': self.current_profile
+        }
 
-        # Generate new audio
-        self.logger.info(f"Generating new audio [{self.current_profile}]: {word}")
+        # Generate new audio (served from the synthesis cache when the text,
+        # language, speed and backend match an earlier run)
+        self.logger.info(f"Generating audio [{self.current_profile}]: {word}")
         try:
-            from gtts import gTTS
-            import io
-            
-            tts = gTTS(text=word, lang='en', slow=False)
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_data = audio_buffer.getvalue()
-
-            # Save to local cache
-            with open(local_path, 'wb') as f:
-                f.write(audio_data)
-            self.logger.info(f"Saved audio locally [{self.current_profile}]: {local_path}")
+            audio_data, extension, backend = self.tts.synthesize(word)
+            filename = f"{base}.{extension}"
 
-            # Upload to Anki
-            if self._upload_to_anki(local_path, filename):
-                metadata = {
-                    'word': word,
-                    'pronunciation': pronunciation,
-                    'source': 'tts_generated',
-                    'profile': self.current_profile
-                }
-                self.cache.add_to_cache(filename, metadata)
-                return filename
+            # Save to local store
+            local_path = self.store.put(filename, audio_data)
+            self.logger.info(f"Saved audio locally [{self.current_profile}]: {local_path}")
+            return filename, local_path, {**metadata, 'tts_backend': backend}
 
-        except Exception as e:
+        except TTSError as e:
             self.logger.error(f"Failed to generate audio [{self.current_profile}] for {word}: {e}")
 
+        # Offline with no local engine: re-use audio stored by an earlier run
+        if not force_download:
+            for extension in self.tts.extensions or ['mp3']:
+                filename = f"{base}.{extension}"
+                local_path = self.store.path_for(filename)
+                if local_path is not None:
+                    self.logger.info(f"Using cached audio [{self.current_profile}]: {local_path}")
+                    return filename, local_path, metadata
+
         return None
 
-    def _upload_to_anki(self, file_path: Path, filename: str) -> bool:
-        """Upload file to current profile's Anki"""
-        if not self.anki_client:
-            # Direct copy to profile's media directory
-            anki_path = self.cache.get_anki_path(filename)
-            if anki_path:
-                try:
-                    import shutil
-                    shutil.copy2(file_path, anki_path)
-                    self.logger.info(f"Copied directly to Anki [{self.current_profile}]: {anki_path}")
-                    return True
-                except Exception as e:
-                    self.logger.error(f"Failed to copy to Anki directory [{self.current_profile}]: {e}")
+    def _image_filename(self, word: str) -> str:
+        extension = self.normalizer.extension if self.normalizer else 'jpg'
+        return f"{word.lower().replace(' ', '_')}.{extension}"
+
+    def prefetch_image(self, word: str, part_of_speech: str = None, vietnamese: str = None) -> str:
+        """
+        Make sure the local store has an image for a word (no Anki or profile needed)
+
+        Returns:
+            'cached', 'fetched', 'missing' (no provider has one; see
+            store_fallback_images) or 'failed'
+        """
+        filename = self._image_filename(word)
+        if self.store.path_for(filename) is not None:
+            return 'cached'
+        try:
+            image_data, _ = self._download_image_data(word, part_of_speech, vietnamese, fallback=False)
+            if not image_data:
+                return 'missing'
+            if self.normalizer:
+                image_data = self.normalizer.normalize(image_data)
+            self.store.put(filename, image_data)
+            return 'fetched'
+        except Exception as e:
+            self.logger.error(f"Prefetch failed for image of {word}: {e}")
+            return 'failed'
+
+    def store_fallback_images(self, words: List[Tuple[str, Optional[str]]], workers: int = None) -> int:
+        """
+        Render text images for (word, vietnamese) pairs in a process pool and store them
+
+        Returns:
+            Number of images stored
+        """
+        images = render_batch(words, workers=workers)
+        for (word, _), image_data in zip(words, images):
+            if self.normalizer:
+                image_data = self.normalizer.normalize(image_data)
+            self.store.put(self._image_filename(word), image_data)
+        return len(images)
+
+    def prefetch_audio(self, word: str) -> str:
+        """
+        Make sure the synthesis cache has audio for a word
+
+        Returns:
+            'cached', 'fetched' or 'failed'
+        """
+        if self.tts.is_cached(word):
+            return 'cached'
+        try:
+            audio_data, extension, _ = self.tts.synthesize(word)
+            self.store.put(f"{word.lower().replace(' ', '_')}.{extension}", audio_data)
+            return 'fetched'
+        except TTSError as e:
+            self.logger.error(f"Prefetch failed for audio of {word}: {e}")
+            return 'failed'
+
+    def store_fetched(self, fetched: Optional[Tuple[str, Optional[Path], Dict]]) -> Optional[str]:
+        """
+        Upload a fetch_image/fetch_audio result to Anki
+
+        Uploads go through upload_batch, which is not thread-safe: call this
+        from the thread that owns the batch.
+
+        Returns:
+            Filename to reference in the note, or None
+        """
+        if fetched is None:
+            return None
+        filename, local_path, metadata = fetched
+        if local_path is None:
+            return filename
+        if self._upload_to_anki(local_path, filename, metadata):
+            return filename
+        return None
+
+    def _upload_to_anki(self, file_path: Path, filename: str, metadata: Dict[str, any] = None) -> bool:
+        """
+        Upload file to current profile's Anki and register it in the cache
+
+        The uploader prefers placing the file straight into collection.media,
+        then AnkiConnect's path mode, and only then base64 data. With an active
+        upload_batch AnkiConnect uploads are only queued: True means "queued",
+        and the registry is updated once the batch is flushed. Files whose
+        queued upload fails are collected in failed_uploads.
+        """
+        if self.uploader is None:
+            self.logger.error("No profile set for media uploads")
             return False
 
+        def on_done(strategy: str, error: Optional[str]):
+            if error is None:
+                self.logger.info(f"Uploaded to Anki via {strategy} [{self.current_profile}]: {filename}")
+                self.cache.add_to_cache(filename, metadata)
+            else:
+                self.logger.error(f"Failed to upload to Anki [{self.current_profile}] {filename}: {error}")
+                self.failed_uploads.add(filename)
+
         try:
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-            self.anki_client.store_media_file(filename, file_data)
-            self.logger.info(f"Uploaded to Anki via AnkiConnect [{self.current_profile}]: {filename}")
-            return True
+            strategy = self.uploader.upload(file_path, filename, self.upload_batch, on_done)
         except Exception as e:
             self.logger.error(f"Failed to upload to Anki [{self.current_profile}]: {e}")
             return False
 
+        if strategy is None:
+            self.logger.error(f"Failed to upload to Anki [{self.current_profile}]: {filename}")
+            return False
+        return True
+
     # ... [Include all the _download_image_data, _try_* methods from previous version]
-    def _download_image_data(self, word: str, part_of_speech: str = None, vietnamese: str = None):
-        """Download image data from various sources"""
+    def _download_image_data(self, word: str, part_of_speech: str = None, vietnamese: str = None,
+                             fallback: bool = True):
+        """Download image data from various sources (a text image if none has one and fallback is set)"""
         import requests
         from PIL import Image, ImageDraw, ImageFont
         import io
         
-        # Try Langeek first
-        image_data, _ = self._try_langeek(word)
-        if image_data:
-            return image_data, 'langeek'
-
-        # Try other APIs
-        for term in self._get_search_terms(word, part_of_speech, vietnamese):
-            if self.pexels_key:
-                image_data = self._try_pexels(term)
-                if image_data:
-                    return image_data, 'pexels'
-            
-            if self.unsplash_key:
-                image_data = self._try_unsplash(term)
-                if image_data:
-                    return image_data, 'unsplash'
-            
-            image_data = self._try_pixabay(term)
+        terms = self._get_search_terms(word, part_of_speech, vietnamese)
+
+        # Provider order: fixed, or learned from past hit rate and latency
+        providers = ['langeek'] + [name for name, key in (('pexels', self.pexels_key),
+                                                          ('unsplash', self.unsplash_key),
+                                                          ('pixabay', True)) if key]
+        if self.scoreboard:
+            providers = self.scoreboard.order(providers, part_of_speech)
+
+        langeek_tried = False
+        if self.hedge:
+            image_data, source = self._hedged_image_lookup(word, terms[0], providers, part_of_speech)
             if image_data:
-                return image_data, 'pixabay'
+                return image_data, source
+            # Langeek and the top term were already tried
+            langeek_tried = True
+            terms = terms[1:]
+
+        # Try the providers term by term (Langeek looks up the word itself, once)
+        for term in terms:
+            for provider in providers:
+                if provider == 'langeek':
+                    if langeek_tried:
+                        continue
+                    langeek_tried = True
+                    image_data, _ = self._try_langeek(word, pos=part_of_speech)
+                else:
+                    image_data = getattr(self, f"_try_{provider}")(term, pos=part_of_speech)
+                if image_data:
+                    return image_data, provider
+
+        if not fallback:
+            return None, None
 
         # Fallback to text image
         self.logger.warning(f"No image found for {word}, creating text image")
         text_image = self._create_text_image(word, vietnamese)
         return text_image, 'text_generated'
 
+    def _hedged_image_lookup(self, word: str, term: str, providers: List[str],
+                             part_of_speech: str = None):
+        """Query the given providers in parallel and keep one image"""
+        attempts = {}
+        for provider in providers:
+            if provider == 'langeek':
+                attempts[provider] = lambda cancel: self._try_langeek(word, cancel, pos=part_of_speech)[0]
+            else:
+                attempts[provider] = (lambda fn: lambda cancel: fn(term, cancel, pos=part_of_speech))(
+                    getattr(self, f"_try_{provider}"))
+        # Learned order replaces the configured preference when adaptive ordering is on
+        return self.hedge.run(attempts, preference=providers if self.scoreboard else None)
+
+    def close(self):
+        if self.scoreboard:
+            self.scoreboard.save()
+        if self.hedge:
+            self.hedge.close()
+        if self.search_cache:
+            self.search_cache.close()
+        if self.normalizer:
+            self.normalizer.close()
+        if self.cache_manager:
+            self.cache_manager.close()
+        self.store.close()
+        self.cache.close()
+
     def _respect_rate_limit(self, api_name: str):
-        if api_name in self.last_api_call:
-            elapsed = time.time() - self.last_api_call[api_name]
-            delay_needed = self.api_delays.get(api_name, 0.5)
-            if elapsed < delay_needed:
-                time.sleep(delay_needed - elapsed)
-        self.last_api_call[api_name] = time.time()
+        """Wait for a rate token of the provider (see self.limiter)"""
+        self.limiter.acquire(api_name)
 
     def _get_search_terms(self, word: str, part_of_speech: str = None, vietnamese: str = None) -> List[str]:
         terms = []
@@ -526,125 +729,166 @@ class ProfileAwareMediaDownloader:
         terms.append(word)
         return terms
 
-    def _try_langeek(self, word: str):
+    def _download_url(self, url: str, cancel: threading.Event = None) -> Optional[bytes]:
+        """Stream an image; raises DownloadRejected for unusable responses"""
+        if cancel and cancel.is_set():
+            return None
+        return self.fetcher.fetch(url, cancel)
+
+    def _cached_search(self, provider: str, term: str, search,
+                       cancel: threading.Event = None, pos: str = None) -> Optional[bytes]:
+        """
+        Run a provider search through the search cache and download its image
+
+        Args:
+            provider: Provider name (limiter and cache key)
+            term: Search term
+            search: Callable returning (url, width, height), or None when the
+                    provider has no image; raises on API errors (not cached)
+            cancel: Set when a hedged lookup no longer needs the result
+            pos: Part of speech of the word, for the provider scoreboard
+
+        Returns:
+            Image bytes or None
+        """
+        if cancel and cancel.is_set():
+            return None
+
+        cached = self.search_cache.get(provider, term) if self.search_cache else None
+        if cached is not None:
+            if cached['url'] is None:
+                self.logger.debug(f"{provider}: cached empty result for '{term}'")
+                return None
+            try:
+                image_data = self._download_url(cached['url'], cancel)
+                if image_data:
+                    return image_data
+            except Exception as e:
+                self.logger.debug(f"{provider}: cached image for '{term}' failed: {e}")
+            # The URL went stale: search again
+            self.search_cache.invalidate(provider, term)
+
+        # Time includes the rate-limit wait: that is what a slow provider costs
+        started = time.monotonic()
+        image_data = None
+        # Scoreboard outcome: None until the provider was actually searched
+        hit = None
+        try:
+            with self.limiter.slot(provider):
+                # The hedged lookup may have been decided while this attempt
+                # waited for a slot or rate token; don't spend quota on it
+                if cancel and cancel.is_set():
+                    return None
+                try:
+                    found = search()
+                    hit = found is not None
+                    if found is None:
+                        if self.search_cache:
+                            self.search_cache.put_miss(provider, term)
+                    else:
+                        url, width, height = found
+                        if self.search_cache:
+                            self.search_cache.put(provider, term, url, width, height)
+                        image_data = self._download_url(url, cancel)
+                        # A download cut short by a hedged lookup still found an image
+                        hit = image_data is not None or bool(cancel and cancel.is_set())
+                except DownloadRejected as e:
+                    # The provider's top hit is unusable; treat it like no result
+                    self.logger.info(f"{provider}: rejected image for '{term}': {e}")
+                    hit = False
+                    if self.search_cache:
+                        self.search_cache.put_miss(provider, term)
+                except Exception as e:
+                    self.logger.debug(f"{provider.capitalize()} API error for {term}: {e}")
+                    hit = False
+        finally:
+            # Every searched attempt counts, including hedged ones that lost the
+            # race, so slower providers that do find images are not stuck at the
+            # prior; only attempts cancelled before searching are left out
+            if self.scoreboard and hit is not None:
+                self.scoreboard.record(provider, pos, hit,
+                                       time.monotonic() - started, len(image_data or b''))
+        return image_data
+
+    def _try_langeek(self, word: str, cancel: threading.Event = None, pos: str = None):
         import requests
-        self._respect_rate_limit('langeek')
         url = f"https://api.langeek.co/v1/cs/en/word/?term={word}&filter=,inCategory,photo"
         headers = {'Accept': 'application/json', 'User-Agent': 'Mozilla/5.0'}
-        try:
+        info = {}
+
+        def search():
             response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    word_info = data[0]
-                    photo_url = None
-                    if 'translations' in word_info:
-                        for pos, translations in word_info['translations'].items():
-                            for translation in translations:
-                                if translation.get('wordPhoto', {}).get('photo'):
-                                    photo_url = translation['wordPhoto']['photo']
-                                    break
-                            if photo_url:
+            response.raise_for_status()
+            data = response.json()
+            if data and len(data) > 0:
+                word_info = data[0]
+                photo_url = None
+                if 'translations' in word_info:
+                    for pos, translations in word_info['translations'].items():
+                        for translation in translations:
+                            if translation.get('wordPhoto', {}).get('photo'):
+                                photo_url = translation['wordPhoto']['photo']
                                 break
-                    if photo_url:
-                        img_response = requests.get(photo_url, timeout=15)
-                        if img_response.status_code == 200:
-                            return img_response.content, word_info
-        except Exception as e:
-            self.logger.debug(f"Langeek API error for {word}: {e}")
-        return None, None
+                        if photo_url:
+                            break
+                if photo_url:
+                    info['word'] = word_info
+                    return photo_url, None, None
+            return None
 
-    def _try_pexels(self, search_term: str):
+        return self._cached_search('langeek', word, search, cancel, pos), info.get('word')
+
+    def _try_pexels(self, search_term: str, cancel: threading.Event = None, pos: str = None):
         import requests
         if not self.pexels_key:
             return None
-        self._respect_rate_limit('pexels')
         headers = {'Authorization': self.pexels_key}
         url = f"https://api.pexels.com/v1/search?query={search_term}&per_page=3"
-        try:
+
+        def search():
             response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('photos'):
-                    photo = data['photos'][0]
-                    img_url = photo['src']['medium']
-                    img_response = requests.get(img_url, timeout=15)
-                    if img_response.status_code == 200:
-                        return img_response.content
-        except Exception as e:
-            self.logger.debug(f"Pexels API error: {e}")
-        return None
+            response.raise_for_status()
+            data = response.json()
+            if data.get('photos'):
+                return choose_rendition('pexels', data['photos'], self.rendition_target)
+            return None
+
+        return self._cached_search('pexels', search_term, search, cancel, pos)
 
-    def _try_unsplash(self, search_term: str):
+    def _try_unsplash(self, search_term: str, cancel: threading.Event = None, pos: str = None):
         import requests
         if not self.unsplash_key:
             return None
-        self._respect_rate_limit('unsplash')
         url = f"https://api.unsplash.com/search/photos"
         params = {'query': search_term, 'per_page': 3, 'client_id': self.unsplash_key}
-        try:
+
+        def search():
             response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('results'):
-                    photo = data['results'][0]
-                    img_url = photo['urls']['small']
-                    img_response = requests.get(img_url, timeout=15)
-                    if img_response.status_code == 200:
-                        return img_response.content
-        except Exception as e:
-            self.logger.debug(f"Unsplash API error: {e}")
-        return None
+            response.raise_for_status()
+            data = response.json()
+            if data.get('results'):
+                return choose_rendition('unsplash', data['results'], self.rendition_target)
+            return None
 
-    def _try_pixabay(self, search_term: str):
+        return self._cached_search('unsplash', search_term, search, cancel, pos)
+
+    def _try_pixabay(self, search_term: str, cancel: threading.Event = None, pos: str = None):
         import requests
-        self._respect_rate_limit('pixabay')
         url = "https://pixabay.com/api/"
         params = {'key': self.pixabay_key, 'q': search_term, 'image_type': 'photo', 'per_page': 3, 'safesearch': 'true'}
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('hits'):
-                    image = data['hits'][0]
-                    img_url = image['webformatURL']
-                    img_response = requests.get(img_url, timeout=15)
-                    if img_response.status_code == 200:
-                        return img_response.content
-        except Exception as e:
-            self.logger.debug(f"Pixabay API error: {e}")
-        return None
 
-    def _create_text_image(self, word: str, vietnamese: str = None) -> bytes:
-        from PIL import Image, ImageDraw, ImageFont
-        import io
-        
-        width, height = 400, 300
-        img = Image.new('RGB', (width, height), color='#667eea')
-        draw = ImageDraw.Draw(img)
-        try:
-            font_large = ImageFont.truetype("arial.ttf", 48)
-            font_small = ImageFont.truetype("arial.ttf", 24)
-        except:
-            font_large = ImageFont.load_default()
-            font_small = ImageFont.load_default()
-
-        word_upper = word.upper()
-        bbox = draw.textbbox((0, 0), word_upper, font=font_large)
-        text_width, text_height = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        x, y = (width - text_width) // 2, height // 3
-        draw.text((x, y), word_upper, font=font_large, fill='white')
+        def search():
+            response = requests.get(url, params=params, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('hits'):
+                return choose_rendition('pixabay', data['hits'], self.rendition_target)
+            return None
 
-        if vietnamese:
-            viet_text = vietnamese[:30] + "..." if len(vietnamese) > 30 else vietnamese
-            bbox = draw.textbbox((0, 0), viet_text, font=font_small)
-            viet_width = bbox[2] - bbox[0]
-            x_viet, y_viet = (width - viet_width) // 2, y + text_height + 20
-            draw.text((x_viet, y_viet), viet_text, font=font_small, fill='#FFD700')
+        return self._cached_search('pixabay', search_term, search, cancel, pos)
 
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='JPEG', quality=85)
-        return img_buffer.getvalue()
+    def _create_text_image(self, word: str, vietnamese: str = None) -> bytes:
+        return render_text_image(word, vietnamese)
 
 
 class DeckManager:
@@ -664,6 +908,29 @@ class DeckManager:
             self.logger.error(f"Failed to create deck {deck_name}: {e}")
             return False
 
+    def create_decks(self, deck_names: List[str]) -> bool:
+        """Create all missing decks with one deckNames call and one multi request"""
+        try:
+            existing_decks = set(self.anki_client.deck_names())
+            missing = [d for d in deck_names if d not in existing_decks]
+            if not missing:
+                return True
+
+            with self.anki_client.batch() as batch:
+                created = [(d, batch.queue('createDeck', deck=d)) for d in missing]
+
+            ok = True
+            for deck_name, deferred in created:
+                if deferred.error() is None:
+                    self.logger.info(f"Created deck: {deck_name}")
+                else:
+                    self.logger.error(f"Failed to create deck {deck_name}: {deferred.error()}")
+                    ok = False
+            return ok
+        except Exception as e:
+            self.logger.error(f"Failed to create decks {deck_names}: {e}")
+            return False
+
 
 class ProfileManager:
     """Enhanced profile manager"""
@@ -709,10 +976,30 @@ class MultiProfileCSVProcessor:
 
     def __init__(self):
         self.config = Config()
-        self.anki_client = AnkiConnectClient()
+        self.anki_client = AnkiConnectClient(
+            url=self.config.get_anki_url(),
+            version=self.config.get('anki.api_version', 6),
+            pool_size=self.config.get('anki.pool_size', 4),
+            idle_timeout=self.config.get('anki.idle_timeout', 30),
+            timeout=self.config.get('anki.timeout', 10),
+            cache_metadata=self.config.get('anki.cache_metadata', True),
+            stream_requests=self.config.get('anki.stream_requests', True),
+            retry_policy=RetryPolicy(**self.config.get('anki.retry', {})),
+            circuit_breaker=CircuitBreaker(**self.config.get('anki.circuit_breaker', {})),
+            timeout_budget=TimeoutBudget(
+                base=self.config.get('anki.timeout', 10),
+                per_mb=self.config.get('anki.timeout_per_mb', 2.0),
+                maximum=self.config.get('anki.max_timeout', 300),
+                action_base=self.config.get('anki.action_timeouts', {})
+            )
+        )
         self.card_generator = CardGenerator()
         self.profile_manager = ProfileManager(self.anki_client)
         self.deck_manager = DeckManager(self.anki_client)
+        self.note_writer = ChunkedNoteWriter(
+            self.anki_client,
+            max_chunk=self.config.get('processing.batch_size', 50)
+        )
         
         # Will be initialized after profile selection
         self.media_downloader = None
@@ -788,15 +1075,43 @@ class MultiProfileCSVProcessor:
         # Initialize profile-dependent components
         return self._initialize_profile_components(selected_profile)
 
+    def _media_cache_file(self, profile_name: str) -> Path:
+        """Registry location of a profile (the JSON name is kept for migration)"""
+        return self.logs_dir / f"media_cache_{profile_name.replace(' ', '_')}.json"
+
+    def _create_media_downloader(self, cache_file: Path = None) -> 'ProfileAwareMediaDownloader':
+        """Media downloader configured from config.json"""
+        return ProfileAwareMediaDownloader(
+            self.anki_client, 
+            cache_file=cache_file,
+            upload_strategies=self.config.get('media.upload_strategies'),
+            provider_limits=self.config.get('media.provider_limits'),
+            hedged_lookup=self.config.get('media.hedged_lookup'),
+            search_cache=self.config.get('media.search_cache'),
+            store_dir=self.config.get('media.store_dir'),
+            normalize={'max_bytes': self.config.get('media.max_image_size'),
+                       **(self.config.get('media.normalize') or {})},
+            max_download_size=self.config.get('media.max_image_size'),
+            download_timeout=self.config.get('media.download_timeout', 15),
+            download_deadline=self.config.get('media.download_deadline', 30),
+            tts={'speed': self.config.get('media.audio_speed', 'normal'),
+                 **(self.config.get('media.tts') or {})},
+            adaptive_providers=self.config.get('media.adaptive_providers'),
+            registry_trust_hours=self.config.get('media.reconcile.trust_hours', 24),
+            cache_limits=self.config.get('media.cache_limits')
+        )
+
     def _initialize_profile_components(self, profile_name: str) -> Tuple[str, bool]:
         """Initialize all components that depend on profile"""
         colored_print(f"\n🔧 Initializing components for profile: {profile_name}", "cyan")
         
         try:
+            if self.media_downloader:
+                self.media_downloader.close()
+
             # Initialize media downloader with profile awareness
-            self.media_downloader = ProfileAwareMediaDownloader(
-                self.anki_client, 
-                cache_file=self.logs_dir / f"media_cache_{profile_name.replace(' ', '_')}.json"
+            self.media_downloader = self._create_media_downloader(
+                cache_file=self._media_cache_file(profile_name)
             )
             self.media_downloader.set_profile(profile_name)
             
@@ -954,42 +1269,44 @@ class MultiProfileCSVProcessor:
         
         self._save_profile_data(profile_name)
 
-    def _bulk_add(self, notes: List[Dict], stat_key: str, result: Dict):
-        """Bulk add notes with error handling"""
+    def _was_partial(self, filename: str, profile_name: str) -> bool:
+        """Whether the last import of a file left notes unwritten"""
+        imports = self.import_history.get(profile_name, {}).get('imports', [])
+        last = next((entry for entry in reversed(imports) if entry.get('file') == filename), None)
+        return bool(last and last.get('partial'))
+
+    def _bulk_add(self, notes: List[Dict], stat_key: str, result: Dict,
+                  skip_existing: bool = False) -> bool:
+        """
+        Add notes in adaptive chunks, isolating failing notes by bisection
+
+        Returns:
+            False if notes were left unwritten because Anki became unreachable
+        """
         if not notes:
-            return
-            
-        try:
-            added_ids = self.anki_client.add_notes(notes)
-            successful = len([nid for nid in added_ids if nid])
-            result['stats'][stat_key] += successful
-            
-            failed = len(notes) - successful
-            if failed > 0:
-                logging.warning(f"Failed to add {failed} {stat_key}")
-                
-            colored_print(f"✅ Bulk added {successful} cards ({stat_key})", "green")
-        except Exception as e:
-            logging.error(f"Bulk add error for {stat_key}: {e}. Falling back to individual adds.")
-            # Fallback to individual adds
-            for note in notes:
-                try:
-                    note_id = self.anki_client.add_note(
-                        deck_name=note['deckName'],
-                        model_name=note['modelName'],
-                        fields=note['fields'],
-                        tags=note.get('tags', []),
-                        allow_duplicate=note.get('options', {}).get('allowDuplicate', False)
-                    )
-                    if note_id:
-                        result['stats'][stat_key] += 1
-                except Exception as ie:
-                    msg = str(ie).lower()
-                    if 'duplicate' in msg:
-                        logging.debug(f"Skipped duplicate {stat_key}")
-                    else:
-                        logging.error(f"Failed to add card: {ie}")
-                        result['stats']['errors'].append(f"{stat_key}: {str(ie)[:100]}")
+            return True
+
+        outcome = self.note_writer.add_notes(notes, skip_existing=skip_existing)
+        result['stats'][stat_key] += outcome['added']
+
+        if outcome['duplicates']:
+            logging.debug(f"Skipped {outcome['duplicates']} duplicate {stat_key}")
+        if outcome['recovered']:
+            logging.info(f"Found {outcome['recovered']} {stat_key} of a failed call already in Anki")
+        if outcome['failed']:
+            logging.warning(f"Failed to add {outcome['failed']} {stat_key}")
+        for error in outcome['errors']:
+            logging.error(f"Failed to add card: {error}")
+            result['stats']['errors'].append(f"{stat_key}: {error[:100]}")
+        if outcome['unsent']:
+            error = outcome['connection_error'] or ''
+            logging.error(f"{len(outcome['unsent'])} {stat_key} not written: {error}")
+            result['stats']['errors'].append(
+                f"{stat_key}: {len(outcome['unsent'])} note(s) not written ({error[:100]})")
+
+        colored_print(f"✅ Bulk added {outcome['added']} cards ({stat_key}) "
+                      f"in {outcome['calls']} call(s)", "green")
+        return not outcome['unsent']
 
     def process_csv_file(self, csv_file: Path) -> Dict:
         """Process CSV file in current profile"""
@@ -1022,27 +1339,81 @@ class MultiProfileCSVProcessor:
                 colored_print("⚠️ No valid data found in CSV", "yellow")
                 return result
             
-            # Download media
+            # Download media, coalescing uploads into multi requests
             colored_print("📥 Downloading media files...", "cyan")
-            for wd in vocab_data:
+            self.media_downloader.failed_uploads.clear()
+            self.media_downloader.uploader.reset_stats()
+            self.media_downloader.limiter.reset_stats()
+            if self.media_downloader.normalizer:
+                self.media_downloader.normalizer.reset_stats()
+            self.media_downloader.upload_batch = self.anki_client.batch(
+                max_actions=self.config.get('processing.media_upload_batch', 20)
+            )
+            downloader = self.media_downloader
+
+            def fetch_media(wd: Dict):
+                return (downloader.fetch_image(wd['word'], wd.get('part_of_speech'), wd.get('vietnamese')),
+                        downloader.fetch_audio(wd['word'], wd.get('pronunciation')))
+
+            # Downloads run on worker threads; uploads stay on this thread, in word order
+            pipeline = MediaPipeline(workers=self.config.get('processing.media_workers', 8))
+            try:
+                for wd, fetched in pipeline.map(fetch_media, vocab_data):
+                    try:
+                        if isinstance(fetched, Exception):
+                            raise fetched
+                        img_fetch, aud_fetch = fetched
+
+                        # Each registry write commits on its own, so a failure
+                        # never rolls back the entry of media already uploaded
+                        img = downloader.store_fetched(img_fetch)
+                        if img:
+                            wd['image'] = img
+                            result['stats']['media_downloaded'] += 1
+
+                        aud = downloader.store_fetched(aud_fetch)
+                        if aud:
+                            wd['audio'] = aud
+                            result['stats']['media_downloaded'] += 1
+                    except Exception as e:
+                        logging.error(f"Media error for {wd['word']}: {e}")
+                        result['stats']['errors'].append(f"Media: {wd['word']}")
+            finally:
+                batch, self.media_downloader.upload_batch = self.media_downloader.upload_batch, None
                 try:
-                    img = self.media_downloader.download_image(
-                        wd['word'], wd.get('part_of_speech'), wd.get('vietnamese')
-                    )
-                    if img: 
-                        wd['image'] = img
-                        result['stats']['media_downloaded'] += 1
-                        
-                    aud = self.media_downloader.download_audio(
-                        wd['word'], wd.get('pronunciation')
-                    )
-                    if aud: 
-                        wd['audio'] = aud
-                        result['stats']['media_downloaded'] += 1
+                    batch.flush()
                 except Exception as e:
-                    logging.error(f"Media error for {wd['word']}: {e}")
-                    result['stats']['errors'].append(f"Media: {wd['word']}")
-                    
+                    logging.error(f"Media upload batch failed: {e}")
+                result['stats']['upload_strategies'] = self.media_downloader.uploader.get_stats()
+                result['stats']['provider_waits'] = self.media_downloader.limiter.get_stats()
+                if self.media_downloader.scoreboard:
+                    try:
+                        self.media_downloader.scoreboard.save()
+                    except OSError as e:
+                        logging.warning(f"Could not save provider stats: {e}")
+                if self.media_downloader.normalizer:
+                    normalized = self.media_downloader.normalizer.get_stats()
+                    result['stats']['image_bytes_saved'] = normalized['bytes_saved']
+                    if normalized['images']:
+                        colored_print(f"🗜️ Normalized {normalized['images']} image(s): "
+                                      f"{normalized['bytes_in'] / 1024:.0f} KB → "
+                                      f"{normalized['bytes_out'] / 1024:.0f} KB", "cyan")
+
+            # Drop references to media whose queued upload failed
+            failed = self.media_downloader.failed_uploads
+            if failed:
+                for wd in vocab_data:
+                    for key in ('image', 'audio'):
+                        if wd.get(key) in failed:
+                            wd[key] = None
+                            result['stats']['media_downloaded'] -= 1
+                result['stats']['errors'].append(f"Media upload failed: {len(failed)} file(s)")
+
+            # Keep the local copies of this import's media out of eviction for a while
+            if self.media_downloader.cache_manager:
+                self.media_downloader.cache_manager.pin(
+                    wd[key] for wd in vocab_data for key in ('image', 'audio') if wd.get(key))
+
             # Create decks
             lesson = csv_file.stem.replace('_', ' ').title()
             base = f"Vocabulary::{lesson}"
@@ -1054,8 +1425,7 @@ class MultiProfileCSVProcessor:
             }
             
             colored_print("📚 Creating decks...", "cyan")
-            for deck_name in decks.values():
-                self.deck_manager.create_deck(deck_name)
+            self.deck_manager.create_decks(list(decks.values()))
                 
             # Prepare cards
             colored_print("🃏 Preparing cards...", "cyan")
@@ -1109,15 +1479,25 @@ class MultiProfileCSVProcessor:
                 for c in cards_ex
             ]
             
-            # Bulk add all card types
+            # Bulk add all card types; a file whose last import was cut short
+            # only gets the notes its decks are still missing
             colored_print("⚡ Adding cards to Anki...", "cyan")
-            self._bulk_add(notes_vocab, 'vocabulary_cards', result)
-            self._bulk_add(notes_cloze, 'cloze_cards', result)
-            self._bulk_add(notes_pron, 'pronunciation_cards', result)
-            self._bulk_add(notes_ex, 'exercise_cards', result)
+            resume = self._was_partial(csv_file.name, self.current_profile)
+            if resume:
+                colored_print("↩️ Resuming a partial import: skipping cards already in Anki", "yellow")
+            complete = all([
+                self._bulk_add(notes_vocab, 'vocabulary_cards', result, skip_existing=resume),
+                self._bulk_add(notes_cloze, 'cloze_cards', result, skip_existing=resume),
+                self._bulk_add(notes_pron, 'pronunciation_cards', result, skip_existing=resume),
+                self._bulk_add(notes_ex, 'exercise_cards', result, skip_existing=resume)
+            ])
             
-            # Mark as processed and save history
-            self._mark_as_processed(csv_file.name, self.current_profile)
+            # Mark as processed (unless notes were lost to Anki being
+            # unreachable: the next run retries the file) and save history
+            if complete:
+                self._mark_as_processed(csv_file.name, self.current_profile)
+            else:
+                result['partial'] = True
             
             if self.current_profile not in self.import_history:
                 self.import_history[self.current_profile] = {"imports": []}
@@ -1140,7 +1520,11 @@ class MultiProfileCSVProcessor:
                 except Exception as e:
                     logging.warning(f"Sync failed: {e}")
                     
-            colored_print(f"✅ Successfully processed {csv_file.name} in profile {self.current_profile}", "green")
+            if complete:
+                colored_print(f"✅ Successfully processed {csv_file.name} in profile {self.current_profile}", "green")
+            else:
+                colored_print(f"⚠️ Partially imported {csv_file.name}: Anki became unreachable, "
+                              f"the missing cards will be added on the next run", "yellow")
             
         except Exception as e:
             colored_print(f"❌ Error processing {csv_file.name}: {e}", "red")
@@ -1149,6 +1533,210 @@ class MultiProfileCSVProcessor:
         
         return result
 
+    def prefetch_media(self, files: List[Path]) -> Dict[str, Dict]:
+        """
+        Fill the local media store for the given files without Anki
+
+        Images are searched, downloaded and normalized and audio is
+        synthesized on the media pipeline; words no provider has an image
+        for get a rendered text image. Everything lands in the store as soon
+        as it is ready, so an interrupted run resumes where it stopped and a
+        repeated run only reports cache hits.
+
+        Returns:
+            file name -> {'words', 'images', 'audio', 'status': {kind: {status: count}}}
+        """
+        if self.media_downloader is None:
+            self.media_downloader = self._create_media_downloader()
+        downloader = self.media_downloader
+
+        # Words are fetched once even if several files share them
+        words: Dict[str, Dict] = {}
+        file_words: Dict[str, List[str]] = {}
+        for path in files:
+            try:
+                vocab_data = self.card_generator.parse_file(path).get('vocabulary', [])
+            except Exception as e:
+                colored_print(f"⚠️ Skipping {path.name}: {e}", "yellow")
+                continue
+            keys = []
+            for wd in vocab_data:
+                key = wd['word'].lower().replace(' ', '_')
+                words.setdefault(key, wd)
+                keys.append(key)
+            file_words[path.name] = keys
+
+        colored_print(f"📥 Prefetching media for {len(words)} unique word(s)...", "cyan")
+
+        def prefetch(key: str):
+            wd = words[key]
+            return (downloader.prefetch_image(wd['word'], wd.get('part_of_speech'), wd.get('vietnamese')),
+                    downloader.prefetch_audio(wd['word']))
+
+        status: Dict[str, Dict[str, str]] = {}
+        pipeline = MediaPipeline(workers=self.config.get('processing.media_workers', 8))
+        try:
+            for done, (key, outcome) in enumerate(pipeline.map(prefetch, list(words)), 1):
+                if isinstance(outcome, Exception):
+                    logging.error(f"Prefetch failed for {key}: {outcome}")
+                    outcome = ('failed', 'failed')
+                status[key] = {'image': outcome[0], 'audio': outcome[1]}
+                if done % 25 == 0:
+                    print(f"   {done}/{len(words)} word(s)")
+
+            missing = [key for key, s in status.items() if s['image'] == 'missing']
+            if missing:
+                colored_print(f"🎨 Rendering {len(missing)} text image(s)...", "cyan")
+                try:
+                    downloader.store_fallback_images([(words[k]['word'], words[k].get('vietnamese'))
+                                                      for k in missing])
+                    for key in missing:
+                        status[key]['image'] = 'fallback'
+                except Exception as e:
+                    logging.error(f"Rendering text images failed: {e}")
+                    for key in missing:
+                        status[key]['image'] = 'failed'
+        finally:
+            if downloader.scoreboard:
+                try:
+                    downloader.scoreboard.save()
+                except OSError as e:
+                    logging.warning(f"Could not save provider stats: {e}")
+
+        # Prefetched media must survive until the import it was fetched for
+        if downloader.cache_manager:
+            downloader.cache_manager.pin(
+                name for key, wd in words.items()
+                for name in [downloader._image_filename(wd['word'])] +
+                [f"{key}.{extension}" for extension in downloader.tts.extensions])
+
+        coverage = {}
+        for name, keys in file_words.items():
+            counts = {'image': {}, 'audio': {}}
+            for key in keys:
+                for kind in counts:
+                    s = status.get(key, {}).get(kind, 'failed')
+                    counts[kind][s] = counts[kind].get(s, 0) + 1
+            coverage[name] = {
+                'words': len(keys),
+                'images': len(keys) - counts['image'].get('failed', 0),
+                'audio': len(keys) - counts['audio'].get('failed', 0),
+                'status': counts
+            }
+        return coverage
+
+    def registered_profiles(self) -> List[str]:
+        """Profiles that have a media registry in logs/"""
+        profiles = []
+        for path in sorted(self.logs_dir.glob("media_cache_*.sqlite3")):
+            registry = MediaRegistry(path)
+            try:
+                profiles.extend(p for p in registry.profiles()
+                                if self._media_cache_file(p).with_suffix('.sqlite3') == path)
+            finally:
+                registry.close()
+        return profiles
+
+    def reconcile_media(self, profile_name: str, verify: bool = True,
+                        dry_run: bool = False) -> Optional[Dict]:
+        """
+        Reconcile a profile's media registry with its collection.media
+
+        Returns:
+            RegistryReconciler report, or None if the media directory is unknown
+        """
+        cache = ProfileAwareMediaCache(self._media_cache_file(profile_name), self.anki_client)
+        store = BlobStore(Path(self.config.get('media.store_dir') or "media_cache/store"))
+        try:
+            cache.set_current_profile(profile_name)
+            if not cache.anki_media_dir:
+                colored_print(f"❌ No collection.media directory known for '{profile_name}'", "red")
+                return None
+            reconciler = RegistryReconciler(cache.registry, store,
+                                            workers=self.config.get('media.reconcile.workers', 8))
+            return reconciler.reconcile(profile_name, cache.anki_media_dir, verify=verify, dry_run=dry_run)
+        finally:
+            cache.close()
+            store.close()
+
+    def show_reconcile_report(self, report: Dict):
+        """Print the outcome of reconcile_media"""
+        changes = len(report['removed']) + len(report['unverified']) + len(report['adopted'])
+        colored_print(f"\n{'✅' if not changes else '🔧'} {report['profile']} "
+                      f"({report['media_dir']})", "green" if not changes else "yellow")
+        print(f"   Files in collection.media: {report['anki_files']}")
+        print(f"   Registered: {report['registered']} ({report['verified']} verified, "
+              f"{report['not_in_store']} without a local copy)")
+        verb = "would be" if report['dry_run'] else "were"
+        for key, label in (('removed', 'missing from Anki, dropped'),
+                           ('unverified', 'differing from the local copy, marked for re-upload'),
+                           ('adopted', 'in Anki but unregistered, added')):
+            names = report[key]
+            if names:
+                shown = ', '.join(names[:5]) + (f" (+{len(names) - 5} more)" if len(names) > 5 else "")
+                print(f"   {len(names)} {verb} {label}: {shown}")
+        print(f"   {'Hashed' if report['hashed'] else 'Size-checked'} in {report['elapsed']:.2f}s")
+
+    def enforce_cache_limits(self, dry_run: bool = False) -> Optional[Dict]:
+        """Evict media from the local store until it is within its caps"""
+        if self.media_downloader is None:
+            self.media_downloader = self._create_media_downloader()
+        manager = self.media_downloader.cache_manager
+        if manager is None:
+            return None
+        report = manager.evict(dry_run=dry_run)
+        if report['evicted']:
+            verb = "Would evict" if dry_run else "Evicted"
+            colored_print(f"🧹 {verb} {len(report['evicted'])} cached media file(s), "
+                          f"{report['freed_bytes'] / 1024 / 1024:.1f} MB "
+                          f"({manager.policy.upper()}; cap {manager.max_bytes / 1024 / 1024:.0f} MB, "
+                          f"{manager.max_files} files)", "cyan")
+        return report
+
+    def show_cache_stats(self):
+        """Print the local media cache report"""
+        if self.media_downloader is None:
+            self.media_downloader = self._create_media_downloader()
+        manager = self.media_downloader.cache_manager
+        if manager is None:
+            colored_print("Media cache limits are disabled (media.cache_limits.enabled)", "yellow")
+            return
+        stats = manager.get_stats()
+        store = self.media_downloader.store.get_stats()
+
+        def percent(value, cap):
+            return f" ({100 * value / cap:.0f}% of cap)" if cap else ""
+
+        colored_print("\n📂 MEDIA CACHE", "cyan")
+        colored_print("=" * 50, "cyan")
+        print(f"   Files: {stats['files']}{percent(stats['files'], stats['max_files'])}, "
+              f"{stats['names']} name(s), {stats['pinned']} pinned")
+        print(f"   Size: {stats['bytes'] / 1024 / 1024:.1f} MB"
+              f"{percent(stats['bytes'], stats['max_bytes'])}, "
+              f"{store['saved_bytes'] / 1024 / 1024:.1f} MB saved by dedup")
+        print(f"   Eviction policy: {stats['policy'].upper()}")
+        if stats['hit_rate'] is not None:
+            print(f"   Hit rate: {stats['hit_rate']:.1%} "
+                  f"({stats['hits']} hits, {stats['stores']} stores)")
+        if stats['session_hit_rate'] is not None:
+            print(f"   Hit rate this run: {stats['session_hit_rate']:.1%}")
+        print("   Last access:")
+        for label, bucket in stats['age_histogram'].items():
+            print(f"     {label:<11} {bucket['files']:>6} file(s) {bucket['bytes'] / 1024 / 1024:>8.1f} MB")
+
+    def show_prefetch_coverage(self, coverage: Dict[str, Dict]):
+        """Print per-file cache coverage after a prefetch"""
+        colored_print("\n📦 MEDIA CACHE COVERAGE", "cyan")
+        colored_print("=" * 50, "cyan")
+        for name, c in coverage.items():
+            complete = c['images'] == c['words'] and c['audio'] == c['words']
+            colored_print(f"\n{'✅' if complete else '⚠️'} {name}: {c['words']} word(s)",
+                          "green" if complete else "yellow")
+            for kind, label, available in (('image', 'Images', c['images']), ('audio', 'Audio', c['audio'])):
+                percent = 100 * available / c['words'] if c['words'] else 100
+                details = ', '.join(f"{n} {s}" for s, n in sorted(c['status'][kind].items()))
+                print(f"   {label}: {available}/{c['words']} ({percent:.0f}%)" + (f" — {details}" if details else ""))
+
     def show_summary(self, results: List[Dict], profile_name: str):
         """Show processing summary for profile"""
         colored_print("\n" + "=" * 60, "blue")
@@ -1174,6 +1762,60 @@ class MultiProfileCSVProcessor:
         print(f"   - Total: {total_vocab + total_cloze + total_pron + total_exercise}")
         print(f"🖼️ Media downloaded: {total_media}")
 
+        upload_totals = {}
+        for r in results:
+            for strategy, count in r['stats'].get('upload_strategies', {}).items():
+                upload_totals[strategy] = upload_totals.get(strategy, 0) + count
+        if upload_totals:
+            print("📤 Media uploads by strategy: " +
+                  ", ".join(f"{k}={v}" for k, v in upload_totals.items()))
+
+        waits = {}
+        for r in results:
+            for provider, s in r['stats'].get('provider_waits', {}).items():
+                waits[provider] = waits.get(provider, 0.0) + s['wait_seconds']
+        if any(w >= 1 for w in waits.values()):
+            print("⏳ Provider rate-limit waits: " +
+                  ", ".join(f"{k}={v:.1f}s" for k, v in waits.items() if v >= 1))
+
+        if self.media_downloader and self.media_downloader.hedge:
+            hedge = self.media_downloader.hedge.get_stats()
+            if hedge['lookups']:
+                print(f"🏁 Hedged image lookups: {hedge['lookups']} "
+                      f"(misses: {hedge['misses']}, cancelled requests: {hedge['cancelled']}) - wins: " +
+                      ", ".join(f"{k}={v}" for k, v in hedge['wins'].items()))
+
+        image_saved = sum(r['stats'].get('image_bytes_saved', 0) for r in results)
+        if image_saved:
+            print(f"🗜️ Image normalization saved {image_saved / 1024 / 1024:.1f} MB")
+
+        if self.media_downloader:
+            rejected = self.media_downloader.fetcher.get_stats()['rejected']
+            if rejected:
+                print("🚫 Image downloads aborted: " +
+                      ", ".join(f"{k}={v}" for k, v in rejected.items()))
+
+            store = self.media_downloader.store.get_stats()
+            if store['saved_bytes']:
+                print(f"🗄️ Media store: {store['names']} files in {store['blobs']} blobs, "
+                      f"dedup saved {store['saved_bytes'] / 1024 / 1024:.1f} MB")
+
+        if self.media_downloader and self.media_downloader.search_cache:
+            search = self.media_downloader.search_cache.get_stats()
+            if search['hits'] or search['negative_hits']:
+                print(f"🔎 Search cache: {search['hits']} hits, {search['negative_hits']} cached misses, "
+                      f"{search['misses'] + search['expired']} searches sent")
+
+        self.show_provider_scoreboard()
+
+        self.show_metrics()
+
+        resilience = self.anki_client.get_resilience_stats()
+        if resilience['retries'] or resilience['circuit']['opened']:
+            print(f"🔁 AnkiConnect retries: {resilience['retries']} "
+                  f"(busy: {resilience['busy']}), paused "
+                  f"{resilience['circuit']['paused_seconds']:.0f}s while Anki was unresponsive")
+
         # Show cache stats
         try:
             cache_stats = self.media_downloader.cache.get_cache_stats()
@@ -1185,6 +1827,10 @@ class MultiProfileCSVProcessor:
         except Exception as e:
             logging.debug(f"Error getting cache stats: {e}")
 
+        client_cache = self.anki_client.get_cache_stats()
+        print(f"   - AnkiConnect metadata cache: {client_cache['hits']} hits / "
+              f"{client_cache['misses']} misses")
+
         # Show errors
         all_errors = []
         for r in results:
@@ -1198,6 +1844,111 @@ class MultiProfileCSVProcessor:
             if len(all_errors) > 5:
                 print(f"   ... and {len(all_errors) - 5} more")
 
+    def show_metrics(self, limit: int = 5):
+        """Show the AnkiConnect actions that took the most time"""
+        actions = [(a, m) for a, m in self.anki_client.metrics.to_dict().items() if m['calls']]
+        if not actions:
+            return
+
+        print("⏱️ AnkiConnect time by action:")
+        for action, m in actions[:limit]:
+            latency = m['latency']
+            errors = f", {m['errors']} errors" if m['errors'] else ""
+            print(f"   - {action}: {m['calls']} calls, {latency['total']:.2f}s total, "
+                  f"p50 {latency['p50'] * 1000:.0f}ms / p95 {latency['p95'] * 1000:.0f}ms / "
+                  f"p99 {latency['p99'] * 1000:.0f}ms, "
+                  f"{(m['request_bytes'] + m['response_bytes']) / 1024:.0f} KB{errors}")
+
+    def show_provider_scoreboard(self):
+        """Show image provider hit rate, latency and size per part of speech"""
+        if not (self.media_downloader and self.media_downloader.scoreboard):
+            return
+        rows = self.media_downloader.scoreboard.scoreboard()
+        if not rows:
+            return
+
+        print("🏆 Image providers (all runs):")
+        for r in rows:
+            print(f"   - {r['pos']:<6} {r['provider']:<9} {r['attempts']:>5} searches, "
+                  f"{r['hit_rate'] * 100:>3.0f}% hits, {r['avg_latency']:.2f}s avg, "
+                  f"{r['avg_bytes'] / 1024:.0f} KB/image")
+
+
+def prefetch(args) -> int:
+    """Fill the local media cache for input files; never contacts Anki"""
+    colored_print("\n📦 OFFLINE MEDIA PREFETCH", "cyan")
+    colored_print("=" * 50, "cyan")
+
+    processor = MultiProfileCSVProcessor()
+    files = args.files or [f for f in sorted(list(processor.input_dir.glob("*.csv")) +
+                                             list(processor.input_dir.glob("*.xlsx")) +
+                                             list(processor.input_dir.glob("*.xls")))
+                           if 'template' not in f.name.lower()]
+    missing = [f for f in files if not f.exists()]
+    if missing:
+        colored_print(f"❌ File(s) not found: {', '.join(str(f) for f in missing)}", "red")
+        return 1
+    if not files:
+        colored_print("📭 No CSV/XLSX files found in input/", "yellow")
+        return 0
+
+    try:
+        coverage = processor.prefetch_media(files)
+        processor.show_prefetch_coverage(coverage)
+        processor.enforce_cache_limits()
+        return 0
+    except KeyboardInterrupt:
+        colored_print("\n\n👋 Prefetch interrupted; run again to resume", "yellow")
+        return 1
+    finally:
+        if processor.media_downloader:
+            processor.media_downloader.close()
+        processor.anki_client.close()
+
+
+def reconcile(args) -> int:
+    """Reconcile media registries with collection.media; Anki may be closed"""
+    colored_print("\n🔍 MEDIA REGISTRY RECONCILIATION", "cyan")
+    colored_print("=" * 50, "cyan")
+
+    processor = MultiProfileCSVProcessor()
+    try:
+        profiles = args.profile or processor.registered_profiles()
+        if not profiles:
+            colored_print("📭 No media registries found in logs/", "yellow")
+            return 0
+
+        failed = 0
+        for profile_name in profiles:
+            report = processor.reconcile_media(profile_name, verify=not args.no_verify,
+                                               dry_run=args.dry_run)
+            if report is None:
+                failed += 1
+            else:
+                processor.show_reconcile_report(report)
+        return 1 if failed else 0
+    except KeyboardInterrupt:
+        colored_print("\n\n👋 Reconciliation cancelled", "yellow")
+        return 1
+    finally:
+        processor.anki_client.close()
+
+
+def cache(args) -> int:
+    """Local media cache report and eviction; never contacts Anki"""
+    processor = MultiProfileCSVProcessor()
+    try:
+        if args.action == 'evict':
+            report = processor.enforce_cache_limits(dry_run=args.dry_run)
+            if report is not None and not report['evicted']:
+                colored_print("✅ Media cache is within its limits", "green")
+        processor.show_cache_stats()
+        return 0
+    finally:
+        if processor.media_downloader:
+            processor.media_downloader.close()
+        processor.anki_client.close()
+
 
 def main():
     """Main entry point với proper multi-profile flow"""
@@ -1214,6 +1965,60 @@ def main():
         action='store_true',
         help='Enable verbose logging'
     )
+    parser.add_argument(
+        '--trace',
+        metavar='PATH',
+        help='Record every AnkiConnect request to a trace file (.jsonl or .jsonl.gz) for replay'
+    )
+    parser.add_argument(
+        '--metrics-out',
+        metavar='PATH',
+        help='Write AnkiConnect metrics on exit (.prom/.txt: Prometheus text format, otherwise JSON)'
+    )
+
+    subparsers = parser.add_subparsers(dest='command')
+    prefetch_parser = subparsers.add_parser(
+        'prefetch',
+        help='Download and normalize media for input files into the local cache, without Anki'
+    )
+    prefetch_parser.add_argument(
+        'files',
+        nargs='*',
+        type=Path,
+        help='Files to prefetch (default: every CSV/XLSX file in input/)'
+    )
+
+    reconcile_parser = subparsers.add_parser(
+        'reconcile',
+        help="Check media registries against each profile's collection.media and repair them"
+    )
+    reconcile_parser.add_argument(
+        '--profile',
+        action='append',
+        help='Profile to reconcile (repeatable; default: every profile with a registry)'
+    )
+    reconcile_parser.add_argument(
+        '--no-verify',
+        action='store_true',
+        help='Only compare names and sizes, without hashing file contents'
+    )
+    reconcile_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Report differences without changing the registry'
+    )
+
+    cache_parser = subparsers.add_parser('cache', help='Inspect or trim the local media cache')
+    cache_parser.add_argument(
+        'action',
+        choices=['stats', 'evict'],
+        help='stats: size, hit rate and age report; evict: apply media.cache_limits now'
+    )
+    cache_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='With evict, only report what would be removed'
+    )
 
     args = parser.parse_args()
 
@@ -1221,12 +2026,22 @@ def main():
     log_level = logging.DEBUG if args.verbose else logging.INFO
     setup_logging(log_level)
 
+    if args.command == 'prefetch':
+        return prefetch(args)
+    if args.command == 'reconcile':
+        return reconcile(args)
+    if args.command == 'cache':
+        return cache(args)
+
     # Header
     colored_print("\n🚀 MULTI-PROFILE CSV TO ANKI SYSTEM", "cyan")
     colored_print("=" * 50, "cyan")
 
     # Initialize processor
     processor = MultiProfileCSVProcessor()
+    if args.trace:
+        processor.anki_client.start_trace(args.trace)
+        colored_print(f"🎞️ Recording AnkiConnect trace to {args.trace}", "cyan")
 
     try:
         # Step 1: Check Anki connection
@@ -1281,6 +2096,7 @@ def main():
 
         # Step 5: Show summary
         processor.show_summary(results, profile_name)
+        processor.enforce_cache_limits()
 
         colored_print(f"\n✨ All done for profile '{profile_name}'! Happy studying! 🎓", "green")
         return 0
@@ -1292,6 +2108,16 @@ def main():
         colored_print(f"\n❌ Unexpected error: {e}", "red")
         logging.exception("Unexpected error")
         return 1
+    finally:
+        if args.metrics_out:
+            try:
+                processor.anki_client.dump_metrics(args.metrics_out)
+                colored_print(f"📊 Metrics written to {args.metrics_out}", "cyan")
+            except OSError as e:
+                colored_print(f"⚠️ Could not write metrics: {e}", "yellow")
+        if processor.media_downloader:
+            processor.media_downloader.close()
+        processor.anki_client.close()
 
 
 if __name__ == "__main__":
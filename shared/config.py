@@ -38,16 +38,113 @@ class Config:
             "anki": {
                 "host": "localhost",
                 "port": 8765,
-                "api_version": 6
+                "api_version": 6,
+                "timeout": 10,
+                "pool_size": 4,
+                "idle_timeout": 30,
+                "cache_metadata": True,
+                "stream_requests": True,
+                # Timeout budget: timeout (or action_timeouts[action]) plus
+                # timeout_per_mb per MB of request body, capped at max_timeout
+                "timeout_per_mb": 2.0,
+                "max_timeout": 300,
+                "action_timeouts": {
+                    "sync": 120,
+                    "loadProfile": 30,
+                    "importPackage": 120
+                },
+                "retry": {
+                    "max_attempts": 4,
+                    "base_delay": 0.5,
+                    "max_delay": 8.0
+                },
+                "circuit_breaker": {
+                    "failure_threshold": 5,
+                    "reset_timeout": 5,
+                    "max_reset_timeout": 60,
+                    "pause_limit": 300
+                }
             },
             "media": {
                 "pixabay_api_key": os.environ.get('PIXABAY_API_KEY', ''),
                 "pexels_api_key": os.environ.get('PEXELS_API_KEY', ''),
                 "unsplash_api_key": os.environ.get('UNSPLASH_API_KEY', ''),
                 "download_timeout": 15,
+                "download_deadline": 30,  # total seconds per image download
                 "max_image_size": 1024 * 1024 * 2,  # 2MB
                 "fallback_image_size": (400, 300),
-                "audio_speed": "slow"  # slow or normal
+                "audio_speed": "slow",  # slow or normal
+                # Tried in order per word; espeak/pyttsx3 work offline (WAV output)
+                "tts": {
+                    "backends": ["gtts", "espeak", "pyttsx3"],
+                    "lang": "en"
+                },
+                # Tried in order: hardlink/copy into collection.media,
+                # AnkiConnect path mode, then base64 data
+                "upload_strategies": ["hardlink", "copy", "path", "data"],
+                # Requests per second, back-to-back burst and requests in flight
+                "provider_limits": {
+                    "langeek": {"rate": 1.0, "burst": 1, "concurrency": 1},
+                    "pexels": {"rate": 2.0, "burst": 2, "concurrency": 2},
+                    "unsplash": {"rate": 2.0, "burst": 2, "concurrency": 2},
+                    "pixabay": {"rate": 2.0, "burst": 2, "concurrency": 2},
+                    "gtts": {"rate": 4.0, "burst": 4, "concurrency": 3}
+                },
+                # Caps on the media store; least recently (lru) or least
+                # frequently (lfu) used files go first, media of imports in the
+                # last pin_days is kept
+                "cache_limits": {
+                    "enabled": True,
+                    "path": "media_cache/cache_access.sqlite3",
+                    "max_bytes": 2 * 1024 ** 3,  # 2GB
+                    "max_files": 50000,
+                    "policy": "lru",
+                    "pin_days": 7
+                },
+                # `run.py reconcile` checks the registry against collection.media;
+                # for trust_hours afterwards imports skip per-file existence checks
+                "reconcile": {
+                    "workers": 8,
+                    "trust_hours": 24
+                },
+                # Order (and skip) image providers by their hit rate and latency
+                # per part of speech; explore_rate of lookups try all of them
+                "adaptive_providers": {
+                    "enabled": True,
+                    "path": "media_cache/provider_stats.json",
+                    "explore_rate": 0.1,
+                    "min_samples": 20,
+                    "skip_below": 0.05
+                },
+                # Query all image providers in parallel for the top search term.
+                # policy "preference" keeps the most preferred hit (waiting up to
+                # grace seconds for better ones), "first" keeps the fastest hit
+                "hedged_lookup": {
+                    "enabled": True,
+                    "policy": "preference",
+                    "preference": ["langeek", "pexels", "unsplash", "pixabay"],
+                    "grace": 0.5,
+                    "timeout": 20
+                },
+                # Downscale new images to the card display size (2x for HiDPI),
+                # strip EXIF and re-encode under max_image_size
+                "normalize": {
+                    "enabled": True,
+                    "max_width": 500,
+                    "max_height": 400,
+                    "format": "JPEG",  # JPEG or WEBP
+                    "quality": 85,
+                    "workers": 2
+                },
+                # Content-addressed media store shared by all profiles
+                "store_dir": "media_cache/store",
+                # Provider search results on disk; empty results expire sooner
+                "search_cache": {
+                    "enabled": True,
+                    "path": "media_cache/search_cache.sqlite3",
+                    "ttl_days": 30,
+                    "negative_ttl_days": 7
+                }
             },
             "decks": {
                 "base_name": "Vocabulary",
@@ -98,6 +195,8 @@ class Config:
             },
             "processing": {
                 "batch_size": 50,
+                "media_upload_batch": 20,
+                "media_workers": 8,
                 "rate_limit_delay": 0.5,
                 "auto_backup": True,
                 "backup_before_import": True,